@@ -0,0 +1,126 @@
+import array
+import collections
+import math
+import threading
+
+import randpool
+
+#####
+#
+def_exponent = 1.0      # Zipf exponent used by -W without a value, weight of the word at rank r is (r + 1) ** -exponent
+scale = 1 << 32         # alias thresholds are fractions of this, compared against 32 bits of randomness
+max_cached = 8          # tables kept for reuse, least recently used dropped first
+#
+#####
+
+"""
+Weighted word picks in O(1) each, with Walker's alias method (Vose's
+construction).  The word list keeps each word's popularity rank (its place
+in popular.txt, see wordlist), and a word's weight is Zipf-like,
+
+    weight(rank) = (rank + 1) ** -exponent
+
+so a positive exponent favours common, easier to remember words, a negative
+one favours rare words, and 0 is uniform.  The table is built once, O(n):
+n columns of equal probability, each holding its own word up to a
+threshold and one other word (its alias) above it.  A pick is one uniform
+column and one 32 bit threshold draw, whatever the size of the list.
+
+    table = Alias.for_words(words, 1.0)
+    table.picks(rng, 4)             # 4 indices into words
+    table.entropy(), table.min_entropy()
+
+Weighting always costs entropy against a uniform pick from the same list,
+and min_entropy (the odds of the single most likely word, what a guesser
+ordering by popularity starts with) drops faster than the Shannon figure.
+Both are reported so the trade is visible.
+"""
+
+_tables = collections.OrderedDict()    # (id(words), exponent): (words, table), words held so the id stays theirs
+_lock = threading.Lock()
+
+def zipf_weights(ranks, exponent: float) -> list:
+    return [(r + 1) ** -exponent for r in ranks]
+
+class Alias:
+    """
+    Alias table over len(weights) outcomes.  thresholds and aliases are
+    uint32 arrays, probabilities the exact normalised weights (for entropy).
+    """
+    __slots__ = ("thresholds", "aliases", "probabilities")
+
+    def __init__(self, weights):
+        n = len(weights)
+        if not n:
+            raise ValueError("need at least one weight")
+        total = math.fsum(weights)
+        if total <= 0 or min(weights) < 0:
+            raise ValueError("weights must be non-negative and not all zero")
+        self.probabilities = [w / total for w in weights]
+        scaled = [p * n for p in self.probabilities]
+        small = [i for i, s in enumerate(scaled) if s < 1]
+        large = [i for i, s in enumerate(scaled) if s >= 1]
+        thresholds = array.array("I", bytes(4 * n))
+        aliases = array.array("I", range(n))    # a column left to itself always keeps its own word
+        while small and large:
+            s, l = small.pop(), large[-1]
+            thresholds[s] = int(scaled[s] * scale)
+            aliases[s] = l
+            scaled[l] -= 1 - scaled[s]
+            if scaled[l] < 1:
+                small.append(large.pop())
+        for i in small + large:     # what's left is 1 give or take rounding
+            thresholds[i] = scale - 1
+            aliases[i] = i
+        self.thresholds = thresholds
+        self.aliases = aliases
+
+    @classmethod
+    def for_words(cls, words, exponent=def_exponent):
+        """
+        Table for a word list, weighted by the ranks it was compiled with
+        (wordlist.WordList.ranks, ValueError if it has none), or by list
+        order for a plain list.  Built
+        once per list and exponent, engines sharing a list share the table.
+        Only the max_cached most recently used are kept.
+        """
+        key = (id(words), exponent)
+        with _lock:
+            cached = _tables.get(key)
+            if cached is not None and cached[0] is words:
+                _tables.move_to_end(key)
+                return cached[1]
+        ranks = getattr(words, "ranks", range(len(words)))
+        if ranks is None:
+            raise ValueError("word list was compiled without ranks")
+        table = cls(zipf_weights(ranks, exponent))
+        with _lock:
+            _tables[key] = (words, table)
+            _tables.move_to_end(key)
+            while len(_tables) > max_cached:
+                _tables.popitem(last=False)
+        return table
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    def picks(self, rng: randpool.Pool, k: int) -> list:
+        """
+        k independent indices, index i with probability probabilities[i]
+        """
+        columns = rng.indices(len(self.thresholds), k)
+        draws = memoryview(rng.read(4 * k)).cast("I")
+        thresholds, aliases = self.thresholds, self.aliases
+        return [c if u < thresholds[c] else aliases[c] for c, u in zip(columns, draws)]
+
+    def entropy(self) -> float:
+        """
+        Shannon entropy of one pick in bits
+        """
+        return -math.fsum(p * math.log2(p) for p in self.probabilities if p)
+
+    def min_entropy(self) -> float:
+        """
+        -log2 of the most likely pick, the guessing bound
+        """
+        return -math.log2(max(self.probabilities))
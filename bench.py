@@ -0,0 +1,789 @@
+import argparse
+import sys
+import threading
+import time
+import random
+import string
+import os
+import itertools
+import subprocess
+import tempfile
+import pathlib
+import json
+import math
+import tracemalloc
+import urllib.parse
+import platform
+
+import password_rabbit
+import password_marmot
+import password_lemur
+from sharding import sharded
+import wordlist
+import phonetic
+import randpool
+import wolf_client
+import dedupe
+import alias
+import lengths
+import profanity
+import re
+
+#####
+#
+def_qty = 20000         # passwords per thread
+def_threads = "1,2,4,8"
+def_length = 20
+def_workers = "1,2,4"
+def_sharded_qty = 200000
+def_words = 25000       # size of the stand-in dictionary, popular.txt is about this size
+def_corpus = 1000000    # words in the stand-in corpus for the out-of-core build
+def_memory_mb = 16      # working memory given to the out-of-core build
+def_api_qty = 100000    # results in the large API response, 0 to skip
+def_requests = 2000     # keep-alive requests per engine against the local service, 0 to skip
+def_lengths = "12,20,32"  # characters, lemur uses a quarter as many words
+def_quantities = "1000,100000"
+reject_sample = 50000   # passwords taken to measure a rejection rate
+def_repeat = 3          # runs per measurement, the best counts
+def_tolerance = 15      # percent a metric may get worse before compare calls it a regression
+sections = ("engines", "functions", "random", "threads", "reject", "dedupe", "screen", "marmot", "load", "build", "api", "service", "startup", "pool")
+startup_budget_ms = 30  # most importing a generator subcommand may cost
+startup_runs = 7        # cold starts per subcommand, the fastest counts
+startup_commands = ("rabbit", "marmot", "lemur", "genut")    # the generators, the maintenance commands need their imports
+heavy_modules = ("requests", "inflect", "asyncio", "ssl", "concurrent.futures", "sqlite3", "_hashlib", "csv", "json")
+#
+#####
+
+"""
+usage: bench.py [-h] [-q QTY] [-t THREADS] [-w WORKERS] [--sharded-qty SHARDED_QTY] [--words WORDS]
+                [--corpus CORPUS] [--memory MEMORY] [--api-qty API_QTY] [--requests REQUESTS]
+                [-l LENGTHS] [-n QUANTITIES] [-r REPEAT] [-s SECTIONS] [-o OUTPUT] [--startup-only]
+                [--compare OLD NEW] [--tolerance TOLERANCE]
+
+Benchmarks for the generators, run as a suite.  Every section prints what
+it measures and records it under a dotted name, and -o writes the lot as
+JSON with the interpreter, machine and commit it ran on.  Each metric says
+whether higher or lower is better, so
+
+    python bench.py -o before.json
+    ...change something...
+    python bench.py -o after.json
+    python bench.py --compare before.json after.json
+
+lists every metric that got worse by more than --tolerance percent and
+exits 1 if there were any.  -s picks sections, eg -s engines,functions for
+a quick check of the generators.  The stand-in dictionary and corpus are
+seeded so every run works on the same words; passwords themselves come from
+the engines' own randomness, so rates are the best of -r runs.
+
+The engines section takes qty passwords from a fresh engine per length
+(so small quantities show setup cost) and records the rate, rejection rate
+and peak traced memory, including the NumPy engine when numpy is installed.  The functions section times the module level
+functions the scripts are built from, and the random section times the
+draws the engines make on the Mersenne Twister, SystemRandom (a system
+call per draw) and randpool.Pool, plus alias table picks, length limited
+picks and the entropy weighting or length limits leave a passphrase with.  The dedupe section runs Rabbit output
+through the exact set and the Bloom filter, and through an on-disk index
+already holding as many earlier credentials.  The screen section times
+the expletive automata (profanity) on passwords and words next to a regex
+alternation of the same list.
+
+The threads section gives each thread its own engine instance, so it shows
+how throughput scales when they run side by side.  On a free-threaded
+CPython build (3.13t and later) the threads really do run in parallel; on a
+normal build the GIL keeps total throughput roughly flat.  The process pool
+section compares sharding.sharded against the plain single-process
+iterator.  Word list loading is measured in a fresh interpreter per run so
+startup time and peak RSS aren't polluted by whatever the benchmark itself
+has allocated.  The API section runs a local stub of Password Wolf in a
+child process and compares the buffered client (wolf_client.fetch) with
+the incremental one (wolf_client.stream) on throughput, time to first
+result and peak traced memory, and the local service (wolf_server) is
+timed one result per request over a keep-alive connection.  Cold start
+imports each generator subcommand of passwords.py in a fresh interpreter,
+and fails when one takes more than startup_budget_ms or drags in one of
+heavy_modules.
+"""
+
+def sample_words(n=25000) -> list:
+    """
+    Stand-in word list so lemur can be benchmarked without downloading anything
+    """
+    rng = random.Random(0)
+    return [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 12))) for _ in range(n)]
+
+def engines() -> dict:
+    words = sample_words()
+    return {
+        "rabbit": lambda: password_rabbit.Rabbit(def_length),
+        "marmot": lambda: password_marmot.Marmot(def_length),
+        "lemur": lambda: password_lemur.Lemur(words, 3),
+        "phonetic": lambda: phonetic.Phonetic(6),
+    }
+
+def gil_enabled() -> bool:
+    check = getattr(sys, "_is_gil_enabled", None)
+    return check() if check else True
+
+def thread_scaling(make_engine, threads: int, qty: int) -> float:
+    """
+    Runs `threads` engines at once, each taking qty records, and returns
+    total records per second across all of them.
+    """
+    barrier = threading.Barrier(threads + 1)
+    def work():
+        engine = make_engine()
+        barrier.wait()
+        engine.take(qty)
+    pool = [threading.Thread(target=work) for _ in range(threads)]
+    for t in pool: t.start()
+    start = time.perf_counter()    # before the barrier, a worker can finish before we wake up
+    barrier.wait()
+    for t in pool: t.join()
+    return threads * qty / (time.perf_counter() - start)
+
+def process_scaling(engine_class, engine_args: tuple, workers: int, qty: int) -> float:
+    """
+    Records per second pulling qty records through a pool of `workers`
+    processes, or straight from the engine when workers is 1.
+    """
+    start = time.perf_counter()
+    if workers > 1:
+        records = sharded(engine_class, engine_args, qty, workers)
+    else:
+        records = itertools.islice(engine_class(*engine_args), qty)
+    for _ in records: pass
+    return qty / (time.perf_counter() - start)
+
+def dedupe_rates(qty: int) -> dict:
+    """
+    Records per second through dedupe with each in-run structure, and with
+    an on-disk index that already holds qty earlier credentials, plus the
+    bytes each in-run structure takes per credential
+    """
+    records = password_rabbit.Rabbit(def_length).take(2 * qty)
+    first, second = records[:qty], records[qty:]
+    out = {}
+    for name, seen in (("set", dedupe.HashSet), ("bloom", dedupe.Bloom)):
+        d = dedupe.Dedupe(qty)
+        d.seen = seen(qty)
+        start = time.perf_counter()
+        for _ in d.filter(first): pass
+        out[f"{name}.rate"] = (qty / (time.perf_counter() - start), "records/s", "higher")
+        size = len(d.seen.slots) * 8 if name == "set" else len(d.seen.bits)
+        out[f"{name}.bytes"] = (size / qty, "bytes/record", "lower")
+    with tempfile.TemporaryDirectory() as tmp:
+        with dedupe.Index(tmp) as index:
+            for _ in dedupe.Dedupe(qty, index).filter(first): pass
+        with dedupe.Index(tmp) as index:
+            start = time.perf_counter()
+            for _ in dedupe.Dedupe(qty, index).filter(second): pass
+            out["index.rate"] = (qty / (time.perf_counter() - start), "records/s", "higher")
+    return out
+
+def screen_rates(qty: int, words: list) -> dict:
+    """
+    Texts per second through the expletive automata, on Rabbit passwords
+    and on dictionary words, against one regex alternation of the list
+    """
+    passwords = password_rabbit.Rabbit(def_length).take(qty)
+    expletives = open(profanity.expletive_full_path).read().split()
+    alternation = re.compile("|".join(map(re.escape, expletives)), re.IGNORECASE).search
+    runs = {
+        "passwords.automaton": (profanity.credentials().found, passwords),
+        "passwords.leet": (profanity.credentials(True).found, passwords),
+        "passwords.regex": (alternation, passwords),
+        "words.automaton": (profanity.words().found, words),
+    }
+    return {name: lambda found=found, texts=texts: len(texts) / timed(lambda: [found(t) for t in texts]) for name, (found, texts) in runs.items()}
+
+def marmot_chains(qty: int) -> dict:
+    """
+    Candidates per second through the marmot transform chain as it was, a
+    new string at each step (chars, replace_chars, reverse_chars,
+    shuffle_pwd), against Marmot.chain working in place on its one
+    bytearray, and the traced bytes each allocates on top of what it
+    started with (the peak within one candidate, averaged, so the fused
+    chain's batch refills count their share)
+    """
+    engine = password_marmot.Marmot(def_length)
+    rng, pool = engine.rng, engine.pool
+    def chained():
+        pwd = rng.chars(pool, def_length)
+        s, n = password_marmot.random_char_index(pwd, rng)
+        pwd = password_marmot.replace_chars(pwd, s, n, engine.special, engine.numbers, rng)
+        pwd = password_marmot.reverse_chars(pwd)
+        return password_marmot.shuffle_pwd(pwd, rng)
+    out = {}
+    for name, make in (("chain", chained), ("fused", engine.chain().__next__)):
+        out[f"{name}.rate"] = (lambda make=make: qty / timed(lambda: [make() for _ in range(qty)]), "candidates/s", "higher")
+        tracemalloc.start()
+        total = 0
+        for _ in range(reject_sample):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            make()
+            total += tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+        out[f"{name}.bytes"] = (total / reject_sample, "bytes/candidate", "lower")
+    return out
+
+def constructive_vs_reject(engine_class, length: int, spec_char: bool, qty: int) -> tuple:
+    """
+    Returns (reject loop rate, constructive rate, reject loop acceptance rate)
+    """
+    rates = []
+    for constructive in (False, True):
+        engine = engine_class(length, spec_char, constructive)
+        start = time.perf_counter()
+        engine.take(qty)
+        rates.append(qty / (time.perf_counter() - start))
+        if not constructive: accepted = engine.acceptance_rate
+    return rates[0], rates[1], accepted
+
+load_snippet = """
+import json, resource, sys, time
+start = time.perf_counter()
+if sys.argv[1] == "text":
+    with open(sys.argv[2]) as f: words = f.read().splitlines()
+else:
+    import wordlist
+    words = wordlist.load(sys.argv[2])
+words[len(words) // 2]
+elapsed = time.perf_counter() - start
+try:    # ru_maxrss survives exec on linux, VmHWM belongs to this process only
+    with open("/proc/self/status") as f:
+        peak = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+except OSError:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "maxrss_kb": peak}))
+"""
+
+build_snippet = """
+import json, sys, time
+def rss(field):
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(field))
+import sanitize
+sanitize.singular("houses")    # inflect imported and warm before the baseline
+base = rss("VmRSS")
+mode, corpus, dest, cache, memory = sys.argv[1:]
+start = time.perf_counter()
+if mode == "memory":
+    ranked = [(r, w) for r, w in enumerate(open(corpus).read().split()) if len(w) >= sanitize.min_word_length]
+    ranks = sanitize.lowest_ranks(zip(sanitize.singularize([w for _, w in ranked], cache, workers=1), (r for r, _ in ranked)))
+    open(dest, "w").write("".join(f"{w}\\t{ranks[w]}\\n" for w in sorted(ranks)))
+else:
+    sanitize.clean_stream([corpus], None, dest, int(memory), cache, workers=1)
+print(json.dumps({"seconds": time.perf_counter() - start, "delta_kb": rss("VmHWM") - base}))
+"""
+
+def dictionary_build(mode: str, corpus, memory_mb: int) -> dict:
+    """
+    Builds a dictionary from corpus in a child interpreter, all in memory
+    the way clean_word_list does or out-of-core with sanitize.clean_stream,
+    and returns the time taken and how far peak RSS rose above the
+    interpreter with inflect loaded.
+    """
+    corpus = pathlib.Path(corpus)
+    dest = corpus.with_name(f"{mode}.txt")
+    cache = corpus.with_name("cache.sqlite")
+    here = pathlib.Path(__file__).parent
+    out = subprocess.run([sys.executable, "-c", build_snippet, mode, str(corpus), str(dest), str(cache), str(memory_mb)], cwd=here, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+def word_list_load(mode: str, source) -> dict:
+    """
+    Loads source in a child interpreter, either as text split into a list
+    (how lemur used to) or through the compiled mmap, and returns its
+    load time and peak RSS.
+    """
+    here = pathlib.Path(__file__).parent
+    out = subprocess.run([sys.executable, "-c", load_snippet, mode, str(source)], cwd=here, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+stub_snippet = """
+import http.server, json, sys, urllib.parse
+import phonetic
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def log_message(self, *args): pass
+    def do_GET(self):
+        q = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        body = json.dumps(phonetic.generate(int(q["repeat"][0]), int(q["length"][0]))).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        for i in range(0, len(body), 1 << 16):
+            self.wfile.write(body[i:i + (1 << 16)])
+server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+print(server.server_address[1], flush=True)
+server.serve_forever()
+"""
+
+def api_response(mode: str, url: str, qty: int) -> dict:
+    """
+    Pulls qty results from url either buffered (fetch, the whole list at
+    once) or streamed (parsed as the body arrives), and returns the time to
+    the first result and in total, then the peak traced memory of a second
+    run (tracing slows things down too much to time the same run).
+    """
+    result = {}
+    for traced in (False, True):
+        if traced: tracemalloc.start()
+        start = time.perf_counter()
+        if mode == "buffered":
+            results = iter(wolf_client.fetch(qty, url, length=16))
+        else:
+            results = wolf_client.stream(qty, url, length=16)
+        next(results)
+        first = time.perf_counter() - start
+        count = 1 + sum(1 for _ in results)
+        if traced:
+            result["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+        else:
+            result.update(first=first, seconds=time.perf_counter() - start, count=count)
+    return result
+
+startup_snippet = """
+import sys, time
+start = time.perf_counter()
+import passwords
+passwords.load(sys.argv[1])
+elapsed = time.perf_counter() - start
+heavy = [m for m in sys.argv[2:] if m in sys.modules]
+print(elapsed * 1000, *heavy)
+"""
+
+def service_latency(url: str, engine: str, requests: int) -> tuple:
+    """
+    Round trip of `requests` one-result requests on one keep-alive
+    connection, returns (p50, p99) in ms
+    """
+    import asyncio
+    async def run():
+        split = urllib.parse.urlsplit(url)
+        pool = wolf_client.Pool(split)
+        target = f"{split.path}?length=16&repeat=1&engine={engine}"
+        times = []
+        try:
+            for _ in range(requests):
+                start = time.perf_counter()
+                await pool.get(target)
+                times.append(time.perf_counter() - start)
+        finally:
+            pool.close()
+        return times
+    times = sorted(asyncio.run(run()))
+    return times[len(times) // 2] * 1000, times[len(times) * 99 // 100] * 1000
+
+class Results:
+    """
+    Measurements of one run, by dotted name, for the JSON report
+    """
+    __slots__ = ("meta", "metrics")
+
+    def __init__(self, meta: dict):
+        self.meta = meta
+        self.metrics = {}
+
+    def add(self, name: str, value: float, unit: str, better="higher") -> None:
+        self.metrics[name] = {"value": value, "unit": unit, "better": better}
+
+    def write(self, path) -> None:
+        with open(path, "w") as f:
+            json.dump({"meta": self.meta, "metrics": self.metrics}, f, indent=1, sort_keys=True)
+
+def run_info(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=pathlib.Path(__file__).parent, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "gil": gil_enabled(),
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "args": vars(args),
+    }
+
+def best_of(repeat: int, run) -> float:
+    return max(run() for _ in range(repeat))
+
+def engine_factories(words: list) -> dict:
+    """
+    Engine constructors taking a length in characters
+    """
+    factories = {
+        "rabbit": password_rabbit.Rabbit,
+        "marmot": password_marmot.Marmot,
+        "lemur": lambda length: password_lemur.Lemur(words, max(2, length // 4)),
+        "lemur-zipf": lambda length: password_lemur.Lemur(words, max(2, length // 4), alias.def_exponent),
+        "lemur-fit": lambda length: password_lemur.Lemur(words, max(2, length // 4), limits=fit_limits(max(2, length // 4))),
+        "phonetic": phonetic.Phonetic,
+    }
+    try:
+        import vectorized
+        factories["numpy"] = vectorized.rabbit
+    except ImportError:     # optional, the section just skips it
+        pass
+    return factories
+
+def engine_rate(make, length: int, qty: int) -> float:
+    """
+    Records per second for a fresh engine taking qty, setup included
+    """
+    start = time.perf_counter()
+    make(length).take(qty)
+    return qty / (time.perf_counter() - start)
+
+def engine_memory(make, length: int, qty: int) -> int:
+    """
+    Peak traced KB while a fresh engine takes qty records into a list
+    """
+    tracemalloc.start()
+    make(length).take(qty)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak // 1024
+
+def calls_per_sec(func, inputs: list) -> float:
+    start = time.perf_counter()
+    for args in inputs: func(*args)
+    return len(inputs) / (time.perf_counter() - start)
+
+def functions(qty: int, words: list) -> dict:
+    """
+    Calls per second of the functions the scripts use, on the same inputs each run
+    """
+    rng = random.Random(2)
+    rabbit_pwds = password_rabbit.Rabbit(def_length).take(qty)
+    marmot_pwds = password_marmot.Marmot(def_length).take(qty)
+    return {
+        "rabbit.gen_password": lambda: qty / timed(password_rabbit.gen_password, def_length, False, False, qty),
+        "rabbit.check_password": lambda: calls_per_sec(password_rabbit.check_password, [(p, False) for p in rabbit_pwds]),
+        "marmot.gen_password": lambda: qty / timed(password_marmot.gen_password, def_length, False, False, qty),
+        "marmot.replace_chars": lambda: calls_per_sec(password_marmot.replace_chars, [(p, rng.randrange(def_length), rng.randrange(def_length)) for p in marmot_pwds]),
+        "marmot.check_password": lambda: calls_per_sec(password_marmot.check_password, [(p, False) for p in marmot_pwds]),
+        "lemur.gen_passphrase": lambda: qty / timed(password_lemur.gen_passphrase, words, False, 3, qty),
+    }
+
+def random_draws(qty: int, words: list) -> dict:
+    """
+    qty calls of each kind of draw the engines make, per source of randomness
+    """
+    alphabet = password_rabbit.Rabbit(def_length).chars
+    out = {}
+    for source, rng in (("mt", random.Random()), ("system", random.SystemRandom()), ("pool", randpool.Pool())):
+        draws = {
+            "sample": lambda rng=rng: rng.sample(alphabet, def_length),
+            "choices": lambda rng=rng: rng.choices(alphabet, k=def_length),
+            "words": lambda rng=rng: rng.choices(words, k=4),
+            "shuffle": lambda rng=rng: rng.shuffle(list(alphabet[:def_length])),
+        }
+        for name, draw in draws.items():
+            out[f"{source}.{name}"] = lambda draw=draw: qty / timed(lambda: [draw() for _ in range(qty)])
+    table, rng = alias.Alias.for_words(words), randpool.Pool()
+    out["pool.words.zipf"] = lambda: qty / timed(lambda: [table.picks(rng, 4) for _ in range(qty)])
+    index = lengths.LengthIndex.for_words(words, 4, *fit_limits(4))
+    out["pool.words.fit"] = lambda: qty / timed(lambda: [index.pick(rng) for _ in range(qty)])
+    return out
+
+def fit_limits(number_of_words: int) -> tuple:
+    """
+    Length limits for the stand-in words (6 to 12 letters) a little under the average passphrase
+    """
+    return 7 * number_of_words, 9 * number_of_words
+
+def passphrase_entropy(words: list, number_of_words=4) -> dict:
+    """
+    Bits per passphrase of number_of_words words, uniform, at a few Zipf
+    exponents and within fit_limits
+    """
+    out = {"uniform": number_of_words * math.log2(len(words))}
+    out["fit"] = lengths.LengthIndex.for_words(words, number_of_words, *fit_limits(number_of_words)).entropy()
+    for exponent in (0.5, 1.0, -0.5):
+        table = alias.Alias.for_words(words, exponent)
+        out[f"zipf{exponent:+}.shannon"] = number_of_words * table.entropy()
+        out[f"zipf{exponent:+}.min"] = number_of_words * table.min_entropy()
+    return out
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def number(value: float) -> str:
+    return f"{value:,.0f}" if abs(value) >= 1000 else f"{value:.4g}"
+
+def compare(old_path, new_path, tolerance=def_tolerance) -> int:
+    """
+    Prints how every metric in both runs moved and returns how many got
+    worse by more than tolerance percent.  Fractions (rejection rates)
+    move by percentage points rather than relative to themselves.
+    """
+    with open(old_path) as f: old = json.load(f)
+    with open(new_path) as f: new = json.load(f)
+    print(f"\n\t{old['meta'].get('commit') or old_path} -> {new['meta'].get('commit') or new_path}, tolerance {tolerance}%\n")
+    regressions = 0
+    for name in sorted(old["metrics"].keys() & new["metrics"].keys()):
+        before, after = old["metrics"][name], new["metrics"][name]
+        if before["unit"] == "fraction":
+            change = (after["value"] - before["value"]) * 100
+            shown = f"{change:>+10.1f} pts"
+        elif before["value"]:
+            change = (after["value"] - before["value"]) / before["value"] * 100
+            shown = f"{change:>+10.1f}%   "
+        else:
+            continue
+        worse = -change if before["better"] == "higher" else change
+        flag = "REGRESSION" if worse > tolerance else ("better" if worse < -tolerance else "")
+        regressions += flag == "REGRESSION"
+        print(f"\t{shown}  {name:44} {number(before['value']):>12} -> {number(after['value']):<12} {before['unit']:10} {flag}")
+    skipped = len(old["metrics"].keys() ^ new["metrics"].keys())
+    if skipped: print(f"\n\t{skipped} metrics only in one of the runs, not compared")
+    print(f"\n\t{regressions} regression{'s' if regressions != 1 else ''}\n")
+    return regressions
+
+def cold_start(name: str) -> tuple:
+    """
+    Time in ms for a fresh interpreter to import passwords.py and the module
+    behind subcommand name, fastest of startup_runs, and which of
+    heavy_modules that pulled in
+    """
+    here = pathlib.Path(__file__).parent
+    best = None
+    for _ in range(startup_runs):
+        out = subprocess.run([sys.executable, "-c", startup_snippet, name, *heavy_modules], cwd=here, capture_output=True, text=True, check=True)
+        elapsed, *heavy = out.stdout.split()
+        best = float(elapsed) if best is None else min(best, float(elapsed))
+    return best, heavy
+
+def startup(budget=startup_budget_ms, results=None) -> bool:
+    """
+    Prints the import cost of every generator subcommand, returns True when
+    all of them are within budget and import nothing heavy
+    """
+    print(f"\tCold start, import budget {budget} ms\n")
+    ok = True
+    for name in startup_commands:
+        elapsed, heavy = cold_start(name)
+        within = elapsed <= budget and not heavy
+        ok = ok and within
+        if results is not None: results.add(f"startup.{name}.import", elapsed, "ms", "lower")
+        print(f"\t{name:10}{elapsed:>8.1f} ms  {'ok  ' if within else 'OVER'}  {' '.join(heavy)}")
+    print()
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the password generators')
+    parser.add_argument('-q', '--qty', type=int, default=def_qty, help='Records per thread, and per run of the reject and functions sections')
+    parser.add_argument('-t', '--threads', default=def_threads, help='Comma separated thread counts')
+    parser.add_argument('-w', '--workers', default=def_workers, help='Comma separated process pool sizes')
+    parser.add_argument('--sharded-qty', type=int, default=def_sharded_qty, help='Records per process pool run')
+    parser.add_argument('--words', type=int, default=def_words, help='Words in the stand-in dictionary for the load benchmark')
+    parser.add_argument('--corpus', type=int, default=def_corpus, help='Words in the stand-in corpus for the out-of-core build, 0 to skip')
+    parser.add_argument('--memory', type=int, default=def_memory_mb, help='Working memory in MB for the out-of-core build')
+    parser.add_argument('--api-qty', type=int, default=def_api_qty, help='Results in the large API response, 0 to skip')
+    parser.add_argument('--requests', type=int, default=def_requests, help='Requests per engine against the local service, 0 to skip')
+    parser.add_argument('-l', '--lengths', default=def_lengths, help='Comma separated lengths for the engines section')
+    parser.add_argument('-n', '--quantities', default=def_quantities, help='Comma separated quantities for the engines section')
+    parser.add_argument('-r', '--repeat', type=int, default=def_repeat, help='Runs per measurement, the best counts')
+    parser.add_argument('-s', '--sections', default=','.join(sections), help=f'Comma separated sections to run, from {",".join(sections)}')
+    parser.add_argument('-o', '--output', help='Write the results as JSON to this path')
+    parser.add_argument('--startup-only', action='store_true', help='Only check cold start against the budget, exit 1 when over')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two JSON results, exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=def_tolerance, help='Percent a metric may get worse before it counts as a regression')
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.tolerance) else 0)
+    if args.startup_only:
+        sys.exit(0 if startup() else 1)
+    chosen = set(args.sections.split(','))
+    if chosen - set(sections):
+        parser.error(f"unknown section {', '.join(sorted(chosen - set(sections)))}")
+    counts = [int(t) for t in args.threads.split(',')]
+    pools = [int(w) for w in args.workers.split(',')]
+    results = Results(run_info(args))
+    words = sample_words(args.words)
+
+    print(f"\n\tPython {sys.version.split()[0]}, GIL {'enabled' if gil_enabled() else 'disabled'}\n")
+
+    if "engines" in chosen:
+        print(f"\tEngines, best of {args.repeat}\n")
+        for name, make in engine_factories(words).items():
+            for length in (int(l) for l in args.lengths.split(',')):
+                for qty in (int(q) for q in args.quantities.split(',')):
+                    rate = best_of(args.repeat, lambda: engine_rate(make, length, qty))
+                    peak = engine_memory(make, length, qty)
+                    key = f"engines.{name}.len{length}.qty{qty}"
+                    results.add(f"{key}.rate", rate, "records/s")
+                    results.add(f"{key}.peak", peak, "KB", "lower")
+                    print(f"\t{name:8} len {length:>3} qty {qty:>8,} {rate:>12,.0f}/sec  peak {peak:>9,} KB")
+                engine = make(length)
+                if hasattr(engine, "acceptance_rate"):  # the engines with a reject loop
+                    engine.take(reject_sample)
+                    results.add(f"engines.{name}.len{length}.rejected", 1 - engine.acceptance_rate, "fraction", "lower")
+                    print(f"\t{name:8} len {length:>3} rejected {1 - engine.acceptance_rate:6.1%} of {engine.candidates:,} candidates")
+            print()
+
+    if "functions" in chosen:
+        print(f"\tFunctions, {args.qty:,} calls, best of {args.repeat}\n")
+        for name, run in functions(args.qty, words).items():
+            rate = best_of(args.repeat, run)
+            results.add(f"functions.{name}", rate, "calls/s")
+            print(f"\t{name:24}{rate:>14,.0f}/sec")
+        print()
+
+    if "random" in chosen:
+        print(f"\tRandom draws, {args.qty:,} calls, best of {args.repeat}\n")
+        for name, run in random_draws(args.qty, words).items():
+            rate = best_of(args.repeat, run)
+            results.add(f"random.{name}", rate, "calls/s")
+            print(f"\t{name:24}{rate:>14,.0f}/sec")
+        print(f"\n\tEntropy of a 4 word passphrase, {len(words):,} words ranked in list order\n")
+        for name, bits in passphrase_entropy(words).items():
+            results.add(f"random.entropy.{name}", bits, "bits")
+            print(f"\t{name:24}{bits:>14.1f} bits")
+        print()
+
+    if "threads" in chosen:
+        print("\tThreads, one engine each\n")
+        for name, make_engine in engines().items():
+            base = None
+            for threads in counts:
+                rate = thread_scaling(make_engine, threads, args.qty)
+                base = base or rate
+                results.add(f"threads.{name}.{threads}", rate, "records/s")
+                print(f"\t{name:8}{threads:>3} threads {rate:>14,.0f}/sec  x{rate / base:.2f}")
+            print()
+
+    if "reject" in chosen:
+        print("\tReject loop vs constructive\n")
+        for name, engine_class in (("rabbit", password_rabbit.Rabbit), ("marmot", password_marmot.Marmot)):
+            for length, spec_char in ((12, False), (12, True), (def_length, False)):
+                reject, constructive, accepted = constructive_vs_reject(engine_class, length, spec_char, args.qty)
+                flag = " -s" if spec_char else "   "
+                key = f"reject.{name}.len{length}{'.nospecial' if spec_char else ''}"
+                results.add(f"{key}.reject", reject, "records/s")
+                results.add(f"{key}.constructive", constructive, "records/s")
+                results.add(f"{key}.accepted", accepted, "fraction")
+                print(f"\t{name:8} len {length:>2}{flag}  accepted {accepted:6.1%}  reject {reject:>10,.0f}/sec  constructive {constructive:>10,.0f}/sec")
+            print()
+
+    if "dedupe" in chosen:
+        print(f"\tDedupe, {args.qty:,} records\n")
+        for name, (value, unit, better) in dedupe_rates(args.qty).items():
+            results.add(f"dedupe.{name}", value, unit, better)
+            print(f"\t{name:16}{value:>14,.1f} {unit}")
+        print()
+
+    if "screen" in chosen:
+        print(f"\tExpletive screen, {args.qty:,} passwords and {len(words):,} words, best of {args.repeat}\n")
+        for name, run in screen_rates(args.qty, words).items():
+            rate = best_of(args.repeat, run)
+            results.add(f"screen.{name}", rate, "texts/s")
+            print(f"\t{name:24}{rate:>14,.0f}/sec")
+        print()
+
+    if "marmot" in chosen:
+        print(f"\tMarmot transform chain, {args.qty:,} candidates, best of {args.repeat}\n")
+        for name, (value, unit, better) in marmot_chains(args.qty).items():
+            value = best_of(args.repeat, value) if callable(value) else value
+            results.add(f"marmot.{name}", value, unit, better)
+            print(f"\t{name:16}{value:>14,.1f} {unit}")
+        print()
+
+    if "load" in chosen:
+        print(f"\tWord list load, {args.words:,} words\n")
+        with tempfile.TemporaryDirectory() as tmp:
+            source = pathlib.Path(tmp, "dictionary.txt")
+            source.write_text('\n'.join(words) + '\n')
+            start = time.perf_counter()
+            wordlist.compile_words(source.read_text().splitlines(), source)
+            elapsed = time.perf_counter() - start
+            results.add("load.compile", elapsed, "s", "lower")
+            print(f"\tcompile {elapsed:>10.4f}s")
+            for mode in ("text", "mmap"):
+                result = word_list_load(mode, source)
+                results.add(f"load.{mode}.seconds", result["seconds"], "s", "lower")
+                results.add(f"load.{mode}.peak", result["maxrss_kb"], "KB", "lower")
+                print(f"\t{mode:8}{result['seconds']:>10.4f}s  peak rss {result['maxrss_kb']:>8,} KB")
+        print()
+
+    if "build" in chosen and args.corpus:
+        print(f"\tDictionary build, {args.corpus:,} word corpus, {args.memory} MB budget\n")
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = pathlib.Path(tmp, "corpus.txt")
+            rng = random.Random(1)
+            with open(corpus, "w") as f:
+                for _ in range(args.corpus): f.write(rng.choice(words) + "\n")
+            dictionary_build("memory", corpus, args.memory)     # warm the singular cache so both runs do the same work
+            builds = {mode: dictionary_build(mode, corpus, args.memory) for mode in ("memory", "stream")}
+            same = pathlib.Path(tmp, "memory.txt").read_bytes() == pathlib.Path(tmp, "stream.txt").read_bytes()
+        for mode, result in builds.items():
+            results.add(f"build.{mode}.seconds", result["seconds"], "s", "lower")
+            results.add(f"build.{mode}.peak", result["delta_kb"], "KB", "lower")
+            print(f"\t{mode:8}{result['seconds']:>10.4f}s  peak rss +{result['delta_kb']:>8,} KB")
+        within = builds["stream"]["delta_kb"] <= args.memory * 1024
+        print(f"\n\tidentical output: {same}, stream within budget: {within}\n")
+
+    if "api" in chosen and args.api_qty:
+        print(f"\tAPI client, {args.api_qty:,} results from a local stub\n")
+        here = pathlib.Path(__file__).parent
+        stub = subprocess.Popen([sys.executable, "-c", stub_snippet], cwd=here, stdout=subprocess.PIPE, text=True)
+        try:
+            url = f"http://127.0.0.1:{stub.stdout.readline().strip()}/api/"
+            for mode in ("buffered", "streamed"):
+                result = api_response(mode, url, args.api_qty)
+                results.add(f"api.{mode}.first", result["first"], "s", "lower")
+                results.add(f"api.{mode}.rate", result["count"] / result["seconds"], "records/s")
+                results.add(f"api.{mode}.peak", result["peak_kb"], "KB", "lower")
+                print(f"\t{mode:8}  first result {result['first']:>8.4f}s  {result['count'] / result['seconds']:>10,.0f}/sec  peak {result['peak_kb']:>9,} KB")
+        finally:
+            stub.terminate()
+            stub.wait()
+        print()
+
+    if "service" in chosen and args.requests:
+        print(f"\tLocal service, {args.requests:,} requests of one result per engine\n")
+        here = pathlib.Path(__file__).parent
+        server = subprocess.Popen([sys.executable, "wolf_server.py", "-p", "0"], cwd=here, stdout=subprocess.PIPE, text=True)
+        try:
+            port = next(line for line in server.stdout if "Serving" in line).rsplit(":", 1)[1].split("/")[0]
+            url = f"http://127.0.0.1:{port}/api/"
+            for engine in ("rabbit", "marmot", "lemur", "phonetic"):
+                p50, p99 = service_latency(url, engine, args.requests)
+                results.add(f"service.{engine}.p50", p50, "ms", "lower")
+                results.add(f"service.{engine}.p99", p99, "ms", "lower")
+                print(f"\t{engine:8}  p50 {p50:>7.3f} ms  p99 {p99:>7.3f} ms")
+        finally:
+            server.terminate()
+            server.wait()
+        print()
+
+    if "startup" in chosen:
+        startup(results=results)
+
+    if "pool" in chosen:
+        print(f"\tProcess pool, {os.cpu_count()} cores\n")
+        for name, engine_class in (("rabbit", password_rabbit.Rabbit), ("marmot", password_marmot.Marmot)):
+            base = None
+            for workers in pools:
+                rate = process_scaling(engine_class, (def_length, False), workers, args.sharded_qty)
+                base = base or rate
+                results.add(f"pool.{name}.{workers}", rate, "records/s")
+                print(f"\t{name:8}{workers:>3} workers {rate:>14,.0f}/sec  speedup x{rate / base:.2f}")
+            print()
+
+    if args.output:
+        results.write(args.output)
+        print(f"\tResults written to {args.output}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+import array
+import bisect
+import contextlib
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import pathlib
+import sys
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows, runs sharing a directory there must take turns
+    fcntl = None
+
+#####
+#
+set_memory_mb = 512             # most the exact in-run set may take, bigger runs use the Bloom filter
+max_load = 0.7                  # fill of the exact set before it grows
+def_error_rate = 1e-6           # share of new credentials the Bloom filter wrongly calls repeats
+flush_entries = 1 << 20         # hashes held in memory before they're written out as a sorted run, 8 bytes each
+merge_chunk = 1 << 16           # hashes written per call while merging runs
+key_file_name = "key"
+key_size = 32
+run_magic = b"PWRUN1" + (b"LE" if sys.byteorder == "little" else b"BE")
+#
+#####
+
+"""
+Uniqueness for bulk runs, in two parts with memory you can work out up front.
+
+Within a run every credential is reduced to a keyed 128 bit hash and
+checked against one of two structures, picked from the quantity:
+
+- HashSet, an open addressing table of the low 64 bits in a single
+  array, a power of two of 8 byte slots at most max_load full (11.5 to
+  23 bytes per credential).  Exact, bar a 64 bit collision, and a lot
+  quicker, so it's used whenever it fits in set_memory_mb.
+- Bloom, a bit array sized from the quantity and the false positive rate
+  you're willing to take, -n ln(p) / ln(2)^2 bits for n credentials:
+  about 29 bits (under 4 bytes) each at the default one in a million, so
+  100 million credentials is 360 MB whatever they look like.  A false
+  positive only means a fresh credential gets skipped and another is
+  drawn in its place, a repeat never gets through.
+
+Across runs, Index keeps a 64 bit keyed hash (blake2b) of every credential
+handed out, in a directory of sorted run files.  New hashes are held in
+memory, flush_entries at a time, then written as a run, and runs of
+similar size are merged so there are only ever about log2(total /
+flush_entries) of them.  Each run is mmapped and searched with bisect, so a
+lookup touches a few pages per run and the index costs nothing to open,
+8 bytes per credential on disk and only the pages in use in memory.  The
+key lives next to the runs; both are readable only by you, since without
+the key the hashes can't be checked against guesses.  Writing runs and
+merging them happens under an flock on the directory, after listing the
+runs again, so runs sharing a directory never write over each other.  At a billion
+entries the chance that a fresh credential collides with one of them is
+about 5e-11.
+
+    with Index("~/.passwords_issued") as index:
+        for p in Dedupe(qty, index).filter(Rabbit(20)): ...
+
+Scripts take -U (within the run) and -I DIR (across runs) with -f, see
+screened().
+"""
+
+mask64 = (1 << 64) - 1
+
+def fingerprint(record: str, key: bytes) -> int:
+    """
+    128 bit keyed hash of record, the low 64 bits are what the index stores
+    """
+    return int.from_bytes(hashlib.blake2b(record.encode(), digest_size=16, key=key).digest(), "little")
+
+class HashSet:
+    """
+    Set of 64 bit hashes in one array, linear probing, 0 marks an empty slot
+    """
+    __slots__ = ("slots", "mask", "count")
+
+    def __init__(self, capacity: int):
+        size = 1 << max(4, math.ceil(math.log2(max(1, capacity) / max_load)))
+        self.slots = array.array("Q", bytes(8 * size))
+        self.mask = size - 1
+        self.count = 0
+
+    @staticmethod
+    def bytes_for(capacity: int) -> int:
+        return 8 << max(4, math.ceil(math.log2(max(1, capacity) / max_load)))
+
+    def add(self, h: int) -> bool:
+        """
+        Adds hash h, True if it was there already
+        """
+        h = (h & mask64) or 1
+        slots, mask = self.slots, self.mask
+        i = h & mask
+        while True:
+            v = slots[i]
+            if v == h: return True
+            if not v: break
+            i = (i + 1) & mask
+        slots[i] = h
+        self.count += 1
+        if self.count > max_load * len(slots): self.grow()
+        return False
+
+    def __contains__(self, h: int) -> bool:
+        h = (h & mask64) or 1
+        slots, mask = self.slots, self.mask
+        i = h & mask
+        while (v := slots[i]):
+            if v == h: return True
+            i = (i + 1) & mask
+        return False
+
+    def grow(self) -> None:
+        """
+        Doubles the table, only when more went in than the capacity it was sized for
+        """
+        old = self.slots
+        self.slots = array.array("Q", bytes(16 * len(old)))
+        self.mask = len(self.slots) - 1
+        self.count = 0
+        for h in old:
+            if h: self.add(h)
+
+class Bloom:
+    """
+    Bloom filter over 128 bit hashes, k bit positions from the two halves
+    (Kirsch-Mitzenmacher), sized for capacity items at error_rate
+    """
+    __slots__ = ("bits", "size", "hashes", "capacity", "count")
+
+    def __init__(self, capacity: int, error_rate=def_error_rate):
+        self.capacity = max(1, capacity)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @property
+    def error_rate(self) -> float:
+        """
+        Expected false positive rate at the current fill
+        """
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def add(self, h: int) -> bool:
+        """
+        Adds hash h, True if it was (probably) there already.  Positions
+        step by the high half modulo size, so the sums stay small ints.
+        """
+        bits, size = self.bits, self.size
+        pos, step = (h & mask64) % size, (h >> 64) % size or 1
+        present = True
+        for _ in range(self.hashes):
+            bit = 1 << (pos & 7)
+            if not bits[pos >> 3] & bit:
+                present = False
+                bits[pos >> 3] |= bit
+            pos += step
+            if pos >= size: pos -= size
+        if not present: self.count += 1
+        return present
+
+    def __contains__(self, h: int) -> bool:
+        bits, size = self.bits, self.size
+        pos, step = (h & mask64) % size, (h >> 64) % size or 1
+        for _ in range(self.hashes):
+            if not bits[pos >> 3] & (1 << (pos & 7)): return False
+            pos += step
+            if pos >= size: pos -= size
+        return True
+
+class Run:
+    """
+    One sorted run file, mmapped, its hashes exposed as a memoryview of uint64
+    """
+    __slots__ = ("path", "map", "view")
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(run_magic)] != run_magic:
+            self.map.close()
+            raise ValueError(f"{path} is not an index run written on this kind of machine")
+        self.view = memoryview(self.map)[len(run_magic):].cast("Q")
+
+    def __len__(self):
+        return len(self.view)
+
+    def __contains__(self, h: int) -> bool:
+        view = self.view
+        i = bisect.bisect_left(view, h)
+        return i < len(view) and view[i] == h
+
+    def close(self) -> None:
+        self.view.release()
+        self.map.close()
+
+def write_run(path: pathlib.Path, chunks) -> None:
+    """
+    Writes the uint64 arrays in chunks, already in order, to path through a temp file
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    fd = os.open(tmp, os.O_CREAT | os.O_TRUNC | os.O_WRONLY, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(run_magic)
+        for chunk in chunks:
+            chunk.tofile(f)
+    os.replace(tmp, path)
+
+@contextlib.contextmanager
+def locked(path: pathlib.Path):
+    """
+    Exclusive flock on the directory at path for the length of the block
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if fcntl: fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)    # and the lock with it
+
+def merged(a: Run, b: Run):
+    """
+    The hashes of both runs in order, merge_chunk at a time
+    """
+    out = array.array("Q")
+    for h in heapq.merge(a.view, b.view):
+        out.append(h)
+        if len(out) >= merge_chunk:
+            yield out
+            out = array.array("Q")
+    yield out
+
+class Index:
+    """
+    Persistent set of 64 bit keyed hashes of issued credentials, see above.
+    add() only buffers, lookups see what's been flushed (Dedupe's Bloom
+    covers the current run), close() or leaving a with block flushes.
+    """
+    __slots__ = ("path", "key", "runs", "pending", "flush_entries")
+
+    def __init__(self, path, flush_entries=flush_entries):
+        self.path = pathlib.Path(path).expanduser()
+        self.path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with locked(self.path):
+            self.key = self.load_key()
+            self.runs = self.open_runs()
+        self.pending = array.array("Q")
+        self.flush_entries = flush_entries
+
+    def load_key(self) -> bytes:
+        """
+        The index's key, made the first time, called with the directory locked
+        """
+        path = self.path / key_file_name
+        if path.exists():
+            key = path.read_bytes()
+            if len(key) != key_size:
+                raise ValueError(f"{path} holds {len(key)} bytes, not a {key_size} byte key, the index can't be checked without it")
+            return key
+        key = os.urandom(key_size)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with os.fdopen(os.open(tmp, os.O_CREAT | os.O_TRUNC | os.O_WRONLY, 0o600), "wb") as f:
+            f.write(key)
+        os.replace(tmp, path)
+        return key
+
+    def open_runs(self) -> list:
+        return [Run(p) for p in sorted(self.path.glob("*.run"))]
+
+    def hash(self, record: str) -> int:
+        return fingerprint(record, self.key)
+
+    def __len__(self):
+        return sum(map(len, self.runs)) + len(self.pending)
+
+    def __contains__(self, h: int) -> bool:
+        h &= mask64
+        return any(h in run for run in self.runs)
+
+    def add(self, h: int) -> None:
+        self.pending.append(h & mask64)
+        if len(self.pending) >= self.flush_entries: self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered hashes out as a new run and merges runs of
+        similar size, with the directory locked and the runs listed again
+        since another process may have flushed since we last looked
+        """
+        if not self.pending: return
+        with locked(self.path):
+            for run in self.runs: run.close()
+            self.runs = self.open_runs()
+            seq = int(self.runs[-1].path.stem) + 1 if self.runs else 0
+            path = self.path / f"{seq:08d}.run"
+            write_run(path, [array.array("Q", sorted(self.pending))])
+            self.runs.append(Run(path))
+            self.pending = array.array("Q")
+            while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+                older, newer = self.runs[-2], self.runs[-1]
+                tmp = older.path.with_name(f".{older.path.name}.{os.getpid()}.merge")
+                write_run(tmp, merged(older, newer))
+                older.close()
+                newer.close()
+                os.replace(tmp, older.path)
+                os.remove(newer.path)
+                self.runs[-2:] = [Run(older.path)]
+
+    def close(self) -> None:
+        self.flush()
+        for run in self.runs: run.close()
+        self.runs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Dedupe:
+    """
+    Filters a stream of credentials down to ones not seen earlier in the
+    run (a HashSet, or a Bloom filter past set_memory_mb, sized for
+    capacity) and, given an Index, not issued by an earlier run; the ones
+    that get through are added to the index.  repeats and issued count
+    what was skipped.
+    """
+    __slots__ = ("seen", "index", "key", "repeats", "issued")
+
+    def __init__(self, capacity: int, index=None, error_rate=def_error_rate):
+        if HashSet.bytes_for(capacity) <= set_memory_mb << 20:
+            self.seen = HashSet(capacity)
+        else:
+            self.seen = Bloom(capacity, error_rate)
+        self.index = index
+        self.key = index.key if index is not None else os.urandom(32)
+        self.repeats = 0
+        self.issued = 0
+
+    def new(self, record: str) -> bool:
+        h = fingerprint(record, self.key)
+        if self.seen.add(h):
+            self.repeats += 1
+            return False
+        if self.index is not None:
+            if h in self.index:
+                self.issued += 1
+                return False
+            self.index.add(h)
+        return True
+
+    def filter(self, records):
+        new = self.new
+        for record in records:
+            if new(record): yield record
+
+@contextlib.contextmanager
+def screened(records, qty: int, issued=None, distinct=None):
+    """
+    records with repeats dropped and, given an index directory, anything
+    already issued too.  The index is saved and what was skipped reported
+    on the way out.  distinct, when the source knows it, is how many
+    different records it can produce; fewer than qty would never finish,
+    so that's a ValueError up front.
+
+        with screened(iter_passwords(20, False), qty, "~/.passwords_issued") as records:
+            stream_records(records, path, qty=qty)
+    """
+    if distinct is not None and distinct < qty:
+        raise ValueError(f"only {distinct:,} distinct values exist, asked for {qty:,}")
+    index = Index(issued) if issued else None
+    dedupe = Dedupe(qty, index)
+    try:
+        yield dedupe.filter(records)
+    finally:
+        if index is not None: index.close()
+        if dedupe.repeats or dedupe.issued:
+            print(f"\n\tSkipped {dedupe.repeats:,} repeats and {dedupe.issued:,} already issued", file=sys.stderr)
@@ -0,0 +1,87 @@
+import json
+import os
+import pathlib
+
+#####
+#
+chunk_size = 1 << 16    # bytes written per chunk while streaming
+timeout = 30            # seconds, connect and read
+#
+#####
+
+"""
+Conditional, resumable download of a single file.
+
+The body is streamed to <dest>.part in chunks and swapped into place with
+os.replace once it's complete, so dest is never half written.  Validators
+from the server (ETag, Last-Modified) are kept in <dest>.meta.json:
+
+- if dest exists we send If-None-Match / If-Modified-Since, and an
+  unchanged file costs a single 304
+- if a .part file is left over from an interrupted run we ask for the rest
+  of it with Range, guarded by If-Range so a changed file starts over
+
+    changed = fetch("https://example.com/popular.txt", "popular.txt")
+"""
+
+def meta_path(dest: pathlib.Path) -> pathlib.Path:
+    return dest.with_name(dest.name + ".meta.json")
+
+def part_path(dest: pathlib.Path) -> pathlib.Path:
+    return dest.with_name(dest.name + ".part")
+
+def read_meta(dest: pathlib.Path) -> dict:
+    try:
+        with open(meta_path(dest)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_meta(dest: pathlib.Path, meta: dict) -> None:
+    path = meta_path(dest)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+def validator(headers) -> dict:
+    return {k: headers[h] for k, h in (("etag", "ETag"), ("last_modified", "Last-Modified")) if h in headers}
+
+def fetch(url: str, dest, session=None, resume=True) -> bool:
+    """
+    Brings dest up to date with url.  Returns True if a new copy was written,
+    False if the server said ours is current (304).
+    """
+    dest = pathlib.Path(dest)
+    part = part_path(dest)
+    meta = read_meta(dest)
+    if session is None:
+        import requests     # slow to import, keep it off the path of scripts that only might download
+        session = requests.Session()
+    headers = {}
+    if dest.exists():
+        if "etag" in meta: headers["If-None-Match"] = meta["etag"]
+        if "last_modified" in meta: headers["If-Modified-Since"] = meta["last_modified"]
+    partial = meta.get("part", {})
+    if resume and part.exists() and partial:
+        headers["Range"] = f"bytes={part.stat().st_size}-"
+        headers["If-Range"] = partial.get("etag") or partial["last_modified"]
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 304:
+            return False
+        if r.status_code == 416:    # our .part is no good for this file, start over
+            part.unlink(missing_ok=True)
+            meta.pop("part", None)
+            write_meta(dest, meta)
+            return fetch(url, dest, session, resume=False)
+        r.raise_for_status()
+        meta["part"] = validator(r.headers)
+        if meta["part"]: write_meta(dest, meta)    # so an interrupted run can resume
+        with open(part, "ab" if r.status_code == 206 else "wb") as f:
+            for chunk in r.iter_content(chunk_size):
+                f.write(chunk)
+
+    os.replace(part, dest)
+    write_meta(dest, meta["part"])   # validators of the copy we now have
+    return True
@@ -0,0 +1,127 @@
+import bisect
+import collections
+import itertools
+import math
+import threading
+
+import randpool
+
+#####
+#
+separator = " "     # what Lemur joins words with, counted in the total length
+max_cached = 8      # indexes kept for reuse, least recently used dropped first
+#
+#####
+
+"""
+Passphrases whose total length, separators included, falls in [min_length,
+max_length], picked uniformly from every such passphrase in one pass, no
+drawing and retrying.
+
+Words are bucketed by length, and a count table built by dynamic
+programming over word lengths says how many sequences of j words add up to
+L letters:
+
+    counts[0][0] = 1
+    counts[j][L] = sum(len(buckets[l]) * counts[j - 1][L - l] for each word length l)
+
+Adding up counts[k][L] over the letter totals that fit gives total, the
+exact number of passphrases allowed, so the entropy of a pick is exactly
+log2(total) bits.  A pick is a single random number in range(total),
+unranked into its passphrase: it first chooses the letter total L, then
+for each word the length l (in proportion to how many ways the rest can
+be completed), then which word of that length.  Each step is a bisect over
+a cumulative table built with the counts, and counts are Python ints so
+nothing is rounded.
+
+    index = LengthIndex.for_words(words, 4, 20, 28)
+    ' '.join(index.pick(rng)), index.entropy(), index.total
+"""
+
+_indexes = collections.OrderedDict()   # (id(words), number_of_words, min_length, max_length): (words, index), as alias._tables
+_lock = threading.Lock()
+
+class LengthIndex:
+    """
+    Length buckets and count table for number_of_words word passphrases
+    between min_length and max_length characters, see above
+    """
+    __slots__ = ("number_of_words", "buckets", "counts", "starts", "letters", "steps", "total")
+
+    def __init__(self, words, number_of_words: int, min_length=0, max_length=None):
+        buckets = {}
+        for word in words:
+            buckets.setdefault(len(word), []).append(word)
+        k = number_of_words
+        spaces = (k - 1) * len(separator)
+        longest = k * max(buckets, default=0)
+        lo = max(0, min_length - spaces)
+        hi = min(longest, max_length - spaces) if max_length is not None else longest
+        counts = [[1] + [0] * hi]
+        for j in range(1, k + 1):
+            prev = counts[-1]
+            counts.append([sum(len(b) * prev[L - l] for l, b in buckets.items() if l <= L) for L in range(hi + 1)])
+        steps = {}      # (words left, letters left): (cumulative ways per first word length, those lengths)
+        for j in range(1, k + 1):
+            for L in range(hi + 1):
+                if not counts[j][L]: continue
+                lens = [l for l in sorted(buckets) if l <= L and counts[j - 1][L - l]]
+                steps[j, L] = (list(itertools.accumulate(len(buckets[l]) * counts[j - 1][L - l] for l in lens)), lens)
+        self.letters = [L for L in range(lo, hi + 1) if counts[k][L]]
+        self.starts = list(itertools.accumulate(counts[k][L] for L in self.letters))
+        self.total = self.starts[-1] if self.starts else 0
+        self.number_of_words = k
+        self.buckets = buckets
+        self.counts = counts
+        self.steps = steps
+
+    @classmethod
+    def for_words(cls, words, number_of_words: int, min_length=0, max_length=None):
+        """
+        Index for a word list, built once per list and limits like alias.Alias.for_words
+        """
+        key = (id(words), number_of_words, min_length, max_length)
+        with _lock:
+            cached = _indexes.get(key)
+            if cached is not None and cached[0] is words:
+                _indexes.move_to_end(key)
+                return cached[1]
+        index = cls(words, number_of_words, min_length, max_length)
+        with _lock:
+            _indexes[key] = (words, index)
+            _indexes.move_to_end(key)
+            while len(_indexes) > max_cached:
+                _indexes.popitem(last=False)
+        return index
+
+    def unrank(self, r: int) -> list:
+        """
+        The words of passphrase number r, r in range(total)
+        """
+        i = bisect.bisect_right(self.starts, r)
+        if i: r -= self.starts[i - 1]
+        L = self.letters[i]
+        counts, steps, buckets = self.counts, self.steps, self.buckets
+        out = []
+        for j in range(self.number_of_words, 0, -1):
+            cumulative, lens = steps[j, L]
+            i = bisect.bisect_right(cumulative, r)
+            if i: r -= cumulative[i - 1]
+            l = lens[i]
+            w, r = divmod(r, counts[j - 1][L - l])
+            out.append(buckets[l][w])
+            L -= l
+        return out
+
+    def pick(self, rng: randpool.Pool) -> list:
+        """
+        Words of one passphrase, uniform over every passphrase that fits
+        """
+        return self.unrank(rng.randrange(self.total))
+
+    def entropy(self) -> float:
+        """
+        Bits per passphrase, log2 of how many fit
+        """
+        return math.log2(self.total) if self.total else 0.0
+
@@ -0,0 +1,209 @@
+import atexit
+import bisect
+import os
+import threading
+
+#####
+#
+env_var = "PASSWORDS_METRICS"   # set to 1 to turn instrumentation on, or to a path to also write it there on exit
+latency_buckets = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+#
+#####
+
+"""
+Counters, gauges and latency histograms for the generators, exported as
+JSON or Prometheus text on demand.
+
+Hot paths check `enabled` once, when an engine starts iterating, and pick
+either their plain loop or a copy of it that times every stage, so with
+instrumentation off a candidate costs exactly what it did before.
+Everything that isn't a hot path (word list loads, API calls) checks it
+per call.  Turn it on with enable() or by setting PASSWORDS_METRICS:
+
+    PASSWORDS_METRICS=1 ...                 on, read it back with render()
+    PASSWORDS_METRICS=marmot.prom ...       on, written there when the process exits
+    PASSWORDS_METRICS=marmot.json ...       same, as JSON
+
+Metrics are families with optional labels, created on first use:
+
+    stage = histogram("marmot_stage_seconds", "Time in each step of the marmot chain", ("stage",))
+    stage.labels("shuffle").observe(seconds)
+
+Children are shared by every engine instance and every wolf_server worker
+thread that uses the same labels, so each one updates under its own lock
+(a `+=` on an attribute can lose counts between threads even with the
+GIL).  That is paid only with instrumentation on.
+"""
+
+enabled = False
+registry = {}
+_lock = threading.Lock()
+
+class Counter:
+    __slots__ = ("value", "lock")
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, n=1) -> None:
+        with self.lock:
+            self.value += n
+
+    def export(self):
+        return self.value
+
+class Gauge(Counter):
+    __slots__ = ()
+    kind = "gauge"
+
+    def set(self, value) -> None:
+        self.value = value
+
+    def dec(self, n=1) -> None:
+        with self.lock:
+            self.value -= n
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count", "lock")
+    kind = "histogram"
+
+    def __init__(self, bounds=latency_buckets):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)     # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self) -> list:
+        out, total = [], 0
+        with self.lock:
+            counts = list(self.counts)
+        for n in counts:
+            total += n
+            out.append(total)
+        return out
+
+    def export(self) -> dict:
+        bounds = [*map(str, self.bounds), "+Inf"]
+        with self.lock:
+            total, count = self.sum, self.count
+        return {"buckets": dict(zip(bounds, self.cumulative())), "sum": total, "count": count}
+
+class Family:
+    """
+    One named metric and its children, one child per set of label values
+    """
+    __slots__ = ("name", "help", "make", "kind", "labelnames", "children")
+
+    def __init__(self, name: str, help: str, make, labelnames=()):
+        self.name = name
+        self.help = help
+        self.make = make
+        self.kind = make().kind
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with _lock:
+                child = self.children.setdefault(values, self.make())
+        return child
+
+def family(name: str, help: str, make, labelnames=()) -> Family:
+    f = registry.get(name)
+    if f is None:
+        with _lock:
+            f = registry.setdefault(name, Family(name, help, make, labelnames))
+    return f
+
+def counter(name: str, help: str, labelnames=()) -> Family:
+    return family(name, help, Counter, labelnames)
+
+def gauge(name: str, help: str, labelnames=()) -> Family:
+    return family(name, help, Gauge, labelnames)
+
+def histogram(name: str, help: str, labelnames=(), buckets=latency_buckets) -> Family:
+    return family(name, help, lambda: Histogram(buckets), labelnames)
+
+def engine_counters(engine: str) -> tuple:
+    """
+    (candidates, accepted, rejected) counters of a generate-and-check engine
+    """
+    return (counter("engine_candidates_total", "Candidate passwords generated, by engine", ("engine",)).labels(engine),
+            counter("engine_accepted_total", "Candidates that passed the policy check", ("engine",)).labels(engine),
+            counter("engine_rejected_total", "Candidates that failed the policy check", ("engine",)).labels(engine))
+
+def snapshot() -> dict:
+    """
+    Everything recorded so far, as plain data for JSON
+    """
+    out = {}
+    for name, f in sorted(registry.items()):
+        values = [{"labels": dict(zip(f.labelnames, key)), "value": child.export()} for key, child in list(f.children.items())]
+        out[name] = {"type": f.kind, "help": f.help, "values": values}
+    return out
+
+def label_text(names: tuple, values: tuple, le=None) -> str:
+    pairs = [(n, str(v).replace("\\", r"\\").replace('"', r'\"').replace("\n", r"\n")) for n, v in zip(names, values)]
+    if le is not None: pairs.append(("le", le))
+    return "{" + ",".join(f'{n}="{v}"' for n, v in pairs) + "}" if pairs else ""
+
+def prometheus() -> str:
+    """
+    Everything recorded so far in the Prometheus text exposition format
+    """
+    lines = []
+    for name, f in sorted(registry.items()):
+        lines.append(f"# HELP {name} {f.help}")
+        lines.append(f"# TYPE {name} {f.kind}")
+        for key, child in list(f.children.items()):
+            if child.kind == "histogram":
+                for bound, total in zip([*map(repr, child.bounds), "+Inf"], child.cumulative()):
+                    lines.append(f"{name}_bucket{label_text(f.labelnames, key, bound)} {total}")
+                lines.append(f"{name}_sum{label_text(f.labelnames, key)} {child.sum!r}")
+                lines.append(f"{name}_count{label_text(f.labelnames, key)} {child.count}")
+            else:
+                lines.append(f"{name}{label_text(f.labelnames, key)} {child.value}")
+    return "\n".join(lines) + "\n"
+
+def render(fmt="json") -> str:
+    if fmt == "prometheus": return prometheus()
+    import json     # only when asked for, every engine imports this module
+    return json.dumps(snapshot(), indent=1)
+
+def export(path) -> None:
+    """
+    Writes everything to path, Prometheus text for .prom and .txt, JSON otherwise
+    """
+    fmt = "prometheus" if str(path).endswith((".prom", ".txt")) else "json"
+    with open(path, "w") as f:
+        f.write(render(fmt))
+
+def enable(path=None) -> None:
+    """
+    Turns instrumentation on, for engines that start iterating from now on.
+    With a path, everything is written there when the process exits.
+    """
+    global enabled
+    enabled = True
+    if path: atexit.register(export, path)
+
+def disable() -> None:
+    global enabled
+    enabled = False
+
+if os.environ.get(env_var):
+    enable(None if os.environ[env_var] == "1" else os.environ[env_var])
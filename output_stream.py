@@ -0,0 +1,106 @@
+import io
+import itertools
+import sys
+import time
+from typing import Iterable
+
+#####
+#
+chunk_size = 1 << 16    # characters buffered before each write to the sink
+formats = ("lines", "ndjson", "csv")
+def_format = "lines"
+#
+#####
+
+"""
+Streaming output for bulk runs.  Records are written as they are produced,
+a chunk at a time, so memory stays flat no matter how large qty is.
+A path of '-' writes to stdout so the output can be piped elsewhere.
+
+    count, elapsed = stream_records(iter_passwords(25, False), "out.csv", "csv", qty=1_000_000)
+    report_rate(count, elapsed, "out.csv")
+"""
+
+def open_sink(path: str):
+    """
+    Returns a text handle for the output path, or stdout when path is '-'.
+    newline='' keeps the csv module in charge of its own line endings.
+    """
+    if str(path) == "-":
+        return sys.stdout
+    return open(path, "w", newline="", encoding="utf-8")
+
+def stream_records(records: Iterable[str], path: str, fmt=def_format, field="password", qty=None) -> tuple:
+    """
+    Writes records to path in the chosen format, flushing the buffer every
+    chunk_size characters.  If qty is given we stop after that many records,
+    which lets callers hand us an endless generator.
+    Returns a tuple of (records written, seconds elapsed).
+    """
+    if fmt not in formats:
+        raise ValueError(f"unknown format {fmt!r}, choose from {', '.join(formats)}")
+    sink = open_sink(path)
+    buf = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        import csv  # imported for the format that needs it, or it shows in every cold start
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(("id", field))
+    elif fmt == "ndjson":
+        import json
+        dumps = json.dumps
+    count = 0
+    start = time.perf_counter()
+    try:
+        if qty is not None: records = itertools.islice(records, qty)     # checked before a record is written, so qty 0 writes none
+        for count, record in enumerate(records, start=1):
+            if fmt == "lines":
+                buf.write(record)
+                buf.write("\n")
+            elif fmt == "ndjson":
+                buf.write(dumps({"id": count, field: record}))
+                buf.write("\n")
+            else:
+                writer.writerow((count, record))
+            if buf.tell() >= chunk_size:
+                sink.write(buf.getvalue())
+                buf.seek(0)
+                buf.truncate()
+        sink.write(buf.getvalue())
+        sink.flush()
+    finally:
+        if sink is not sys.stdout: sink.close()
+    return count, time.perf_counter() - start
+
+def stream_blocks(blocks: Iterable[bytes], path: str) -> tuple:
+    """
+    Writes blocks of already encoded lines (eg vectorized.Vectorized.blocks)
+    straight to path with no per record work.  Returns the same tuple as
+    stream_records, records counted by newline.
+    """
+    if str(path) == "-":
+        sys.stdout.flush()
+        sink = sys.stdout.buffer
+    else:
+        sink = open(path, "wb")
+    count = 0
+    start = time.perf_counter()
+    try:
+        for block in blocks:
+            sink.write(block)
+            count += block.count(b"\n")
+        sink.flush()
+    finally:
+        if sink is not sys.stdout.buffer: sink.close()
+    return count, time.perf_counter() - start
+
+def report_rate(count: int, elapsed: float, path: str) -> None:
+    """
+    Prints how many records went where and the sustained records per second.
+    When the records went to stdout the report goes to stderr so it doesn't
+    end up mixed into the output.
+    """
+    rate = count / elapsed if elapsed > 0 else float("inf")
+    where = "stdout" if str(path) == "-" else path
+    out = sys.stderr if str(path) == "-" else sys.stdout
+    print(f"\n\tWritten {count:,} to {where} ({rate:,.0f} records/sec)\n\n", file=out)
@@ -13,14 +13,14 @@ Features:
 
 
 import random
-import os
 import argparse
 import sys
 import pathlib
-import requests
-
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
-requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+import itertools
+from output_stream import stream_records, stream_blocks, report_rate, formats, def_format
+import phonetic
+import profiling
+from terminal import clear
 
 #####
 #
@@ -29,6 +29,8 @@ max_qty = 20
 def_number_of_words = 6
 min_number_of_words = 2
 max_number_of_words = max_qty
+# with -P there is no API and so no 16 word phonetic field to cut from
+max_phonetic_words = 1000
 #
 # Change to 'on' or 'off' to enable or disable each:
 upper = 'on'
@@ -48,10 +50,17 @@ qty = 9
 # ie...exclude = r"@!<>|[]{}/?&^,`)(" 
 exclude = ""
 #
+# API to call, anything serving the same /api/?length=..&repeat=.. JSON works
+api_url = "https://passwordwolf.com/api/"
+#
+# Serve API results from a local prefetched stock (see reservoir.py) so
+# runs don't wait on the network, same as passing -R
+use_reservoir = False
+#
 #####
 
 """
-usage: passphrase_genut.py [-h] -q QTY [-n NUM] [-c] [-f] [-o]
+usage: passphrase_genut.py [-h] -q QTY [-n NUM] [-c] [-f] [-o] [-O OUTPUT] [--format {lines,ndjson,csv}] [-P] [-R] [--profile]
 
 Generate passphrases when passed a quantity. Writing to file will override other options
 (ie...copy) unless qty = 1
@@ -63,6 +72,12 @@ options:
   -c, --copy         Copy passphrase to clipboard
   -f, --file         Write passphrases to file
   -o, --obfuscate    Obfuscates passphrase output to stdout
+  -O OUTPUT, --output OUTPUT
+                     Path to stream passphrases to with -f, '-' for stdout
+  --format {lines,ndjson,csv}
+                     Output format used with -f
+  -P, --phonetic     Generate phonetic passphrases locally instead of calling the API
+  -R, --reservoir    Take API results from the local prefetched reservoir
 
 """
 
@@ -73,12 +88,6 @@ passphrases_file_name = "passphrases.txt"
 passphrases_full_path = pathlib.Path.joinpath(local_path, passphrases_file_name)
 
 
-def clear() -> None:
-    """
-    Clears the terminal screen. Uses 'cls' for Windows and 'clear' for Unix/Linux.
-    """
-    os.system("cls" if os.name == "nt" else "clear")
-
 def argue_with_me() -> tuple:
     """
     Parses command-line arguments to customize passphrase generation.
@@ -87,7 +96,8 @@ def argue_with_me() -> tuple:
     the number of words per passphrase, and flags for copying to clipboard, writing to file, and obfuscating output.
 
     Returns:
-        tuple: A tuple containing the parsed number of words, quantity, copy flag, file flag, and obfuscate flag.
+        tuple: A tuple containing the parsed number of words, quantity, copy flag, file flag, obfuscate flag,
+            output path, output format, local flag and reservoir flag.
     """
     parser = argparse.ArgumentParser(description='Generate passphrases when passed a quantity.  Writing to file will override other options (ie...copy) unless qty = 1')
     parser.add_argument('-q', '--qty', type=int, help='Number of passphrases to generate', required=True)
@@ -95,13 +105,22 @@ def argue_with_me() -> tuple:
     parser.add_argument('-c', '--copy', action='store_true', help='Copy passphrase to clipboard', required=False)
     parser.add_argument('-f', '--file', action='store_true', help='Write passphrases to file', required=False)
     parser.add_argument('-o', '--obfuscate', action='store_true', help='Obfuscates passphrase output to stdout', required=False)
+    parser.add_argument('-O', '--output', help="Path to stream passphrases to with -f, '-' for stdout", required=False)
+    parser.add_argument('--format', choices=formats, default=def_format, help='Output format used with -f', required=False)
+    parser.add_argument('-P', '--phonetic', action='store_true', help='Generate phonetic passphrases locally instead of calling the API', required=False)
+    parser.add_argument('-R', '--reservoir', action='store_true', help='Take API results from the local prefetched reservoir', required=False)
+    parser.add_argument('--profile', action='store_true', help='Write cProfile, tracemalloc and collapsed stack reports next to the passphrases file', required=False)
     args = parser.parse_args()
     qty = args.qty
     copy = args.copy
     file = args.file
     obfuscate = args.obfuscate
     number_of_words = 3 if not args.num else args.num
-    return number_of_words, qty, copy, file, obfuscate
+    output = args.output
+    fmt = args.format
+    local = args.phonetic
+    reserve = args.reservoir or use_reservoir
+    return number_of_words, qty, copy, file, obfuscate, output, fmt, local, reserve
 
 def dialog_qty() -> tuple:
     """
@@ -171,7 +190,7 @@ def dialog_copy(copy: bool, n=1) -> None:
             p = passphrases.get(p2c)
         copy_pwd(p, p2c) if copy else print(f"\n\n\tYour passphrase is: {p}\n\n")
 
-def password_wolf(length: int, numbers: int, upper: str, lower: str, special: str, exclude: str, qty: int) -> list:
+def password_wolf(length: int, numbers: int, upper: str, lower: str, special: str, exclude: str, qty: int, reserve=False, stream=False) -> list:
     """
     Fetches passwords from the Password Wolf API based on specified parameters.
 
@@ -183,12 +202,24 @@ def password_wolf(length: int, numbers: int, upper: str, lower: str, special: st
         special (str): Enable or disable special characters in the password.
         exclude (str): Characters to exclude from the password.
         qty (int): The quantity of passwords to fetch.
+        reserve (bool): Claim results from the local reservoir first, see reservoir.claim.
+        stream (bool): Return an iterator that yields results as the response is parsed, see wolf_client.stream.
+
+    Large quantities are split into concurrent chunked requests over pooled keep-alive connections, with
+    timeouts and retries, see wolf_client.  Streaming makes one request instead and hands over each result
+    as soon as it arrives, without holding the whole response in memory.
 
     Returns:
         list: A list of dictionaries, each containing a password and its phonetic representation.
     """
-    URL = f"https://passwordwolf.com/api/?length={length}&numbers={numbers}&upper={upper}&lower={lower}&special={special}&exclude={exclude}&repeat={qty}"
-    passwords = requests.get(URL, verify=False).json()
+    settings = dict(length=length, numbers=numbers, upper=upper, lower=lower, special=special, exclude=exclude)
+    import wolf_client  # asyncio and ssl, not needed with -P
+    if reserve:
+        import reservoir
+        return reservoir.claim(qty, api_url, **settings)
+    if stream:
+        return wolf_client.stream(qty, api_url, **settings)
+    passwords = wolf_client.fetch(qty, api_url, **settings)
     return passwords
 
 def gen_passphrase(word_list: list, file: bool, number_of_words: int, qty=1) -> None:
@@ -204,11 +235,49 @@ def gen_passphrase(word_list: list, file: bool, number_of_words: int, qty=1) ->
         number_of_words (int): The number of words to include in each passphrase.
         qty (int): The number of passphrases to generate.
     """
-    for i, p in enumerate(word_list, start=1):
+    for i, p in enumerate(iter_passphrases(word_list, number_of_words), start=1):
+        passphrases[i] = p
+
+    if file: write_file(passphrases.values(), qty)
+
+def iter_passphrases(word_list: list, number_of_words: int):
+    """
+    Yields one passphrase per API result, so results can be streamed straight to a file.
+
+    Parameters:
+        word_list (list): A list of dictionaries containing phonetic representations of passwords.
+        number_of_words (int): The number of words to include in each passphrase.
+    """
+    for p in word_list:
         words = p['phonetic'].split()  # Split the phonetic string into a list of words
-        passphrases[i] = ' '.join(words[:number_of_words])  # Join the first 'number_of_words' back into a string
-    
-    if file: write_file(passphrases)
+        yield ' '.join(words[:number_of_words])  # Join the first 'number_of_words' back into a string
+
+class Genut:
+    """
+    Passphrase generator as an object with a lazy, endless iterator.
+
+    Results are pulled from the Password Wolf API a batch at a time as the iterator is consumed. Nothing is
+    shared between instances, so each thread in a pool can hold its own.
+
+    Parameters:
+        number_of_words (int): The number of words to include in each passphrase.
+        batch (int): How many results to request from the API per call.
+    """
+    __slots__ = ("number_of_words", "batch")
+
+    def __init__(self, number_of_words=def_number_of_words, batch=max_qty):
+        self.number_of_words = number_of_words
+        self.batch = batch
+
+    def __iter__(self):
+        while True:
+            yield from iter_passphrases(password_wolf(length, numbers, upper, lower, special, exclude, self.batch), self.number_of_words)
+
+    def take(self, n: int) -> list:
+        """
+        Returns a list of the next n passphrases.
+        """
+        return list(itertools.islice(self, n))
 
 def copy_pwd(p: str, n: int) -> None:
     """
@@ -234,19 +303,22 @@ def copy_pwd(p: str, n: int) -> None:
         print(f"\n\n\tYour passphrase is: {p}\n\n")
         sys.exit()
 
-def write_file(passphrases: dict) -> None:
+def write_file(records, qty: int, output=None, fmt=def_format) -> None:
     """
-    Writes the generated passphrases to a file.
+    Streams the generated passphrases to a file.
 
-    Saves all generated passphrases to a predefined file location. The file path is determined based on the script's
-    location and a predefined filename. Each passphrase is written on a new line.
+    Passphrases are written in buffered chunks as they are produced, to the predefined file location next to
+    the script unless an output path is given ('-' for stdout), and the sustained rate is reported.
 
     Parameters:
-        passphrases (dict): A dictionary of passphrases to write, with keys as identifiers and values as passphrase strings.
+        records (iterable): The passphrases to write, in order.
+        qty (int): The number of passphrases to write.
+        output (str): Path to write to, defaults to passphrases.txt next to the script.
+        fmt (str): One of lines, ndjson or csv.
     """
-    with open(passphrases_full_path, 'w') as file:
-        file.write('\n'.join(list(passphrases.values()))+'\n')
-    print(f"\n\tWritten to {passphrases_full_path}\n\n")
+    output = output or passphrases_full_path
+    count, elapsed = stream_records(records, output, fmt, field="passphrase", qty=qty)
+    report_rate(count, elapsed, output)
 
 
 def main():
@@ -261,12 +333,16 @@ def main():
     copy = True
     file = False
     obfuscate = False
+    output = None
+    fmt = def_format
+    local = False
+    reserve = use_reservoir
     number_of_words = def_number_of_words
 
     # Check for arguments, send to function if > 1 or > 2 or -h.
     # Otherwise generates passphrases
     if len(sys.argv) > 2:
-        number_of_words, qty, copy, file, obfuscate = argue_with_me()
+        number_of_words, qty, copy, file, obfuscate, output, fmt, local, reserve = argue_with_me()
     elif len(sys.argv) > 1: # will simply send help to the user
         argue_with_me()
     else:
@@ -276,24 +352,42 @@ def main():
             if qty:
                 loop = False
 
-    if number_of_words > max_number_of_words:
+    # notices go to stderr, stdout may be the passphrases (-f -O -)
+    most = max_phonetic_words if local else max_number_of_words
+    if number_of_words > most:
         number_of_words = def_number_of_words
-        print(f"\n\n\tMaximum number of words is {max_number_of_words}, using default of {number_of_words}\n\n")
+        print(f"\n\n\tMaximum number of words is {most}, using default of {number_of_words}\n\n", file=sys.stderr)
     elif number_of_words < min_number_of_words:
         number_of_words = def_number_of_words
-        print(f"\n\n\tMinimum number of words is {min_number_of_words}, using default of {number_of_words}\n\n")
-
-    passwords = password_wolf(length, numbers, upper, lower, special, exclude, qty)
+        print(f"\n\n\tMinimum number of words is {min_number_of_words}, using default of {number_of_words}\n\n", file=sys.stderr)
+
+    # Locally, each passphrase is a password of exactly number_of_words characters
+    # spelled out (see phonetic), so there's no network call and no 16 word limit
+    if local and file:
+        gen = phonetic.Phonetic(number_of_words, upper, lower, numbers, special, exclude)
+        if fmt == "lines":
+            # whole batches rendered as one string and written as bytes, see phonetic.render_lines
+            output = output or passphrases_full_path
+            count, elapsed = stream_blocks(gen.blocks(qty), output)
+            report_rate(count, elapsed, output)
+        else:
+            write_file(iter(gen), qty, output, fmt)
+        return
+    elif local:
+        passwords = phonetic.generate(qty, number_of_words, upper, lower, numbers, special, exclude)
+    else:
+        # writing to a file starts with the first result instead of waiting for all of them
+        passwords = password_wolf(length, numbers, upper, lower, special, exclude, qty, reserve, stream=file)
 
-    if qty == 1:
+    if file:
+        write_file(iter_passphrases(passwords, number_of_words), qty, output, fmt)
+    elif qty == 1:
         gen_passphrase(passwords, file, number_of_words)
         p = passphrases.get(1)
         if copy:
             copy_pwd(p, 1)
         else:
-            print(p if not file else '') # to capture from stdout out let's just dump the passphrase.
-    elif file:
-        gen_passphrase(passwords, file, number_of_words, qty)
+            print(p) # to capture from stdout out let's just dump the passphrase.
     else:
         gen_passphrase(passwords, file, number_of_words, qty)
         print()
@@ -303,4 +397,4 @@ def main():
         dialog_copy(copy, n=qty)
 
 if __name__ == "__main__":
-    main()
+    profiling.main(main, passphrases_full_path)
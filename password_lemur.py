@@ -1,13 +1,16 @@
 import random
-import os
 import argparse
 import sys
 import pathlib
-import requests
-import inflect
-
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
-requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+import itertools
+import math
+from output_stream import stream_records, report_rate, formats, def_format
+import wordlist
+import randpool
+import alias
+import lengths
+import profiling
+from terminal import clear
 
 
 #####
@@ -19,13 +22,15 @@ min_number_of_words = 2
 max_number_of_words = 6
 passphrases_file_name = "passphrases.txt"
 word_list_file_name = "dictionary.txt"
+source_file_name = "popular.txt"
 expletive_file_name = "english_expletive.txt"
+pick_batch = 256        # passphrases' worth of weighted word picks drawn at once
 word_list_url = "https://github.com/dolph/dictionary/raw/master/popular.txt"
 #
 #####
 
 """
-usage: passphrase_lemur.py [-h] -q QTY [-n NUM] [-c] [-f] [-o]
+usage: passphrase_lemur.py [-h] -q QTY [-n NUM] [-c] [-f] [-o] [-O OUTPUT] [--format {lines,ndjson,csv}] [-u] [-W [WEIGHT]] [-m MIN_LENGTH] [-M MAX_LENGTH] [-U] [-I ISSUED] [--profile]
 
 Generate passphrases when passed a quantity. Writing to file will override other options
 (ie...copy) unless qty = 1
@@ -37,6 +42,20 @@ options:
   -c, --copy         Copy passphrase to clipboard
   -f, --file         Write passphrases to file
   -o, --obfuscate    Obfuscates passphrase output to stdout
+  -O OUTPUT, --output OUTPUT
+                     Path to stream passphrases to with -f, '-' for stdout
+  --format {lines,ndjson,csv}
+                     Output format used with -f
+  -u, --update       Check upstream for a newer word list and rebuild the dictionary if there is one
+  -W [WEIGHT], --weight [WEIGHT]
+                     Pick words by popularity, Zipf exponent (default 1.0), negative favours rare words
+  -m MIN_LENGTH, --min-length MIN_LENGTH
+                     Fewest characters in a passphrase, spaces included
+  -M MAX_LENGTH, --max-length MAX_LENGTH
+                     Most characters in a passphrase, spaces included
+  -U, --unique       Skip repeats within the run, with -f
+  -I ISSUED, --issued ISSUED
+                     Directory indexing every credential already issued, with -f anything in it is skipped and the new ones are added
 
 """
 
@@ -45,11 +64,9 @@ passphrases = {}
 local_path = pathlib.Path(__file__).parent
 passphrases_full_path = pathlib.Path.joinpath(local_path, passphrases_file_name)
 word_list_full_path = pathlib.Path.joinpath(local_path, word_list_file_name)
+source_full_path = pathlib.Path.joinpath(local_path, source_file_name)
 expletive_full_path = pathlib.Path.joinpath(local_path, expletive_file_name)
 
-def clear() -> None:
-    os.system("cls" if os.name == "nt" else "clear")
-
 def argue_with_me() -> tuple:
     """
     This is called if there are arguments passed to the script via cli,
@@ -62,26 +79,114 @@ def argue_with_me() -> tuple:
     parser.add_argument('-c', '--copy', action='store_true', help='Copy passphrase to clipboard', required=False)
     parser.add_argument('-f', '--file', action='store_true', help='Write passphrases to file', required=False)
     parser.add_argument('-o', '--obfuscate', action='store_true', help='Obfuscates passphrase output to stdout', required=False)
+    parser.add_argument('-O', '--output', help="Path to stream passphrases to with -f, '-' for stdout", required=False)
+    parser.add_argument('--format', choices=formats, default=def_format, help='Output format used with -f', required=False)
+    parser.add_argument('-u', '--update', action='store_true', help='Check upstream for a newer word list and rebuild the dictionary if there is one', required=False)
+    parser.add_argument('-W', '--weight', type=float, nargs='?', const=alias.def_exponent, help=f'Pick words by popularity, Zipf exponent (default {alias.def_exponent}), negative favours rare words', required=False)
+    parser.add_argument('-m', '--min-length', type=int, help='Fewest characters in a passphrase, spaces included', required=False)
+    parser.add_argument('-M', '--max-length', type=int, help='Most characters in a passphrase, spaces included', required=False)
+    parser.add_argument('-U', '--unique', action='store_true', help='Skip repeats within the run, with -f', required=False)
+    parser.add_argument('-I', '--issued', help='Directory indexing every credential already issued, with -f anything in it is skipped and the new ones are added', required=False)
+    parser.add_argument('--profile', action='store_true', help='Write cProfile, tracemalloc and collapsed stack reports next to the passphrases file', required=False)
     args = parser.parse_args()
     qty = args.qty
     copy = args.copy
     file = args.file
     obfuscate = args.obfuscate
     number_of_words = 3 if not args.num else args.num
-    return number_of_words, qty, copy, file, obfuscate
+    output = args.output
+    fmt = args.format
+    update = args.update
+    weight = args.weight
+    limits = (args.min_length or 0, args.max_length) if args.min_length or args.max_length else None
+    unique = args.unique
+    issued = args.issued
+    return number_of_words, qty, copy, file, obfuscate, output, fmt, update, weight, limits, unique, issued
 
-def gen_passphrase(word_list: list, file: bool, number_of_words: int, qty=1) -> None:
+def gen_passphrase(word_list: list, file: bool, number_of_words: int, qty=1, weight=None, limits=None) -> None:
     """
-    Generate passphrases using the word list provided.
+    Generate passphrases using the word list provided, skipping any that
+    already came up in this batch since words are picked independently.
+    ValueError if fewer than qty distinct passphrases exist, the skipping
+    would never finish.
     Dictionary looks like:
     { 1: "word word word", 2: "word word word", 3: "word word word" }
     """
-    i = 1
-    while len(passphrases) < qty: # build a dict of passphrases
-        pwd = ' '.join(random.choices(word_list, k=number_of_words))
-        passphrases[i] = pwd  # add it to the dict
-        i += 1  # increment the count which is used as key in dict
-    if file: write_file(passphrases)
+    lemur = Lemur(word_list, number_of_words, weight, limits)
+    if lemur.distinct < qty:
+        raise ValueError(f"only {lemur.distinct:,} distinct passphrases fit, asked for {qty:,}")
+    seen = set()
+    fresh = (p for p in lemur if not (p in seen or seen.add(p)))
+    for i, pwd in enumerate(itertools.islice(fresh, qty), start=1):
+        passphrases[i] = pwd  # add it to the dict, i is used as key in dict
+    if file: write_file(passphrases.values(), qty)
+
+def iter_passphrases(word_list: list, number_of_words: int, weight=None, limits=None):
+    """
+    Endless generator of passphrases from the word list, used directly
+    when streaming to a file so nothing piles up in memory.
+    """
+    return iter(Lemur(word_list, number_of_words, weight, limits))
+
+def report_entropy(lemur) -> None:
+    """
+    Prints the entropy of a passphrase from a weighted or length limited
+    Lemur, next to a uniform pick from the same list, on stderr so stdout
+    stays clean
+    """
+    k = lemur.number_of_words
+    uniform = k * math.log2(len(lemur.word_list))
+    if lemur.alias is not None:
+        table = lemur.alias
+        print(f"\n\tEntropy {k * table.entropy():.1f} bits per passphrase ({uniform:.1f} uniform), min-entropy {k * table.min_entropy():.1f} bits", file=sys.stderr)
+    else:
+        index = lemur.index
+        print(f"\n\tEntropy {index.entropy():.1f} bits per passphrase ({uniform:.1f} without length limits), {index.total:,} passphrases fit", file=sys.stderr)
+
+class Lemur:
+    """
+    The passphrase generator as an object.  The word list is only read,
+    and each instance has its own randpool.Pool, so one loaded word list can be
+    shared by instances running in different threads.  With a weight, words
+    are picked by popularity through an alias.Alias table built once here,
+    see alias for what the exponent means.  With limits, (min, max)
+    characters with max None for no limit, passphrases are picked uniformly
+    from the ones that fit through a lengths.LengthIndex.  The two don't
+    combine, and ValueError is raised when nothing fits.  distinct is how
+    many different passphrases can come out, exact with limits.
+    """
+    __slots__ = ("word_list", "number_of_words", "rng", "alias", "index", "distinct")
+
+    def __init__(self, word_list: list, number_of_words=def_number_of_words, weight=None, limits=None):
+        if weight and limits:
+            raise ValueError("word weights and length limits can't be used together")
+        self.word_list = word_list
+        self.number_of_words = number_of_words
+        self.rng = randpool.Pool()
+        self.alias = alias.Alias.for_words(word_list, weight) if weight else None
+        self.index = lengths.LengthIndex.for_words(word_list, number_of_words, *limits) if limits else None
+        if self.index is not None and not self.index.total:
+            span = f"{limits[0]} to {limits[1]}" if limits[1] is not None else f"{limits[0]} or more"
+            raise ValueError(f"no {number_of_words} word passphrase has {span} characters")
+        self.distinct = self.index.total if self.index is not None else len(word_list) ** number_of_words
+
+    def __iter__(self):
+        words, k, rng = self.word_list, self.number_of_words, self.rng
+        if self.index is not None:
+            pick = self.index.pick
+            while True:
+                yield ' '.join(pick(rng))
+        if self.alias is None:
+            while True:
+                yield ' '.join(rng.choices(words, k=k))
+        picks = self.alias.picks
+        while True:     # weighted picks are drawn pick_batch passphrases at a time
+            drawn = [words[i] for i in picks(rng, k * pick_batch)]
+            for j in range(0, len(drawn), k):
+                yield ' '.join(drawn[j:j + k])
+
+    def take(self, n: int) -> list:
+        return list(itertools.islice(self, n))
 
 def dialog_qty() -> tuple:
     """
@@ -158,56 +263,63 @@ def copy_pwd(p: str, n: int) -> None:
         print(f"\n\n\tYour passphrase is: {p}\n\n")
         sys.exit()
 
-def write_file(passphrases: dict) -> None:
+def write_file(records, qty: int, output=None, fmt=def_format, unique=False, issued=None, distinct=None) -> None:
     """
-    If the file (-f) argument is passed, we save the passphrases
-    into the localpath of this script and display that path
+    If the file (-f) argument is passed, we stream the passphrases
+    into the localpath of this script (or output, '-' for stdout)
+    as they are generated and display that path.  unique (-U) drops
+    repeats and issued (-I) skips anything an earlier run handed out,
+    ValueError if distinct, how many different records there are, is
+    short of qty.
     """
-    with open(passphrases_full_path, 'w') as file:
-        file.write('\n'.join(list(passphrases.values()))+'\n')
-    print(f"\n\tWritten to {passphrases_full_path}\n\n")
+    output = output or passphrases_full_path
+    if unique or issued:
+        import dedupe   # hashing and the on-disk index, only when asked for
+        with dedupe.screened(records, qty, issued, distinct) as records:
+            count, elapsed = stream_records(records, output, fmt, field="passphrase", qty=qty)
+    else:
+        count, elapsed = stream_records(records, output, fmt, field="passphrase", qty=qty)
+    report_rate(count, elapsed, output)
 
-def download_word_list():
-    with open(word_list_full_path, 'w') as f:
-        word_list = requests.get(word_list_url, verify=False).text
-        f.write(word_list)
-        word_list = word_list.split()
-    return word_list
+def download_word_list(url=word_list_url) -> list:
+    """
+    Brings our copy of the upstream list (popular.txt) up to date and returns
+    its words.  See download.fetch: the body is streamed to disk, an interrupted
+    download picks up where it left off, and an unchanged list costs one 304.
+    """
+    import download     # requests is slow to import, only pay for it when downloading
+    download.fetch(url, source_full_path)
+    with open(source_full_path, 'r') as f:
+        return f.read().split()
 
 def clean_word_list(word_list: list) -> list:
     min_word_length = 6
     """
-    Takes the word list, and removes all words in the english expletives file.
+    Takes the word list, and removes all words spelling anything in the english
+    expletives file (see profanity.words, one pass per word whatever the list).
     Using inflect, we take every word, and attempt to make it singular, 
     and add to the new list.
     If inflect returns False, then we just add the word to new the list as it is.
+    Singular forms are cached on disk by sanitize.singularize, so a rebuild only
+    runs inflect over new words, and spreads them over cores when there are many.
     Then it takes the list and makes a new unique valued list and then sorts it.
+    Each word keeps its rank, where it first came up in the list (popular.txt
+    is most popular first), for weighted picks with -W.
     We then overwrite the dictionary file for future use.
     """
-    with open(expletive_full_path, 'r') as f:
-        expletives = f.read().splitlines()
-    for expletive in expletives:
-        try:
-            expletive_index = word_list.index(expletive)
-            word_list.pop(expletive_index)
-        except ValueError:
-            pass
+    import profanity
+    found = profanity.words(expletive_full_path).found
+    ranked = [(rank, word) for rank, word in enumerate(word_list) if not found(word)]
+    ranked = [(rank, word) for rank, word in ranked if len(word) >= min_word_length]  # I don't want short words
+    import sanitize
+    sanitized_word_list = sanitize.singularize([word for _, word in ranked])
 
-    sanitized_word_list = []
-    p = inflect.engine()
-    for word in word_list:
-        if len(word) < min_word_length: continue  # I don't want short words
-        try:
-            sanitized_word_list.append(p.singular_noun(word)) if p.singular_noun(word) else sanitized_word_list.append(word)
-        except IndexError:
-            sanitized_word_list.append(word)
+    ranks = sanitize.lowest_ranks(zip(sanitized_word_list, (rank for rank, _ in ranked))) # unique values
+    final_word_list = sorted(ranks)
 
-    final_word_list = list(set(sanitized_word_list)) # unique values
-    final_word_list.sort()
-    
     # write new dictionary file
     with open(word_list_full_path, 'w') as f:
-        f.write('\n'.join(final_word_list) + '\n')
+        f.write(''.join(f"{word}\t{ranks[word]}\n" for word in final_word_list))
     return final_word_list
 
 def main():
@@ -230,20 +342,19 @@ def main():
     copy = True
     file = False
     obfuscate = False
+    output = None
+    fmt = def_format
+    update = False
+    weight = None
+    limits = None
+    unique = False
+    issued = None
     number_of_words = def_number_of_words
 
-    # Download the word_list if it doesn't exist and clean it up
-    if not pathlib.Path.is_file(word_list_full_path) or pathlib.Path(word_list_full_path).stat().st_size == 0:
-        word_list = clean_word_list(download_word_list())
-    else:
-        with open(word_list_full_path, 'r') as f:
-            word_list = f.read().splitlines()
-
-
     # Check for arguments, send to function if > 1 or > 2 or -h.
     # Otherwise generates passphrases
     if len(sys.argv) > 2:
-        number_of_words, qty, copy, file, obfuscate = argue_with_me()
+        number_of_words, qty, copy, file, obfuscate, output, fmt, update, weight, limits, unique, issued = argue_with_me()
     elif len(sys.argv) > 1: # will simply send help to the user
         argue_with_me()
     else:
@@ -253,28 +364,59 @@ def main():
             if qty:
                 loop = False
 
+    # Download the word_list if it doesn't exist and clean it up,
+    # with -u only rebuild if upstream has changed since we last fetched it
+    if not pathlib.Path.is_file(word_list_full_path) or pathlib.Path(word_list_full_path).stat().st_size == 0:
+        clean_word_list(download_word_list())
+    elif update:
+        import download
+        if download.fetch(word_list_url, source_full_path):
+            with open(source_full_path, 'r') as f:
+                clean_word_list(f.read().split())
+    # mmap the compiled copy of the dictionary, rebuilt if dictionary.txt changed
+    word_list = wordlist.load(word_list_full_path)
+
     if number_of_words > max_number_of_words:
         number_of_words = def_number_of_words
-        print(f"\n\n\tMaximum number of words is {max_number_of_words}, using default of {number_of_words}\n\n")
+        print(f"\n\n\tMaximum number of words is {max_number_of_words}, using default of {number_of_words}\n\n", file=sys.stderr)
     elif number_of_words < min_number_of_words:
         number_of_words = def_number_of_words
-        print(f"\n\n\tMinimum number of words is {min_number_of_words}, using default of {number_of_words}\n\n")
+        print(f"\n\n\tMinimum number of words is {min_number_of_words}, using default of {number_of_words}\n\n", file=sys.stderr)
 
-    if qty == 1:
-        gen_passphrase(word_list, file, number_of_words)
+    if weight and word_list.ranks is None:
+        print(f"\n\n\t{word_list_file_name} has no popularity ranks, delete it to rebuild it with them\n\n", file=sys.stderr)
+        sys.exit(1)
+    try:
+        lemur = Lemur(word_list, number_of_words, weight, limits)
+    except ValueError as e:
+        print(f"\n\n\t{str(e).capitalize()}\n\n", file=sys.stderr)
+        sys.exit(1)
+    if weight or limits:
+        report_entropy(lemur)
+
+    if file:
+        try:
+            write_file(iter(lemur), qty, output, fmt, unique, issued, lemur.distinct)
+        except ValueError as e:
+            print(f"\n\n\t{str(e).capitalize()}\n\n", file=sys.stderr)
+            sys.exit(1)
+    elif qty == 1:
+        gen_passphrase(word_list, file, number_of_words, weight=weight, limits=limits)
         p = passphrases.get(1)
         if copy:
             copy_pwd(p, 1)
         else:
-            print(p if not file else '') # to capture from stdout out let's just dump the passphrase.
-    elif file:
-        gen_passphrase(word_list, file, number_of_words, qty)
+            print(p) # to capture from stdout out let's just dump the passphrase.
     else:
-        gen_passphrase(word_list, file, number_of_words, qty)
+        try:
+            gen_passphrase(word_list, file, number_of_words, qty, weight, limits)
+        except ValueError as e:
+            print(f"\n\n\t{str(e).capitalize()}\n\n", file=sys.stderr)
+            sys.exit(1)
         print()
         for i,p in passphrases.items():
             print(f"\t{i}.\t{p if not obfuscate else '*' * len(p)}")
         dialog_copy(copy, n=qty)
 
 if __name__ == "__main__":
-    main()
+    profiling.main(main, passphrases_full_path)
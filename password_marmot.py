@@ -1,8 +1,16 @@
-import random, os, re
+import random
 import argparse
 import sys
-import secrets
+import string
 import pathlib
+import itertools
+import time
+from output_stream import stream_records, report_rate, formats, def_format
+import policy
+import randpool
+import metrics
+import profiling
+from terminal import clear
 
 #####
 #
@@ -12,11 +20,14 @@ def_length = 25
 min_qty = 0
 max_qty = 20
 file_name = "passwords.txt"
+batch_size = 256    # candidates built at once in the reusable buffer
+pool_size = 72      # characters in the pool candidates are built from, as secrets.token_urlsafe(54)
+max_rejects = 100000    # candidates in a row failing the policy before giving up
 #
 #####
 
 """
-usage: password_marmot.py [-h] -q QTY [-l LENGTH] [-s] [-c] [-f] [-o]
+usage: password_marmot.py [-h] -q QTY [-l LENGTH] [-s] [-c] [-f] [-o] [-O OUTPUT] [--format {lines,ndjson,csv}] [-w WORKERS] [-k] [-x EXCLUDE] [-a] [-L] [-U] [-I ISSUED] [--profile]
 
 Generate passwords when passed a quantity and length. Writing to file will override
 other options (ie...copy) unless qty = 1
@@ -30,15 +41,29 @@ options:
   -c, --copy            Copy password to clipboard
   -f, --file            Write passwords to file
   -o, --obfuscate       Obfuscates password output to stdout
+  -O OUTPUT, --output OUTPUT
+                        Path to stream passwords to with -f, '-' for stdout
+  --format {lines,ndjson,csv}
+                        Output format used with -f
+  -w WORKERS, --workers WORKERS
+                        Split -f generation across this many processes
+  -k, --constructive    Place each character class by construction instead of generate and reject
+  -x EXCLUDE, --exclude EXCLUDE
+                        Characters to leave out of passwords
+  -a, --no-ambiguous    Leave out characters that are easy to misread (Il1O0o)
+  -L, --leet            Also screen out leetspeak spellings of expletives (4ss, cr@p)
+  -U, --unique          Skip repeats within the run, with -f
+  -I ISSUED, --issued ISSUED
+                        Directory indexing every credential already issued, with -f anything in it is skipped and the new ones are added
 
 """
 
 passwords = {}
 special = r"!@#$%^&*()?"
 numbers = "0123456789"
-
-def clear() -> None:
-    os.system("cls" if os.name == "nt" else "clear")
+urlsafe = string.ascii_letters + string.digits + "-_"  # the URL-safe base64 alphabet
+default_policy = policy.build(special)
+no_special_policy = policy.build(special, spec_char=True)
 
 def argue_with_me() -> tuple:
     """
@@ -53,6 +78,16 @@ def argue_with_me() -> tuple:
     parser.add_argument('-c', '--copy', action='store_true', help='Copy password to clipboard', required=False)
     parser.add_argument('-f', '--file', action='store_true', help='Write passwords to file', required=False)
     parser.add_argument('-o', '--obfuscate', action='store_true', help='Obfuscates password output to stdout', required=False)
+    parser.add_argument('-O', '--output', help="Path to stream passwords to with -f, '-' for stdout", required=False)
+    parser.add_argument('--format', choices=formats, default=def_format, help='Output format used with -f', required=False)
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Split -f generation across this many processes', required=False)
+    parser.add_argument('-k', '--constructive', action='store_true', help='Place each character class by construction instead of generate and reject', required=False)
+    parser.add_argument('-x', '--exclude', default='', help='Characters to leave out of passwords', required=False)
+    parser.add_argument('-a', '--no-ambiguous', action='store_true', help='Leave out characters that are easy to misread (Il1O0o)', required=False)
+    parser.add_argument('-L', '--leet', action='store_true', help='Also screen out leetspeak spellings of expletives (4ss, cr@p)', required=False)
+    parser.add_argument('-U', '--unique', action='store_true', help='Skip repeats within the run, with -f', required=False)
+    parser.add_argument('-I', '--issued', help='Directory indexing every credential already issued, with -f anything in it is skipped and the new ones are added', required=False)
+    parser.add_argument('--profile', action='store_true', help='Write cProfile, tracemalloc and collapsed stack reports next to the passwords file', required=False)
     args = parser.parse_args()
     qty = args.qty
     length = args.length if args.length else def_length
@@ -60,14 +95,23 @@ def argue_with_me() -> tuple:
     copy = args.copy
     file = args.file
     obfuscate = args.obfuscate
-    return qty, length, spec_char, copy, file, obfuscate
+    output = args.output
+    fmt = args.format
+    workers = args.workers
+    constructive = args.constructive
+    exclude = args.exclude
+    no_ambiguous = args.no_ambiguous
+    leet = args.leet
+    unique = args.unique
+    issued = args.issued
+    return qty, length, spec_char, copy, file, obfuscate, output, fmt, workers, constructive, exclude, no_ambiguous, leet, unique, issued
 
-def gen_password(length: int, spec_char: bool, file: bool, qty=1) -> None:
+def gen_password(length: int, spec_char: bool, file: bool, qty=1, constructive=False, exclude="", no_ambiguous=False, leet=False) -> None:
     """
     Generate passwords accepting the length and qty.
-    This is using secrets.token_urlsafe to generate a 
-    random base64 string, and we take that long string
-    clean up based on my preference, and then use random.choices 
+    This is using randpool to generate a random URL-safe
+    base64 style string, and we take that long string
+    clean up based on my preference, and then use randpool.Pool 
     to choose n number of characters from that string for length.
     Then we replace random characters with a special character and
     a number, we reverse the password, and then send it to be shuffled.
@@ -77,67 +121,205 @@ def gen_password(length: int, spec_char: bool, file: bool, qty=1) -> None:
     Dictionary looks like:
     { 1: "password", 2: "Password", 3: "P@55w0rd" }
     """
-    global special
-    if spec_char:   # boolean
-        special = numbers   # instead of using null
-    i = 1
-    pwd = secrets.token_urlsafe(54) # 72 characters long, a random URL-safe base64 text string
-    pwd = pwd.replace('-', '').replace('_', '') # cleanup, I don't want them
-    while len(passwords) < qty: # build a dict of passwords
-        new_pwd = ''.join(random.choices(pwd, k=length))    # grab n number of characters from pwd
-        s,n = random_char_index(new_pwd)    # generate random numbers based on length of pwd
-        new_pwd = replace_chars(new_pwd, s, n)  # insert numbers and characters into pwd
-        new_pwd = reverse_chars(new_pwd)     # reverse it
-        new_pwd = shuffle_pwd(new_pwd)  # shuffle it
-        chk = check_password(new_pwd, spec_char)  # Check it to see if it meets complexity
-        if not chk: continue    # don't add it to the dict
-        passwords[i] = new_pwd  # add it to the dict
-        i += 1  # increment the count which is used as key in dict
-    if file: write_file(passwords)
+    for i, new_pwd in enumerate(itertools.islice(iter_passwords(length, spec_char, constructive, exclude, no_ambiguous, leet), qty), start=1):
+        passwords[i] = new_pwd  # add it to the dict, i is used as key in dict
+    if file: write_file(passwords.values(), qty)
+
+def iter_passwords(length: int, spec_char: bool, constructive=False, exclude="", no_ambiguous=False, leet=False):
+    """
+    Endless generator behind gen_password, yields each password as soon as it
+    passes check_password so bulk runs never hold more than one at a time.
+    """
+    return iter(Marmot(length, spec_char, constructive, exclude, no_ambiguous, leet))
+
+class Marmot:
+    """
+    The generator as an object.  All state lives on the instance (its own
+    compiled policy, token pool, special alphabet and randpool.Pool) so separate
+    instances can run in separate threads without stepping on each other.
+    exclude and no_ambiguous take characters out of everything it draws, and
+    settings no password can meet are a ValueError here.
+    Passwords spelling an expletive are screened out by the policy (see
+    profanity), leetspeak spellings too with leet.
+
+        m = Marmot(20)
+        m.take(5)           # list of 5 passwords
+        for p in m: ...     # endless
+
+    Candidates are built batch_size at a time in place in buf, one
+    bytearray per engine (so one per worker with -w) reused for every
+    batch, see chain().
+
+    constructive=True skips the transform chain and the reject loop, placing
+    each required class by construction (see policy.ClassSampler) so every
+    password is uniform over letters, numbers and special and costs one pass.
+    candidates / accepted count what the reject loop does when it's used.
+    """
+    __slots__ = ("length", "policy", "special", "numbers", "pool", "rng", "sampler", "candidates", "accepted", "buf", "view")
+
+    def __init__(self, length=def_length, spec_char=False, constructive=False, exclude="", no_ambiguous=False, leet=False):
+        self.length = length
+        self.policy = policy.build(special, spec_char, exclude, no_ambiguous, leet)
+        self.numbers = self.policy.classes["numbers"]
+        self.special = self.numbers if spec_char else self.policy.classes["special"]   # numbers instead of using null
+        self.rng = randpool.Pool()
+        self.policy.fits(length)
+        self.pool = self.token()
+        self.sampler = self.policy.sampler(length, rng=self.rng) if constructive else None
+        self.candidates = 0
+        self.accepted = 0
+        self.buf = bytearray(length * batch_size)   # reused for every batch
+        self.view = memoryview(self.buf)
+
+    def token(self) -> str:
+        """
+        pool_size random URL-safe characters, as secrets.token_urlsafe but
+        without importing hashlib, leaving out - and _ and anything the
+        policy excludes.  Drawn class by class in proportion to each class's
+        size, so a class cut down to a character or two by exclude is still
+        in the pool and the reject loop can always finish.
+        """
+        classes = [''.join(c for c in chars if c in urlsafe) for chars in self.policy.classes.values()]
+        classes = [chars for chars in classes if chars]
+        total = sum(map(len, classes))
+        return ''.join(self.rng.chars(chars, max(1, round(pool_size * len(chars) / total))) for chars in classes)
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.candidates if self.candidates else None
+
+    def rejected(self, misses: int) -> int:
+        """
+        misses + 1, or ValueError once max_rejects candidates in a row failed
+        """
+        if misses + 1 >= max_rejects:
+            raise ValueError(f"no candidate met the policy in {max_rejects:,} tries, too few characters are left to build from")
+        return misses + 1
+
+    def __iter__(self):
+        if self.sampler:
+            yield from self.sampler
+        if metrics.enabled:
+            yield from self.timed()
+        check = self.policy.check
+        misses = 0
+        for new_pwd in self.chain():
+            self.candidates += 1
+            if not check(new_pwd):     # doesn't meet complexity, don't hand it out
+                misses = self.rejected(misses)
+                continue
+            misses = 0
+            self.accepted += 1
+            yield new_pwd
+
+    def chain(self, stages=None):
+        """
+        Endless unchecked candidates, each step done in place on buf for a
+        whole batch: grab length characters apiece from the pool, replace the
+        one at a random index with a special and the one at another index
+        with a number (only those two), reverse the buffer (which reverses
+        every candidate in it) and shuffle each candidate on its own slice
+        before the one decode.  The indexes, specials and numbers are drawn
+        for the whole batch at once too.  stages, the (pick, index, replace,
+        reverse, shuffle) histograms from timed(), get the time of each
+        step, per batch except shuffle.
+        """
+        rng, buf, view = self.rng, self.buf, self.view
+        length, size = self.length, len(self.buf)
+        shuffle = rng.shuffle
+        clock = time.perf_counter
+        while True:
+            t0 = clock()
+            buf[:] = rng.translated(self.pool, size)
+            t1 = clock()
+            spots = zip(rng.translated(length, batch_size), rng.translated(length - 1, batch_size))     # as random_char_index
+            t2 = clock()
+            for off, (s, n), spec, numb in zip(range(0, size, length), spots, rng.translated(self.special, batch_size), rng.translated(self.numbers, batch_size)):
+                buf[off + s] = spec
+                buf[off + n + (n >= s)] = numb
+            t3 = clock()
+            buf.reverse()
+            t4 = clock()
+            if stages:
+                pick, index, replace, reverse, shuffle_time = stages
+                pick.observe(t1 - t0)
+                index.observe(t2 - t1)
+                replace.observe(t3 - t2)
+                reverse.observe(t4 - t3)
+            for off in range(0, size, length):
+                if stages: t = clock()
+                new_pwd = view[off:off + length]
+                shuffle(new_pwd)
+                new_pwd = str(new_pwd, "latin-1")
+                if stages: shuffle_time.observe(clock() - t)
+                yield new_pwd
+
+    def timed(self):
+        """
+        chain() with every stage timed into marmot_stage_seconds, used
+        when metrics are enabled
+        """
+        stage = metrics.histogram("marmot_stage_seconds", "Time in each step of the marmot chain", ("stage",))
+        stages = tuple(stage.labels(s) for s in ("pick", "index", "replace", "reverse", "shuffle"))
+        check_time = stage.labels("check")
+        candidates, accepted, rejected = metrics.engine_counters("marmot")
+        check = self.policy.check
+        clock = time.perf_counter
+        misses = 0
+        for new_pwd in self.chain(stages):
+            self.candidates += 1
+            candidates.inc()
+            t = clock()
+            ok = check(new_pwd)
+            check_time.observe(clock() - t)
+            if not ok:
+                rejected.inc()
+                misses = self.rejected(misses)
+                continue
+            misses = 0
+            self.accepted += 1
+            accepted.inc()
+            yield new_pwd
+
+    def take(self, n: int) -> list:
+        return list(itertools.islice(self, n))
 
 def reverse_chars(pwd: str) -> str:
     return pwd[::-1]
 
-def replace_chars(pwd: str, s: int, n: int) -> str:
+def replace_chars(pwd: str, s: int, n: int, special=special, numbers=numbers, rng=random) -> str:
         """
-        Replaces at random locations with a random 
-        number and special character
+        Replaces the character at index s with a random special
+        character and the one at index n with a random number,
+        only those two, not every copy of them
         """
-        spec = random.choice(special)
-        numb = random.choice(numbers)
-        new_pwd = pwd.replace(pwd[s], spec).replace(pwd[n], numb)
-        return new_pwd
+        pwd_list = list(pwd)
+        pwd_list[s] = rng.choice(special)
+        pwd_list[n] = rng.choice(numbers)
+        return ''.join(pwd_list)
 
-def shuffle_pwd(pwd: str) -> str:
+def shuffle_pwd(pwd: str, rng=random) -> str:
     pwd_list = list(pwd)
-    random.shuffle(pwd_list)
+    rng.shuffle(pwd_list)
     return ''.join(pwd_list)
 
-def random_char_index(pwd: str) -> tuple:
+def random_char_index(pwd, rng=random) -> tuple:
     """
-    Generate random int's minus 1 based on the len of pwd 
-    and return the ints. Used to pick a random index in the
-    string to replace with a number (n) and a special (s) character
+    Two different random indexes into pwd (a str or the bytearray),
+    one to replace with a special (s) and one with a number (n).
+    n is drawn from the other len - 1 positions, so no retrying.
     """
-    s = random.randint(0, len(pwd) - 1)
-    n = random.randint(0, len(pwd) - 1)
-    random_char_index(pwd) if s == n else None
-    return s,n
+    s = rng.randrange(len(pwd))
+    n = rng.randrange(len(pwd) - 1)
+    return s, n + (n >= s)
 
 def check_password(pwd: str, spec_char: bool) -> bool:
     """
     Complexity checking.  Each password is checked that at least one of each type of character:
     special, upper, lower, and a number.  If not, we return False and the password
-    is effectively rejected.
+    is effectively rejected.  The policies are compiled once, see policy.Policy.
     """
-    if spec_char:
-        s = re.compile("")
-    else:
-        s = re.compile(r"[\~\!\@\#\$\%\^\&\*\(\)\_\+\-\=\{\}\|\[\]\\\:\;\'\<\>\?\,\.\/\*]") # special
-    l = re.compile("[a-z]") # lower
-    u = re.compile("[A-Z]") # upper
-    n = re.compile("[0-9]") # numbers
-    return True if re.findall(s, pwd) and re.findall(l, pwd) and re.findall(u, pwd) and re.findall(n, pwd) else False
+    return (no_special_policy if spec_char else default_policy).check(pwd)
 
 def dialog_qty() -> tuple:
     """
@@ -231,16 +413,23 @@ def copy_pwd(p: str, n: int) -> None:
         sys.exit()
 
 
-def write_file(passwords: dict) -> None:
+def write_file(records, qty: int, output=None, fmt=def_format, unique=False, issued=None) -> None:
     """
-    If the file (-f) argument is passed, we save the passwords
-    into the localpath of this script and display that path
+    If the file (-f) argument is passed, we stream the passwords
+    into the localpath of this script (or output, '-' for stdout)
+    as they are generated and display that path.  unique (-U) drops
+    repeats and issued (-I) skips anything an earlier run handed out.
     """
-    local_path = pathlib.Path(__file__).parent
-    full_path = pathlib.Path.joinpath(local_path, file_name)
-    with open(full_path, 'w') as file:
-        file.write('\n'.join(list(passwords.values()))+'\n')
-    print(f"\n\tWritten to {full_path}\n\n")
+    if not output:
+        local_path = pathlib.Path(__file__).parent
+        output = pathlib.Path.joinpath(local_path, file_name)
+    if unique or issued:
+        import dedupe   # hashing and the on-disk index, only when asked for
+        with dedupe.screened(records, qty, issued) as records:
+            count, elapsed = stream_records(records, output, fmt, qty=qty)
+    else:
+        count, elapsed = stream_records(records, output, fmt, qty=qty)
+    report_rate(count, elapsed, output)
 
 def main():
     clear()
@@ -266,14 +455,28 @@ def main():
     copy = True
     file = False
     obfuscate = False
+    output = None
+    fmt = def_format
+    workers = 1
+    constructive = False
+    exclude = ""
+    no_ambiguous = False
+    leet = False
+    unique = False
+    issued = None
 
     # Check for arguments, send to function if > 1 or > 2 or -h.
     # Otherwise generates passwords
     if len(sys.argv) > 2:
-        qty, length, spec_char, copy, file, obfuscate = argue_with_me()
+        qty, length, spec_char, copy, file, obfuscate, output, fmt, workers, constructive, exclude, no_ambiguous, leet, unique, issued = argue_with_me()
         if length < min_length or length > max_length:
             print(f"\n\tSpecified length {length} does not meet requirements\n\n\tLength has to be between {min_length} and {max_length}\n\n")
             sys.exit()
+        try:
+            Marmot(length, spec_char, constructive, exclude, no_ambiguous, leet)     # raises for settings no password can meet
+        except ValueError as e:
+            print(f"\n\t{str(e).capitalize()}\n\n", file=sys.stderr)
+            sys.exit(1)
     elif len(sys.argv) > 1: # will simply send help to the user
         argue_with_me()
     else:
@@ -284,20 +487,25 @@ def main():
                 loop = False
 
 
-    if qty == 1:
-        gen_password(length, spec_char, file, qty)
+    if file:
+        if workers > 1:
+            from sharding import sharded    # process pool machinery, only when asked for
+            records = sharded(Marmot, (length, spec_char, constructive, exclude, no_ambiguous, leet), qty, workers)
+        else:
+            records = iter_passwords(length, spec_char, constructive, exclude, no_ambiguous, leet)
+        write_file(records, qty, output, fmt, unique, issued)
+    elif qty == 1:
+        gen_password(length, spec_char, file, qty, constructive, exclude, no_ambiguous, leet)
         p = passwords.get(1)
         if copy:
             copy_pwd(p, 1)
         else:
             print(p) # to capture from stdout out let's just dump the password.
-    elif file:
-        gen_password(length, spec_char, file, qty)
     else:
-        gen_password(length, spec_char, file, qty)
+        gen_password(length, spec_char, file, qty, constructive, exclude, no_ambiguous, leet)
         for i,p in passwords.items():
             print(f"\t{i}.\t{p if not obfuscate else '*' * len(p)}")
         dialog_copy(copy, n=qty)
 
 if __name__ == "__main__":
-    main()
+    profiling.main(main, pathlib.Path(__file__).parent / file_name)
@@ -1,6 +1,14 @@
-import random, os, re
+import random, os
 import argparse
 import sys
+import itertools
+import time
+from output_stream import stream_records, stream_blocks, report_rate, formats, def_format
+import policy
+import randpool
+import metrics
+import profiling
+from terminal import clear
 
 #####
 #
@@ -14,7 +22,7 @@ file_name = "passwords.txt"
 #####
 
 """
-usage: password_rabbit.py [-h] -q QTY [-l LENGTH] [-s] [-c] [-f]
+usage: password_rabbit.py [-h] -q QTY [-l LENGTH] [-s] [-c] [-f] [-O OUTPUT] [--format {lines,ndjson,csv}] [-w WORKERS] [-k] [-x EXCLUDE] [-a] [-L] [-N] [-U] [-I ISSUED] [--profile]
 
 Generate passwords when passed a quantity and length. Writing to file will override other options (ie...copy)
 unless qty = 1
@@ -27,6 +35,22 @@ options:
   -s, --special         Exclude special characters
   -c, --copy            Copy password to clipboard
   -f, --file            Write passwords to file
+  -O OUTPUT, --output OUTPUT
+                        Path to stream passwords to with -f, '-' for stdout
+  --format {lines,ndjson,csv}
+                        Output format used with -f
+  -w WORKERS, --workers WORKERS
+                        Split -f generation across this many processes
+  -k, --constructive    Place each character class by construction instead of generate and reject
+  -x EXCLUDE, --exclude EXCLUDE
+                        Characters to leave out of passwords
+  -a, --no-ambiguous    Leave out characters that are easy to misread (Il1O0o)
+  -L, --leet            Also screen out leetspeak spellings of expletives (4ss, cr@p)
+  -N, --numpy           With -f, generate in NumPy batches (needs numpy)
+  -U, --unique          Skip repeats within the run, with -f
+  -I ISSUED, --issued ISSUED
+                        Directory indexing every credential already issued, with -f anything in it is skipped and the new ones are added
+  --profile             Write cProfile, tracemalloc and collapsed stack reports next to the passwords file
 
 """
 
@@ -34,9 +58,8 @@ passwords = {}
 alpha = "abcdefghijklmnopqrstuvwxyz01234567890ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 special = "!@#$%^&*()?"
 allchar = alpha + special
-
-def clear():
-    os.system("cls" if os.name == "nt" else "clear")
+default_policy = policy.build(special)
+no_special_policy = policy.build(special, spec_char=True)
 
 def qty_and_length_args():
     """
@@ -50,15 +73,36 @@ def qty_and_length_args():
     parser.add_argument('-s', '--special', action='store_true', help='Exclude special characters', required=False)
     parser.add_argument('-c', '--copy', action='store_true', help='Copy password to clipboard', required=False)
     parser.add_argument('-f', '--file', action='store_true', help='Write passwords to file', required=False)
+    parser.add_argument('-O', '--output', help="Path to stream passwords to with -f, '-' for stdout", required=False)
+    parser.add_argument('--format', choices=formats, default=def_format, help='Output format used with -f', required=False)
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Split -f generation across this many processes', required=False)
+    parser.add_argument('-k', '--constructive', action='store_true', help='Place each character class by construction instead of generate and reject', required=False)
+    parser.add_argument('-x', '--exclude', default='', help='Characters to leave out of passwords', required=False)
+    parser.add_argument('-a', '--no-ambiguous', action='store_true', help='Leave out characters that are easy to misread (Il1O0o)', required=False)
+    parser.add_argument('-L', '--leet', action='store_true', help='Also screen out leetspeak spellings of expletives (4ss, cr@p)', required=False)
+    parser.add_argument('-N', '--numpy', action='store_true', help='With -f, generate in NumPy batches (needs numpy)', required=False)
+    parser.add_argument('-U', '--unique', action='store_true', help='Skip repeats within the run, with -f', required=False)
+    parser.add_argument('-I', '--issued', help='Directory indexing every credential already issued, with -f anything in it is skipped and the new ones are added', required=False)
+    parser.add_argument('--profile', action='store_true', help='Write cProfile, tracemalloc and collapsed stack reports next to the passwords file', required=False)
     args = parser.parse_args()
     qty = args.qty
     length = args.length if args.length else def_length
     spec_char = args.special
     copy = args.copy
     file = args.file
-    return qty, length, spec_char, copy, file
+    output = args.output
+    fmt = args.format
+    workers = args.workers
+    constructive = args.constructive
+    exclude = args.exclude
+    no_ambiguous = args.no_ambiguous
+    leet = args.leet
+    numpy = args.numpy
+    unique = args.unique
+    issued = args.issued
+    return qty, length, spec_char, copy, file, output, fmt, workers, constructive, exclude, no_ambiguous, leet, numpy, unique, issued
 
-def gen_password(length, spec_char, file, qty=1):
+def gen_password(length, spec_char, file, qty=1, constructive=False, exclude="", no_ambiguous=False, leet=False):
     """
     Generate passwords accepting the length and qty.
     send each one as it is generated to check complexity requirements
@@ -67,32 +111,94 @@ def gen_password(length, spec_char, file, qty=1):
     Dictionary looks like:
     { 1: "password", 2: "Password", 3: "P@55w0rd" }
     """
-    if spec_char:
-        all = alpha # don't use special char
-    else:
-        all = allchar
-    i = 1
-    while len(passwords) < qty:
-        p = "".join(random.sample(all, length))
-        chk = check_password(p, spec_char)
-        if not chk: continue
+    for i, p in enumerate(itertools.islice(iter_passwords(length, spec_char, constructive, exclude, no_ambiguous, leet), qty), start=1):
         passwords[i] = p
-        i += 1
+
+def iter_passwords(length, spec_char, constructive=False, exclude="", no_ambiguous=False, leet=False):
+    """
+    Endless generator of passwords that pass check_password.  Nothing is kept
+    around, so bulk runs can pull as many as they want with flat memory.
+    """
+    return iter(Rabbit(length, spec_char, constructive, exclude, no_ambiguous, leet))
+
+class Rabbit:
+    """
+    The generator as an object, each instance carries its own compiled
+    policy and randpool.Pool so instances can be used from separate threads.
+    Iterating is lazy and endless, take(n) returns a list of n passwords.
+    With constructive=True every class is placed by construction (see
+    policy.ClassSampler) instead of generating and rejecting, and
+    candidates / accepted count what the reject loop threw away.
+    exclude and no_ambiguous take characters out of the alphabet, and
+    settings no password can meet are a ValueError here.  The
+    policy screens out passwords spelling an expletive (see profanity),
+    leetspeak spellings too with leet.
+    """
+    __slots__ = ("length", "policy", "chars", "rng", "sampler", "candidates", "accepted")
+
+    def __init__(self, length=def_length, spec_char=False, constructive=False, exclude="", no_ambiguous=False, leet=False):
+        self.length = length
+        self.policy = policy.build(special, spec_char, exclude, no_ambiguous, leet) # no special when spec_char
+        self.policy.fits(length, distinct=True)   # sample never repeats a character
+        self.chars = self.policy.alphabet
+        self.rng = randpool.Pool()
+        self.sampler = self.policy.sampler(length, distinct=True, rng=self.rng) if constructive else None
+        self.candidates = 0
+        self.accepted = 0
+
+    @property
+    def acceptance_rate(self):
+        return self.accepted / self.candidates if self.candidates else None
+
+    def __iter__(self):
+        if self.sampler:
+            yield from self.sampler
+        if metrics.enabled:
+            yield from self.timed()
+        check = self.policy.check
+        while True:
+            self.candidates += 1
+            p = "".join(self.rng.sample(self.chars, self.length))
+            if check(p):
+                self.accepted += 1
+                yield p
+
+    def timed(self):
+        """
+        __iter__ with the sample and check stages timed into
+        rabbit_stage_seconds, used when metrics are enabled
+        """
+        stage = metrics.histogram("rabbit_stage_seconds", "Time in each step of the rabbit loop", ("stage",))
+        sample, check_time = stage.labels("sample"), stage.labels("check")
+        candidates, accepted, rejected = metrics.engine_counters("rabbit")
+        check = self.policy.check
+        clock = time.perf_counter
+        while True:
+            self.candidates += 1
+            candidates.inc()
+            t0 = clock()
+            p = "".join(self.rng.sample(self.chars, self.length))
+            t1 = clock()
+            ok = check(p)
+            sample.observe(t1 - t0)
+            check_time.observe(clock() - t1)
+            if not ok:
+                rejected.inc()
+                continue
+            self.accepted += 1
+            accepted.inc()
+            yield p
+
+    def take(self, n):
+        return list(itertools.islice(self, n))
 
 def check_password(p, spec_char):
     """
     Complexity checking.  Each password is checked that at least one of each type of character:
     special, upper, lower, and a number.  If not, we return False and the password
-    is effectively rejected.
+    is effectively rejected.  The policies are compiled once, see policy.Policy.
     """
-    if spec_char:
-        s = re.compile("")
-    else:
-        s = re.compile(r"[\~\!\@\#\$\%\^\&\*\(\)\_\+\-\=\{\}\|\[\]\\\:\;\'\<\>\?\,\.\/\*]") # special
-    l = re.compile("[a-z]") # lower
-    u = re.compile("[A-Z]") # upper
-    n = re.compile("[0-9]") # numbers
-    return True if re.findall(s, p) and re.findall(l, p) and re.findall(u, p) and re.findall(n, p) else False
+    return (no_special_policy if spec_char else default_policy).check(p)
 
 def dialog_qty():
     """
@@ -181,12 +287,45 @@ def copy_pwd(p, n):
     pyperclip.copy(p)
     print(f"\n\tPassword #{n} Copied.\n")
 
-def write_file():
-    home = os.path.expanduser('~')
-    output = os.path.join(home, file_name)
-    with open(output, 'w') as file:
-        file.write('\n'.join(list(passwords.values()))+'\n')
-    print(f"\n\tWritten to {output}\n\n")
+def write_file(records, qty, output=None, fmt=def_format, unique=False, issued=None):
+    """
+    Streams records into the output path (default ~/passwords.txt) as they
+    are generated instead of building them all up first.  '-' means stdout.
+    unique (-U) drops repeats and issued (-I) skips anything an earlier run
+    handed out, see dedupe.
+    """
+    if not output:
+        output = os.path.join(os.path.expanduser('~'), file_name)
+    if unique or issued:
+        import dedupe   # hashing and the on-disk index, only when asked for
+        with dedupe.screened(records, qty, issued) as records:
+            count, elapsed = stream_records(records, output, fmt, qty=qty)
+    else:
+        count, elapsed = stream_records(records, output, fmt, qty=qty)
+    report_rate(count, elapsed, output)
+
+def write_vectorized(qty, length, spec_char, output=None, fmt=def_format, workers=1, exclude="", no_ambiguous=False, leet=False, unique=False, issued=None):
+    """
+    -N, bulk generation through the NumPy engine (see vectorized).  Plain
+    lines are written as the engine's ready made bytes blocks, the other
+    formats and -U / -I go through write_file like any other engine.
+    """
+    try:
+        import vectorized
+    except ImportError as e:
+        print(f"\n\t-N needs numpy, {str(e).lower()}\n")
+        sys.exit(1)
+    if not output:
+        output = os.path.join(os.path.expanduser('~'), file_name)
+    engine_args = (length, spec_char, exclude, no_ambiguous, leet)
+    if workers > 1:
+        from sharding import sharded
+        write_file(sharded(vectorized.rabbit, engine_args, qty, workers), qty, output, fmt, unique, issued)
+    elif fmt == "lines" and not (unique or issued):
+        count, elapsed = stream_blocks(vectorized.rabbit(*engine_args).blocks(qty), output)
+        report_rate(count, elapsed, output)
+    else:
+        write_file(iter(vectorized.rabbit(*engine_args)), qty, output, fmt, unique, issued)
 
 
 def main():
@@ -201,11 +340,26 @@ def main():
     """
     copy = True
     file = False
+    output = None
+    fmt = def_format
+    workers = 1
+    constructive = False
+    exclude = ""
+    no_ambiguous = False
+    leet = False
+    numpy = False
+    unique = False
+    issued = None
     if len(sys.argv) > 2:
-        qty, length, spec_char, copy, file = qty_and_length_args()
+        qty, length, spec_char, copy, file, output, fmt, workers, constructive, exclude, no_ambiguous, leet, numpy, unique, issued = qty_and_length_args()
         if length < min_length or length > max_length:
             print(f"\n\tSpecified length {length} does not meet requirements\n\n\tLength has to be between {min_length} and {max_length}\n\n")
             sys.exit()
+        try:
+            Rabbit(length, spec_char, constructive, exclude, no_ambiguous, leet)     # raises for settings no password can meet
+        except ValueError as e:
+            print(f"\n\t{str(e).capitalize()}\n\n", file=sys.stderr)
+            sys.exit(1)
     elif len(sys.argv) > 1: # will simply send help to the user
         qty_and_length_args()
     else:
@@ -215,23 +369,27 @@ def main():
             if qty and length:
                 loop = False
 
-    if qty == 1:
-        gen_password(length, spec_char, file, qty)
+    if file and numpy:
+        write_vectorized(qty, length, spec_char, output, fmt, workers, exclude, no_ambiguous, leet, unique, issued)
+    elif file:
+        if workers > 1:
+            from sharding import sharded    # process pool machinery, only when asked for
+            records = sharded(Rabbit, (length, spec_char, constructive, exclude, no_ambiguous, leet), qty, workers)
+        else:
+            records = iter_passwords(length, spec_char, constructive, exclude, no_ambiguous, leet)
+        write_file(records, qty, output, fmt, unique, issued)
+    elif qty == 1:
+        gen_password(length, spec_char, file, qty, constructive, exclude, no_ambiguous, leet)
         p = passwords.get(1)
-        if file:
-            write_file()
-        elif copy:
+        if copy:
             copy_pwd(p, 1)
         else:
             print(p) # to capture from stdout out let's just dump the password.
-    elif file:
-        gen_password(length, spec_char, file, qty)
-        write_file()
     else:
-        gen_password(length, spec_char, file, qty)
+        gen_password(length, spec_char, file, qty, constructive, exclude, no_ambiguous, leet)
         for i,p in passwords.items():
             print(f"\t{i}.\t{p}")
         dialog_copy(copy, n=qty)
 
 if __name__ == "__main__":
-    main()
+    profiling.main(main, os.path.join(os.path.expanduser('~'), file_name))
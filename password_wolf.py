@@ -1,17 +1,12 @@
-import os
 import sys
 from time import sleep
-import requests
+from terminal import clear
 try:
     import pyperclip as pc
 except ModuleNotFoundError:
     print("\n\n\tRequires pyperclip to be installed\n\n")
     sys.exit()
 
-
-def clear():
-    os.system("cls" if os.name == "nt" else "clear")
-
 ####
 # Get password from password wolf, and copy chosen password to clipboard 
 # README.md: API call for x number of passwords to generate, then displays a menu to select one to copy to clipboard.
@@ -31,6 +26,10 @@ exclude="@!<>|[]\{\}\\/?&^,`)("
 repeat=9
 maximum=20
 #
+# Take passwords from the local prefetched stock (see reservoir.py)
+# instead of waiting on the API every time:
+use_reservoir = False
+#
 #lpath = os.path.expanduser('~\\Desktop\\projects\\certs')
 #cert = os.path.join(lpath, 'fullchain.cer')
 #
@@ -55,13 +54,17 @@ elif nop > maximum:
 # Use the following URL to accept all defaults:
 # $url1 = "https://passwordwolf.com/api/"
 #
-# This uses the variables above:
-URL = f"https://passwordwolf.com/api/?length={length}&numbers={numbers}&upper={upper}&lower={lower}&special={special}&exclude={exclude}&repeat={repeat}"
+# This uses the variables above, wolf_client splits big requests into
+# concurrent chunks over keep-alive connections and retries failures:
+URL = "https://passwordwolf.com/api/"
 
-#r = requests.get(URL, verify=cert)
-r = requests.get(URL)
-
-passwords = r.json()
+settings = dict(length=length, numbers=numbers, upper=upper, lower=lower, special=special, exclude=exclude)
+if use_reservoir:
+    import reservoir    # sqlite3, only when the stock is used
+    passwords = reservoir.claim(repeat, URL, **settings)
+else:
+    import wolf_client  # asyncio, imported here so the prompt above comes up straight away
+    passwords = wolf_client.fetch(repeat, URL, **settings)
 
 clear()
 
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import importlib
+import runpy
+import sys
+
+#####
+#
+# subcommand: (module, what it does), nothing is imported until one is picked
+commands = {
+    "rabbit": ("password_rabbit", "Random passwords from the character policy"),
+    "marmot": ("password_marmot", "Passwords from a URL-safe random pool, replaced, reversed and shuffled"),
+    "lemur": ("password_lemur", "Passphrases from the local dictionary"),
+    "genut": ("password_genut", "Phonetic passphrases from Password Wolf, or locally with -P"),
+    "wolf": ("password_wolf", "Pick a Password Wolf password to copy"),
+    "serve": ("wolf_server", "Local Password Wolf compatible API with warm engines"),
+    "reservoir": ("reservoir", "Show or refill the prefetched Password Wolf stock"),
+    "sanitize": ("sanitize", "Build lemur's dictionary with bounded memory"),
+}
+#
+#####
+
+"""
+usage: passwords.py COMMAND [ARGS ...]
+
+One entry point for all of the generators, for provisioning scripts that
+call them over and over.  Only the module behind the chosen subcommand is
+imported, and each of those keeps its heavy imports (requests, inflect,
+asyncio, the process pool) inside the functions that need them, so a run
+only pays for what it uses.  Everything after COMMAND is handed to that
+script untouched, so `passwords.py rabbit -q 5 -l 20` behaves exactly like
+`password_rabbit.py -q 5 -l 20`.
+
+bench.py measures cold start of each subcommand against startup_budget_ms.
+"""
+
+def usage() -> str:
+    lines = ["usage: passwords.py COMMAND [ARGS ...]", "", "commands:"]
+    lines += [f"  {name:<10} {about}" for name, (_, about) in commands.items()]
+    lines += ["", "Run passwords.py COMMAND -h for the options of each command."]
+    return "\n".join(lines)
+
+def load(name: str):
+    """
+    Imports and returns the module behind subcommand name
+    """
+    return importlib.import_module(commands[name][0])
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    name, args = argv[0], argv[1:]
+    if name not in commands:
+        print(f"{usage()}\n\npasswords.py: unknown command {name!r}", file=sys.stderr)
+        return 2
+    sys.argv = [f"passwords.py {name}", *args]     # the scripts read sys.argv themselves
+    # run as __main__ so each script's own entry block applies, eg --profile
+    runpy.run_module(commands[name][0], run_name="__main__")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import string
+
+import randpool
+
+#####
+#
+nato = ("alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike "
+        "november oscar pappa quebec romeo sierra tango uniform victor whiskey xray yankee zulu").split()
+digit_words = "zero one two three four five six seven eight nine".split()
+symbol_words = {
+    "!": "exclamation", '"': "double-quote", "#": "hash", "$": "dollar", "%": "percent",
+    "&": "ampersand", "'": "single-quote", "(": "left-paren", ")": "right-paren", "*": "asterisk",
+    "+": "plus", ",": "comma", "-": "dash", ".": "dot", "/": "slash", ":": "colon",
+    ";": "semi-colon", "<": "less-than", "=": "equals", ">": "greater-than", "?": "question-mark",
+    "@": "at", "[": "left-bracket", "\\": "backslash", "]": "right-bracket", "^": "caret",
+    "_": "underscore", "`": "backtick", "{": "left-brace", "|": "pipe", "}": "right-brace", "~": "tilde",
+}
+#
+#####
+
+"""
+Offline version of what genut gets from Password Wolf.  The phonetic field
+is a character by character spelling of a random password: lower case
+letters as lower case NATO words, upper case letters as UPPER CASE ones,
+digits as number words and symbols by name, eg "nine xray QUEBEC at".
+
+Passwords come from randpool.Pool, which maps buffered os.urandom bytes
+onto the alphabet with bytes.translate after dropping the bytes that would
+bias it (those at or above the largest multiple of the alphabet size), and
+each password is rendered through a table that maps every character to its word.  A batch
+is laid out as one bytearray with a newline between passwords, mapped to
+words and joined in a single call, then split apart again, so a whole
+batch is a handful of C level passes.  Written straight to a file, the
+batch stays one string and goes out as encoded lines (see blocks).
+
+    generate(3, 16)     # [{"password": ..., "phonetic": ...}, ...] like the API
+    Phonetic(6).take(1000)
+"""
+
+def word_table() -> dict:
+    """
+    Maps each character to " word", the leading space is dropped after translating
+    """
+    table = {}
+    for c, w in zip(string.ascii_lowercase, nato): table[ord(c)] = " " + w
+    for c, w in zip(string.ascii_uppercase, nato): table[ord(c)] = " " + w.upper()
+    for c, w in zip(string.digits, digit_words): table[ord(c)] = " " + w
+    for c, w in symbol_words.items(): table[ord(c)] = " " + w
+    return table
+
+words = word_table()
+byte_words = [words.get(b, " ")[1:] for b in range(256)]
+byte_words[10] = "\n"   # separates passwords in render_batch
+
+def alphabet(upper="on", lower="on", numbers="on", special="on", exclude="") -> str:
+    """
+    Characters to draw from, using the same on/off switches as the API
+    """
+    chars = ""
+    if lower == "on": chars += string.ascii_lowercase
+    if upper == "on": chars += string.ascii_uppercase
+    if numbers == "on": chars += string.digits
+    if special == "on": chars += ''.join(symbol_words)
+    chars = ''.join(c for c in chars if c not in exclude)
+    if not chars:
+        raise ValueError("every character is switched off or excluded")
+    return chars
+
+class Phonetic:
+    """
+    Endless, lazy source of phonetic passphrases of `length` words.  Keeps
+    its own randpool.Pool, nothing is shared between instances.
+    """
+    __slots__ = ("length", "chars", "rng")
+
+    def __init__(self, length=16, upper="on", lower="on", numbers="on", special="on", exclude=""):
+        self.length = length
+        self.chars = alphabet(upper, lower, numbers, special, exclude)
+        self.rng = randpool.Pool()
+
+    def password_chars(self, count: int) -> str:
+        """
+        count unbiased random characters from the alphabet
+        """
+        return self.rng.chars(self.chars, count)
+
+    def take(self, n: int) -> list:
+        return render_batch(self.password_chars(n * self.length).encode("ascii"), self.length)
+
+    def results(self, n: int) -> list:
+        """
+        n results shaped like the Password Wolf API: {"password", "phonetic"}
+        """
+        size = self.length
+        chars = self.password_chars(n * size)
+        passwords = [chars[i:i + size] for i in range(0, n * size, size)]
+        return [{"password": p, "phonetic": f} for p, f in zip(passwords, render_batch(chars.encode("ascii"), size))]
+
+    def blocks(self, qty: int, batch=1000):
+        """
+        qty passphrases as encoded lines, a batch per block, for output_stream.stream_blocks
+        """
+        while qty > 0:
+            n = min(batch, qty)
+            yield render_lines(self.password_chars(n * self.length).encode("ascii"), self.length)
+            qty -= n
+
+    def __iter__(self):
+        while True:
+            yield from self.take(1000)
+
+def layout(raw: bytes, size: int) -> str:
+    """
+    Joins the words of the passwords of `size` characters laid back to back
+    in raw, with " \n " between passwords
+    """
+    n = len(raw) // size
+    step = size + 1
+    buf = bytearray(n * step - 1)
+    for j in range(size):
+        buf[j::step] = raw[j::size]
+    buf[size::step] = b"\n" * (n - 1)
+    return " ".join(map(byte_words.__getitem__, buf))
+
+def render_batch(raw: bytes, size: int) -> list:
+    """
+    Renders the passwords of `size` characters laid back to back in raw
+    """
+    if len(raw) < size: return []
+    return layout(raw, size).split(" \n ")
+
+def render_lines(raw: bytes, size: int) -> bytes:
+    """
+    Same as render_batch, but as encoded lines ready to write
+    """
+    if len(raw) < size: return b""
+    return (layout(raw, size).replace(" \n ", "\n") + "\n").encode("ascii")
+
+def generate(qty: int, length=16, upper="on", lower="on", numbers="on", special="on", exclude="") -> list:
+    """
+    qty results shaped like the Password Wolf API: {"password", "phonetic"}
+    """
+    return Phonetic(length, upper, lower, numbers, special, exclude).results(qty)
@@ -0,0 +1,223 @@
+import bisect
+import itertools
+import math
+import randpool
+import string
+import profanity
+
+#####
+#
+sample_batch = 256      # passwords ClassSampler composes per round of bulk draws
+lower = string.ascii_lowercase
+upper = string.ascii_uppercase
+numbers = string.digits
+special = "!@#$%^&*()?"
+ambiguous = "Il1O0o"
+#
+#####
+
+"""
+Complexity by construction.  Rather than generating a password and throwing
+it away when it's missing an upper, lower, number or special character, we
+count every password of the given length that has at least one character
+from each class, split that count by how many characters come from each
+class (the composition), and draw a composition weighted by its share.
+Then the characters for each class are drawn and the lot is shuffled.
+Every valid password is equally likely and each one costs exactly one pass.
+The random draws are made sample_batch passwords at a time: compositions
+from one read, each class's characters from one bulk draw, and the
+shuffle's swap positions one bulk draw per step, so what's left per
+password is assembling it.
+
+    sampler = ClassSampler((lower, upper, numbers, "!@#$%^&*()?"), 20)
+    sampler.draw()
+    sampler.acceptance_rate     # share of plain random draws that would pass
+
+Policy is the declarative side: which classes are required and how many of
+each, extra characters to include, characters to exclude and whether to
+drop ambiguous ones.  It's compiled once into a translate table that maps
+every allowed character to a one-character class code, so a candidate is
+checked with a single str.translate pass plus a set comparison instead of
+a regex per class.  A screen (profanity.Automaton) also rejects anything
+that spells an expletive, and the sampler redraws those.
+
+    policy = Policy(exclude="()", no_ambiguous=True, minimums={"numbers": 2})
+    policy.check("Ab3$9xYz")
+    policy.alphabet             # what generators should draw from
+"""
+
+def compositions(length: int, parts: int):
+    """
+    Yields every way of splitting length into `parts` counts of at least one
+    """
+    for cuts in itertools.combinations(range(1, length), parts - 1):
+        yield tuple(b - a for a, b in zip((0,) + cuts, cuts + (length,)))
+
+class ClassSampler:
+    """
+    Uniform sampler over passwords of `length` characters containing at least
+    one character of every class.  With distinct=True no character repeats,
+    matching random.sample; otherwise characters are drawn with replacement,
+    matching random.choices.  Given a screen, passwords it finds anything
+    in are drawn again, which keeps the rest equally likely.
+    """
+    __slots__ = ("classes", "length", "distinct", "table", "cumulative", "total", "rng", "screen")
+
+    def __init__(self, classes, length: int, distinct=False, rng=None, screen=None):
+        self.classes = tuple(''.join(dict.fromkeys(c)) for c in classes) # drop repeated characters
+        self.length = length
+        self.distinct = distinct
+        self.rng = rng or randpool.Pool()
+        self.screen = screen
+        self.table = []
+        self.cumulative = []
+        self.total = 0
+        sizes = [len(c) for c in self.classes]
+        for comp in compositions(length, len(self.classes)):
+            if distinct:
+                weight = math.prod(math.comb(n, c) for n, c in zip(sizes, comp))
+            else:
+                weight = math.factorial(length) // math.prod(math.factorial(c) for c in comp)
+                weight *= math.prod(n ** c for n, c in zip(sizes, comp))
+            if not weight: continue
+            self.total += weight
+            self.table.append(comp)
+            self.cumulative.append(self.total)
+        if not self.total:
+            raise ValueError(f"no password of length {length} can hold every character class")
+
+    @property
+    def acceptance_rate(self) -> float:
+        """
+        Share of unconstrained random passwords over the same alphabet that
+        would pass the complexity check, ie what generate-and-reject keeps.
+        """
+        n = sum(len(c) for c in self.classes)
+        space = math.comb(n, self.length) if self.distinct else n ** self.length
+        return self.total / space
+
+    def draw(self) -> str:
+        while True:
+            pwd, = self.compose(1)
+            if self.screen is None or not self.screen.found(pwd): return pwd
+
+    def compose(self, n: int) -> list:
+        """
+        n passwords, unscreened, every random draw made for the lot at once
+        """
+        rng, length = self.rng, self.length
+        comps = [self.table[bisect.bisect_right(self.cumulative, r)] for r in rng.indices(self.total, n)]
+        parts = [self.runs(chars_in_class, [comp[i] for comp in comps]) for i, chars_in_class in enumerate(self.classes)]
+        steps = range(length - 1, 0, -1)
+        swaps = zip(*(rng.indices(i + 1, n) for i in steps)) if steps else itertools.repeat(())  # Fisher-Yates positions, a row per password
+        out = []
+        for pieces, row in zip(zip(*parts), swaps):
+            chars = list(''.join(pieces))
+            for i, j in zip(steps, row):
+                chars[i], chars[j] = chars[j], chars[i]
+            out.append(''.join(chars))
+        return out
+
+    def runs(self, chars_in_class: str, counts: list) -> list:
+        """
+        For each count, that many characters of the class (distinct ones
+        when distinct), from one bulk draw of the class
+        """
+        rng = self.rng
+        if not self.distinct:
+            drawn = rng.chars(chars_in_class, sum(counts))
+            return [drawn[end - c:end] for c, end in zip(counts, itertools.accumulate(counts))]
+        size = len(chars_in_class)
+        stream, pos = [], 0
+        out = []
+        for count in counts:
+            picked = {}     # the first count distinct indices off the stream, as Pool.sample
+            while len(picked) < count:
+                if pos == len(stream):
+                    stream, pos = rng.indices(size, 4 * sum(counts) + 16), 0
+                picked[stream[pos]] = None
+                pos += 1
+            out.append(''.join([chars_in_class[i] for i in picked]))
+        return out
+
+    def __iter__(self):
+        found = self.screen.found if self.screen is not None else None
+        while True:
+            for pwd in self.compose(sample_batch):
+                if found is None or not found(pwd): yield pwd
+
+    def take(self, n: int) -> list:
+        return list(itertools.islice(self, n))
+
+class Policy:
+    """
+    Compiled password policy.  classes maps a name to its characters, every
+    class is required at least minimums[name] times (1 unless given).
+    include adds characters that are allowed but not part of any class,
+    exclude and no_ambiguous take characters out of everything, and screen
+    (a profanity.Automaton) fails anything spelling an expletive.
+    """
+    __slots__ = ("classes", "minimums", "alphabet", "table", "codes", "required", "allowed", "counted", "screen")
+
+    def __init__(self, classes=None, minimums=None, include="", exclude="", no_ambiguous=False, screen=None):
+        if classes is None:
+            classes = {"lower": lower, "upper": upper, "numbers": numbers, "special": special}
+        drop = set(exclude) | (set(ambiguous) if no_ambiguous else set())
+        self.classes = {name: ''.join(c for c in dict.fromkeys(chars) if c not in drop) for name, chars in classes.items()}
+        self.minimums = {name: (minimums or {}).get(name, 1) for name in self.classes}
+        for name, chars in self.classes.items():
+            if not chars and self.minimums[name]:
+                raise ValueError(f"policy requires {name} but excludes every {name} character")
+        self.codes = {name: chr(0xE000 + i) for i, name in enumerate(self.classes)} # private use codepoints, never in a password
+        table = {}
+        for name, chars in self.classes.items():
+            for c in chars: table.setdefault(ord(c), self.codes[name])
+        extra = chr(0xE000 + len(self.classes))    # code for included characters outside every class
+        for c in include:
+            if c not in drop: table.setdefault(ord(c), extra)
+        self.table = table
+        self.alphabet = ''.join(map(chr, table))
+        self.required = frozenset(self.codes[n] for n, m in self.minimums.items() if m)
+        self.allowed = frozenset(self.codes.values()) | {extra}
+        self.counted = tuple((self.codes[n], m) for n, m in self.minimums.items() if m > 1)
+        self.screen = screen
+
+    def check(self, pwd: str) -> bool:
+        """
+        True if pwd only uses allowed characters, meets every minimum and
+        spells nothing the screen is looking for
+        """
+        codes = pwd.translate(self.table)
+        if not self.required <= set(codes) <= self.allowed: return False
+        for code, minimum in self.counted:
+            if codes.count(code) < minimum: return False
+        return self.screen is None or not self.screen.found(pwd)
+
+    def fits(self, length: int, distinct=False) -> None:
+        """
+        ValueError unless a password of length can pass, without repeating
+        a character when distinct
+        """
+        least = sum(self.minimums.values())
+        if length < least:
+            raise ValueError(f"length must be at least {least} with these settings")
+        if distinct and length > len(self.alphabet):
+            raise ValueError(f"length must be at most {len(self.alphabet)} with these settings, every character is used once")
+
+    def sampler(self, length: int, distinct=False, rng=None) -> ClassSampler:
+        """
+        ClassSampler over the required classes of this policy.  Minimum
+        counts above one and included extras are left to check(), callers
+        that need them should keep checking.
+        """
+        return ClassSampler([self.classes[n] for n, m in self.minimums.items() if m], length, distinct, rng, self.screen)
+
+def build(special_chars=special, spec_char=False, exclude="", no_ambiguous=False, leet=False) -> Policy:
+    """
+    The policy rabbit and marmot use: lower, upper, numbers and, unless
+    spec_char (no special) is set, their special alphabet.  Expletives are
+    screened out, leetspeak spellings too with leet.
+    """
+    classes = {"lower": lower, "upper": upper, "numbers": numbers}
+    if not spec_char: classes["special"] = special_chars
+    return Policy(classes, exclude=exclude, no_ambiguous=no_ambiguous, screen=profanity.credentials(leet))
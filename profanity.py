@@ -0,0 +1,223 @@
+import array
+import os
+import pathlib
+import string
+import struct
+
+#####
+#
+expletive_file_name = "english_expletive.txt"
+compiled_suffix = ".ac"
+magic = b"PAC3"
+embedded = ("asshole", "bitch", "bullshit", "cocksucker", "fuck", "whore")  # in dictionary words only expletives containing one of these count inside a longer word
+leet = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g", "@": "a", "$": "s", "!": "i", "|": "l", "+": "t"}
+#
+#####
+
+"""
+Expletive screening in one pass over the text, whatever the length of the
+list.  english_expletive.txt is compiled into an Aho-Corasick automaton,
+and the automaton is turned into a dense table (a DFA), so screening a
+string is one table lookup per character, with no backtracking.
+
+Text is first translated byte by byte to a small alphabet: every letter
+to its lower case, everything else to a boundary symbol.  With
+fold=True, leetspeak (4 for a, 5 and $ for s, 0 for o, and so on, see
+leet) is folded into letters first.  The tables only ever see 27
+symbols, so they stay small.  Any state that completes a match leads to a
+single absorbing state, so a screen is just
+
+    for b in text: state = delta[state + b]
+    state == absorbing
+
+Two kinds of automaton are used:
+- credentials(): everything counts anywhere in the text.  Rabbit and
+  Marmot throw away any password that spells an expletive, through
+  policy.Policy, and the NumPy engine runs the same table over whole
+  batches.
+- words(): for the dictionary.  An expletive only counts as the whole
+  word, unless it contains one of the embedded stems, which don't turn up
+  inside ordinary words.  Plenty of the list does (crap in skyscraper,
+  cock in peacock, dick in dickens, bugger in debugger, god in goddess),
+  so matching it anywhere would quietly cut the word list down.
+
+Each is compiled the first time a process asks for it and kept on disk
+next to the list as english_expletive.<kind>.ac, so that directory needs
+to be writable once.  When it isn't (a read only install) nothing is
+written and every process builds the table in memory instead.  The header
+holds the size and mtime of the list, the translate table and embedded
+stems it was built with and the width of the table entries, and the file
+is rebuilt when any of them changes.
+
+    screen = credentials(fold=True)
+    screen.found("x4SSy")       # True
+"""
+
+header = struct.Struct("=4sQQBIIBH")    # magic, source size, source mtime_ns, fold, states, absorbing, entry bytes, scope bytes
+symbols = 27    # boundary and a to z
+typecodes = {2: "H", 4: "I"}    # entry bytes: array typecode of delta
+
+expletive_full_path = pathlib.Path(__file__).parent / expletive_file_name
+_loaded = {}    # (source, fold, embedded): Automaton, one per process
+
+def translation(fold: bool) -> bytes:
+    """
+    256 byte translate table, letters to 1..26 (either case), the rest to 0
+    """
+    table = bytearray(256)
+    for i, c in enumerate(string.ascii_lowercase, start=1):
+        table[ord(c)] = table[ord(c.upper())] = i
+    if fold:
+        for c, letter in leet.items():
+            table[ord(c)] = table[ord(letter)]
+    return bytes(table)
+
+class Automaton:
+    """
+    Dense Aho-Corasick table over the 27 symbols, see above.  delta is an
+    unsigned array indexed by state * 27 + symbol holding the next state
+    times 27, so the loop never multiplies.  Entries are 16 bit while that
+    fits (up to 2427 states) and 32 bit past it.
+    """
+    __slots__ = ("canon", "fold", "embedded", "anchored", "delta", "absorbing")
+
+    def __init__(self, canon: bytes, fold: bool, embedded, delta: array.array, absorbing: int):
+        self.canon = canon
+        self.fold = fold
+        self.embedded = embedded
+        self.anchored = embedded is not None
+        self.delta = delta
+        self.absorbing = absorbing
+
+    @classmethod
+    def build(cls, patterns, fold=False, embedded=None):
+        """
+        Compiles patterns (any case).  Given embedded, a tuple of stems,
+        patterns containing none of them are anchored to a boundary at both
+        ends, so they only match as a whole word
+        """
+        canon = translation(fold)
+        goto, accepting = [{}], [False]
+        for pattern in patterns:
+            syms = pattern.encode("latin-1", "replace").translate(canon)
+            if not syms: continue
+            if embedded is not None and not any(stem in pattern.lower() for stem in embedded): syms = b"\0" + syms + b"\0"
+            s = 0
+            for b in syms:
+                if b not in goto[s]:
+                    goto.append({})
+                    accepting.append(False)
+                    goto[s][b] = len(goto) - 1
+                s = goto[s][b]
+            accepting[s] = True
+        # breadth first, each state's row is its failure state's row with its own edges on top
+        rows = [None] * len(goto)
+        rows[0] = [goto[0].get(b, 0) for b in range(symbols)]
+        queue, fail = list(goto[0].values()), {s: 0 for s in goto[0].values()}
+        for s in queue:
+            accepting[s] = accepting[s] or accepting[fail[s]]
+            rows[s] = list(rows[fail[s]])
+            for b, t in goto[s].items():
+                fail[t] = rows[fail[s]][b]
+                rows[s][b] = t
+                queue.append(t)
+        absorbing = len(goto)
+        rows.append([absorbing] * symbols)
+        accepting.append(True)
+        typecode = "H" if absorbing * symbols < 1 << 16 else "I"
+        delta = array.array(typecode, [0]) * (symbols * len(rows))
+        for s, row in enumerate(rows):
+            for b, t in enumerate(row):
+                target = absorbing if accepting[t] else t
+                delta[s * symbols + b] = target * symbols
+        return cls(canon, fold, embedded, delta, absorbing * symbols)
+
+    def found(self, text: str) -> bool:
+        """
+        True if text spells any of the patterns
+        """
+        data = text.encode("latin-1", "replace").translate(self.canon)
+        if self.anchored: data = b"\0" + data + b"\0"
+        delta, s = self.delta, 0
+        for b in data:
+            s = delta[s + b]
+        return s == self.absorbing
+
+def scope(embedded) -> bytes:
+    """
+    What an automaton counts inside longer words, as stored in its header
+    """
+    return b"*" if embedded is None else "\n".join(embedded).encode()
+
+def compiled_path(source, fold: bool, embedded) -> pathlib.Path:
+    source = pathlib.Path(source)
+    kind = "words" if embedded is not None else "leet" if fold else "plain"
+    return source.with_suffix(f".{kind}{compiled_suffix}")
+
+def read_compiled(path, source, fold: bool, embedded):
+    """
+    The automaton cached at path, or None if it's missing or stale
+    """
+    stat = pathlib.Path(source).stat()
+    try:
+        with open(path, "rb") as f:
+            tag, size, mtime, f_fold, states, absorbing, width, scope_size = header.unpack(f.read(header.size))
+            canon = f.read(256)
+            f_scope = f.read(scope_size)
+            delta = array.array(typecodes[width])
+            delta.frombytes(f.read())
+    except (OSError, struct.error, ValueError, KeyError):
+        return None
+    if (tag, size, mtime, bool(f_fold), canon, f_scope) != (magic, stat.st_size, stat.st_mtime_ns, fold, translation(fold), scope(embedded)):
+        return None
+    if len(delta) != states * symbols:
+        return None
+    return Automaton(canon, fold, embedded, delta, absorbing)
+
+def write_compiled(automaton: Automaton, path, source) -> None:
+    """
+    Writes the automaton through a temp file, stamped with the size and mtime of source
+    """
+    path = pathlib.Path(path)
+    stat = pathlib.Path(source).stat()
+    tag = scope(automaton.embedded)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(header.pack(magic, stat.st_size, stat.st_mtime_ns, automaton.fold, len(automaton.delta) // symbols, automaton.absorbing, automaton.delta.itemsize, len(tag)))
+        f.write(automaton.canon)
+        f.write(tag)
+        f.write(automaton.delta.tobytes())
+    os.replace(tmp, path)
+
+def load(source=expletive_full_path, fold=False, embedded=None) -> Automaton:
+    """
+    Automaton for the expletive list at source, from the compiled copy on
+    disk, compiled (and saved if we can) when that's missing or stale.
+    Loaded once per process.
+    """
+    key = (str(source), fold, embedded)
+    automaton = _loaded.get(key)
+    if automaton is None:
+        path = compiled_path(source, fold, embedded)
+        automaton = read_compiled(path, source, fold, embedded)
+        if automaton is None:
+            with open(source, "r", encoding="utf-8") as f:
+                automaton = Automaton.build(f.read().split(), fold, embedded)
+            try:
+                write_compiled(automaton, path, source)
+            except OSError:     # read only install, build it each time
+                pass
+        _loaded[key] = automaton
+    return automaton
+
+def credentials(fold=False, source=expletive_full_path) -> Automaton:
+    """
+    Screen for generated passwords, every expletive counts anywhere
+    """
+    return load(source, fold)
+
+def words(source=expletive_full_path) -> Automaton:
+    """
+    Screen for dictionary words, whole words only bar the embedded stems
+    """
+    return load(source, False, embedded)
@@ -0,0 +1,117 @@
+import os
+import pathlib
+import sys
+
+#####
+#
+profile_flag = "--profile"
+sample_interval = 0.001     # seconds between stack samples for the collapsed file
+top_allocations = 25        # lines listed in the tracemalloc report
+trace_frames = 16           # frames kept per allocation traceback
+#
+#####
+
+"""
+--profile for the generator scripts.  The flag is taken out of sys.argv
+before the script's main() sees it, and the whole run (argument parsing,
+dictionary load, generation, writing) is wrapped in:
+
+- cProfile, saved as <output>.prof for pstats / snakeviz
+- tracemalloc, the top allocations by line and peak memory in <output>.alloc.txt
+- a sampler that records the main thread's stack every sample_interval,
+  saved as <output>.collapsed, one "frame;frame;frame count" per line,
+  ready for flamegraph.pl or speedscope
+
+<output> is the -O path when one is given, otherwise the file the script
+writes by default.  Without the flag main() is called directly and none
+of this is imported.
+
+    if __name__ == "__main__":
+        profiling.main(main, default_output)
+"""
+
+def output_base(argv: list, default) -> pathlib.Path:
+    """
+    Where the reports go: next to -O/--output unless that's stdout, else default
+    """
+    output = None
+    for i, arg in enumerate(argv):
+        if arg in ("-O", "--output") and i + 1 < len(argv):
+            output = argv[i + 1]
+        elif arg.startswith("--output="):
+            output = arg.split("=", 1)[1]
+    return pathlib.Path(output if output and output != "-" else default)
+
+def frame_name(code) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}".replace(" ", "_").replace(";", ":")
+
+def sample_stacks(thread_id: int, stacks: dict, stop) -> None:
+    """
+    Counts the collapsed stack of thread_id every sample_interval until stop is set
+    """
+    while not stop.wait(sample_interval):
+        frame = sys._current_frames().get(thread_id)
+        names = []
+        while frame is not None:
+            names.append(frame_name(frame.f_code))
+            frame = frame.f_back
+        if names:
+            stack = ";".join(reversed(names))
+            stacks[stack] = stacks.get(stack, 0) + 1
+
+def write_reports(base: pathlib.Path, profiler, snapshot, peak: int, stacks: dict) -> list:
+    prof = base.with_name(base.name + ".prof")
+    alloc = base.with_name(base.name + ".alloc.txt")
+    collapsed = base.with_name(base.name + ".collapsed")
+    profiler.dump_stats(prof)
+    stats = snapshot.statistics("lineno")
+    with open(alloc, "w") as f:
+        f.write(f"peak traced memory: {peak / 1024:,.1f} KB\n")
+        f.write(f"still allocated at exit: {sum(s.size for s in stats) / 1024:,.1f} KB in {sum(s.count for s in stats):,} blocks\n\n")
+        f.write(f"top {top_allocations} allocations by line\n\n")
+        for stat in stats[:top_allocations]:
+            f.write(f"{stat}\n")
+        f.write("\nlargest allocation traceback\n\n")
+        if stats:
+            largest = snapshot.statistics("traceback")[0]
+            f.write("\n".join(largest.traceback.format()) + "\n")
+    with open(collapsed, "w") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+    return [prof, alloc, collapsed]
+
+def run(func, base: pathlib.Path):
+    """
+    Calls func under cProfile, tracemalloc and the stack sampler, and writes
+    the three reports next to base even if func raises or exits
+    """
+    import cProfile
+    import threading
+    import tracemalloc
+    stacks, stop = {}, threading.Event()
+    sampler = threading.Thread(target=sample_stacks, args=(threading.get_ident(), stacks, stop), daemon=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start(trace_frames)
+    sampler.start()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        stop.set()
+        sampler.join()
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        paths = write_reports(base, profiler, snapshot, peak, stacks)
+        print("\n\tProfile written to\n" + "".join(f"\t\t{p}\n" for p in paths), file=sys.stderr)
+
+def main(func, default_output):
+    """
+    Runs func, profiled when --profile is on the command line
+    """
+    if profile_flag not in sys.argv:
+        return func()
+    sys.argv.remove(profile_flag)
+    return run(func, output_base(sys.argv[1:], default_output))
@@ -0,0 +1,224 @@
+import os
+import random
+import weakref
+
+#####
+#
+block_size = 1 << 16    # bytes read from os.urandom per refill
+index_batch = 4096      # indices drawn at once for word list sized ranges
+#
+#####
+
+"""
+Cryptographic randomness for the engines without paying for a system call
+per character.  Pool is a random.Random whose bits come from os.urandom,
+read block_size bytes at a time and handed out from the buffer, so every
+engine keeps calling sample, choices, shuffle and randrange as before and
+none of it comes from the Mersenne Twister any more.
+
+Bounded indices are unbiased.  Single draws go through Random's own
+bitmask and retry loop on top of getrandbits.  The bulk paths, which is
+where the engines spend their time, work on whole slices of the buffer:
+
+- below 256 values each byte is mapped to `byte % n` with bytes.translate,
+  deleting the bytes at or above the largest multiple of n first, so a
+  string of k characters is one translate and one decode
+- below 65536 the slice is read as 16 bit words with the same cut off,
+  index_batch at a time, and handed out from there
+- anything larger is cut as whole integers of n's bit length from one
+  read, keeping those below n (at least half of them)
+
+    rng = Pool()
+    rng.chars(alphabet, 16)     # 16 characters, uniform over alphabet
+    rng.sample(alphabet, 16)    # 16 distinct ones, like random.sample
+    rng.indices(len(words), 6)  # 6 indices into words
+
+Each instance has its own buffer, so give each thread its own Pool, the
+way each engine already has its own Random.  Buffers are thrown away in
+a forked child so two processes never hand out the same bytes.
+"""
+
+_pools = weakref.WeakSet()
+_limits = [256 - 256 % (i + 1) for i in range(256)]  # unbiased cut off for a draw in range(i + 1)
+
+class Pool(random.Random):
+    """
+    random.Random backed by buffered os.urandom, plus bulk unbiased draws
+    """
+
+    def __init__(self, block=block_size):
+        self.block = block
+        self.buffer = b""
+        self.pos = 0
+        self.tables = {}
+        self.drawn = {}     # size: (indices, next unused) for sizes above 256
+        super().__init__()
+        _pools.add(self)
+
+    def seed(self, *args, **kwds) -> None:
+        """
+        Nothing to seed, the bytes come from os.urandom
+        """
+        return None
+
+    def getstate(self):
+        raise NotImplementedError("Pool has no state to save")
+
+    setstate = getstate
+
+    def drain(self) -> None:
+        self.buffer = b""
+        self.pos = 0
+        self.drawn = {}
+
+    def read(self, n: int) -> bytes:
+        """
+        The next n random bytes, refilling the buffer when it runs out
+        """
+        pos = self.pos
+        end = pos + n
+        if end > len(self.buffer):
+            self.buffer = self.buffer[pos:] + os.urandom(max(self.block, n))
+            pos, end = 0, n
+        self.pos = end
+        return self.buffer[pos:end]
+
+    randbytes = read
+
+    def getrandbits(self, k: int) -> int:
+        if 0 < k <= 8:     # what _randbelow asks for with small alphabets
+            if self.pos >= len(self.buffer):
+                self.buffer = os.urandom(self.block)
+                self.pos = 0
+            b = self.buffer[self.pos]
+            self.pos += 1
+            return b >> (8 - k)
+        if k < 0:
+            raise ValueError("number of bits must be non-negative")
+        n = (k + 7) // 8
+        return int.from_bytes(self.read(n), "little") >> (n * 8 - k)
+
+    def _randbelow(self, n: int) -> int:
+        """
+        One unbiased draw in range(n), straight off the buffer when n fits a byte
+        """
+        if n > 256:
+            return self._randbelow_with_getrandbits(n)
+        limit = _limits[n - 1]
+        while True:
+            if self.pos >= len(self.buffer):
+                self.buffer = os.urandom(self.block)
+                self.pos = 0
+            b = self.buffer[self.pos]
+            self.pos += 1
+            if b < limit: return b % n
+
+    def random(self) -> float:
+        return (int.from_bytes(self.read(7), "little") >> 3) * 2.0 ** -53
+
+    def table(self, alphabet) -> tuple:
+        """
+        (translate table, biased bytes, acceptance) for an alphabet of at
+        most 256 latin-1 characters, or a size n meaning the bytes 0..n-1
+        """
+        t = self.tables.get(alphabet)
+        if t is None:
+            values = range(alphabet) if isinstance(alphabet, int) else [ord(c) for c in alphabet]
+            n = len(values)
+            limit = 256 - 256 % n
+            t = self.tables[alphabet] = (bytes(values[b % n] for b in range(256)), bytes(range(limit, 256)), limit / 256)
+        return t
+
+    def translated(self, alphabet, k: int) -> bytes:
+        to_values, biased, acceptance = self.tables.get(alphabet) or self.table(alphabet)
+        out = self.read(int(k / acceptance) + 8).translate(to_values, biased)
+        while len(out) < k:
+            out += self.read(k).translate(to_values, biased)
+        return out[:k]
+
+    def indices(self, n: int, k: int) -> list:
+        """
+        k independent, uniform indices in range(n)
+        """
+        if n <= 0:
+            raise ValueError("n must be positive")
+        if n <= 256:
+            return list(self.translated(n, k))
+        drawn, pos = self.drawn.get(n, ([], 0))
+        if pos + k > len(drawn):
+            drawn, pos = drawn[pos:] + self.draw(n, max(k, index_batch)), 0
+        self.drawn[n] = (drawn, pos + k)
+        return drawn[pos:pos + k]
+
+    def draw(self, n: int, k: int) -> list:
+        """
+        At least k indices in range(n) for n above 256, kept by indices()
+        so word list picks of a few words each don't pay for a read apiece
+        """
+        if n > 65536:
+            bits = n.bit_length()
+            size = (bits + 7) // 8
+            shift = 8 * size - bits
+            out = []
+            while len(out) < k:
+                raw = self.read(size * (2 * (k - len(out)) + 8))
+                out += [r for r in (int.from_bytes(raw[i:i + size], "little") >> shift for i in range(0, len(raw), size)) if r < n]
+            return out
+        limit = 65536 - 65536 % n
+        out = []
+        while len(out) < k:
+            words = memoryview(self.read(2 * (int((k - len(out)) * 65536 / limit) + 8))).cast("H")
+            out += [w % n for w in words if w < limit]
+        return out
+
+    def chars(self, alphabet: str, k: int) -> str:
+        """
+        k characters drawn uniformly, with replacement, from alphabet
+        """
+        if alphabet not in self.tables and (len(alphabet) > 256 or max(alphabet, default="\xff") > "\xff"):
+            return ''.join([alphabet[i] for i in self.indices(len(alphabet), k)])
+        return self.translated(alphabet, k).decode("latin-1")
+
+    def choices(self, population, weights=None, *, cum_weights=None, k=1) -> list:
+        if weights is None and cum_weights is None and len(population):
+            if isinstance(population, str):
+                return list(self.chars(population, k))
+            return [population[i] for i in self.indices(len(population), k)]
+        return super().choices(population, weights, cum_weights=cum_weights, k=k)
+
+    def sample(self, population, k: int, *, counts=None) -> list:
+        """
+        random.sample, drawing indices in bulk and skipping repeats, which
+        keeps every ordered selection of k distinct positions equally likely
+        """
+        n = len(population)
+        if counts is not None or n > 256 or not 0 <= k <= n:
+            return super().sample(population, k, counts=counts)
+        picked = {}
+        while len(picked) < k:
+            want = k - len(picked)
+            picked.update(dict.fromkeys(self.translated(n, want * n // (n - len(picked)) + 2)))
+        return [population[i] for i in list(picked)[:k]]
+
+    def shuffle(self, x) -> None:
+        """
+        Fisher-Yates like random.shuffle, with the swap positions cut from
+        one slice of the buffer
+        """
+        n = len(x)
+        if n > 256:
+            return super().shuffle(x)
+        raw, j = self.read(2 * n), 0
+        for i in range(n - 1, 0, -1):
+            limit = _limits[i]
+            while True:
+                if j == len(raw):
+                    raw, j = self.read(n), 0
+                b = raw[j]
+                j += 1
+                if b < limit: break
+            b %= i + 1
+            x[i], x[b] = x[b], x[i]
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: [p.drain() for p in list(_pools)])
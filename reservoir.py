@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import pathlib
+import sqlite3
+import subprocess
+import sys
+import time
+import urllib.parse
+
+import wolf_client
+
+#####
+#
+reservoir_file_name = ".passwords_reservoir.sqlite"
+low_water = 50          # start a refill when fewer than this many are left
+high_water = 200        # refill up to this many
+schema_version = 2      # 2 keys stock by API URL as well as query
+lease = 120             # seconds a refill holds its claim, so only one runs at a time
+#
+#####
+
+"""
+usage: reservoir.py [-h] [--refill JOB] [--status]
+
+A local stock of Password Wolf results fetched ahead of time, so an
+interactive run reads a file instead of waiting on the API.
+
+Results live in a sqlite file in your home directory, created readable by
+you only, with secure_delete on so claimed rows are zeroed on disk.  Every
+result is stored against the API URL and the query that produced it
+(length, upper, ...), so stock fetched from a local stub or test server
+is never handed out for the real API.  claim() takes the oldest matching rows and deletes them in the same
+transaction, so no result is ever handed out twice, even to concurrent
+processes.  When the stock for a query drops below low_water a detached
+refill process is started that tops it back up to high_water; if it runs
+dry the shortfall is fetched live.
+
+    results = claim(9, length=16, upper="on", lower="on", numbers="on", special="on", exclude="")
+"""
+
+reservoir_full_path = pathlib.Path(os.path.expanduser("~")) / reservoir_file_name
+
+def connect(path=reservoir_full_path) -> sqlite3.Connection:
+    """
+    Opens the reservoir, creating it owner-only (0600) if it doesn't exist
+    """
+    path = pathlib.Path(path)
+    os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+    os.chmod(path, 0o600)
+    con = sqlite3.connect(path, timeout=30, isolation_level=None)
+    con.execute("PRAGMA secure_delete = ON")
+    con.execute("BEGIN IMMEDIATE")
+    if con.execute("PRAGMA user_version").fetchone()[0] < schema_version:
+        # older stock isn't keyed by URL, so there's no telling where it came from
+        con.execute("DROP TABLE IF EXISTS pool")
+        con.execute("DROP TABLE IF EXISTS refill")
+        con.execute(f"PRAGMA user_version = {schema_version}")
+    con.execute("CREATE TABLE IF NOT EXISTS pool (id INTEGER PRIMARY KEY, api_url TEXT NOT NULL, query TEXT NOT NULL, password TEXT NOT NULL, phonetic TEXT NOT NULL)")
+    con.execute("CREATE INDEX IF NOT EXISTS pool_query ON pool (api_url, query, id)")
+    con.execute("CREATE TABLE IF NOT EXISTS refill (api_url TEXT NOT NULL, query TEXT NOT NULL, started REAL NOT NULL, PRIMARY KEY (api_url, query))")
+    con.execute("COMMIT")
+    return con
+
+def query_key(url: str, params: dict) -> tuple:
+    """
+    (api_url, query) a result is stored and claimed under
+    """
+    return url, urllib.parse.urlencode(sorted(params.items()))
+
+def available(con: sqlite3.Connection, key: tuple) -> int:
+    return con.execute("SELECT count(*) FROM pool WHERE api_url = ? AND query = ?", key).fetchone()[0]
+
+def take(con: sqlite3.Connection, key: tuple, qty: int) -> list:
+    """
+    Claims up to qty results and deletes them in one transaction
+    """
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        rows = con.execute("SELECT id, password, phonetic FROM pool WHERE api_url = ? AND query = ? ORDER BY id LIMIT ?", (*key, qty)).fetchall()
+        con.executemany("DELETE FROM pool WHERE id = ?", ((r[0],) for r in rows))
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    return [{"password": r[1], "phonetic": r[2]} for r in rows]
+
+def store(con: sqlite3.Connection, key: tuple, results: list) -> None:
+    con.execute("BEGIN IMMEDIATE")
+    con.executemany("INSERT INTO pool (api_url, query, password, phonetic) VALUES (?, ?, ?, ?)", ((*key, r["password"], r["phonetic"]) for r in results))
+    con.execute("COMMIT")
+
+def refill(url: str, params: dict, path=reservoir_full_path) -> int:
+    """
+    Tops the stock for params back up to high_water, unless another refill
+    for the same query holds the lease.  Returns how many were added.
+    """
+    key = query_key(url, params)
+    con = connect(path)
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        row = con.execute("SELECT started FROM refill WHERE api_url = ? AND query = ?", key).fetchone()
+        if row and time.time() - row[0] < lease:
+            con.execute("ROLLBACK")
+            return 0
+        con.execute("INSERT OR REPLACE INTO refill VALUES (?, ?, ?)", (*key, time.time()))
+        con.execute("COMMIT")
+        try:
+            wanted = high_water - available(con, key)
+            if wanted > 0:
+                store(con, key, wolf_client.fetch(wanted, url, **params))
+            return max(wanted, 0)
+        finally:
+            con.execute("DELETE FROM refill WHERE api_url = ? AND query = ?", key)
+    finally:
+        con.close()
+
+def start_refill(url: str, params: dict, path=reservoir_full_path) -> None:
+    """
+    Runs refill in a detached process so the caller doesn't wait on it
+    """
+    job = json.dumps({"url": url, "params": params, "path": str(path)})
+    subprocess.Popen([sys.executable, str(pathlib.Path(__file__)), "--refill", job],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+def claim(qty: int, url=wolf_client.base_url, path=reservoir_full_path, **params) -> list:
+    """
+    qty results for params, from the reservoir when it has them.  Any
+    shortfall is fetched live, and a refill is started when stock is low.
+    Only results fetched from url are handed out.
+    """
+    key = query_key(url, params)
+    con = connect(path)
+    try:
+        results = take(con, key, qty)
+        left = available(con, key)
+    finally:
+        con.close()
+    if left < low_water:
+        start_refill(url, params, path)
+    if len(results) < qty:
+        results += wolf_client.fetch(qty - len(results), url, **params)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Prefetched stock of Password Wolf results')
+    parser.add_argument('--refill', metavar='JOB', help='JSON with url, params and path, used by start_refill')
+    parser.add_argument('--status', action='store_true', help='Show how many results are stocked per API URL and query')
+    args = parser.parse_args()
+    if args.refill:
+        job = json.loads(args.refill)
+        refill(job["url"], job["params"], job["path"])
+    else:
+        con = connect()
+        for url, key, count in con.execute("SELECT api_url, query, count(*) FROM pool GROUP BY api_url, query"):
+            print(f"\t{count:>6}  {url}?{key}")
+        con.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import heapq
+import itertools
+import os
+import pathlib
+import sqlite3
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+#####
+#
+cache_file_name = "singular_cache.sqlite"
+parallel_threshold = 2000   # below this many new words a pool costs more than it saves
+batch_size = 900            # stays under sqlite's bound parameter limit
+def_memory_mb = 64          # working memory for clean_stream
+merge_fanin = 64            # most run files merged at once
+min_word_length = 6
+word_overhead = 4           # rough multiple of a word's size held per word while a chunk is processed
+#
+#####
+
+"""
+Singularizing the word list with inflect is the slow part of building the
+dictionary.  Results are kept in a sqlite cache keyed by word, so a rebuild
+only runs inflect over words it hasn't seen before, and when there are a
+lot of those they are spread over a process pool.
+
+    singular = singularize(words)       # same order as words
+
+For corpora too big to hold comfortably in memory, clean_stream does the
+same filter / singularize / dedupe / sort as password_lemur.clean_word_list
+with bounded memory: words are read a chunk at a time, each chunk is
+cleaned, sorted and written out as a run file, and the runs are merged with
+an external merge sort, dropping duplicates as they meet.
+
+Both keep each word's popularity rank, its place in the source (popular.txt
+is most popular first), writing "word<tab>rank" lines.  Where several
+source words reduce to one, the best rank wins.
+
+usage: sanitize.py [-h] [-o OUTPUT] [-m MEMORY] [-w WORKERS] SOURCE [SOURCE ...]
+"""
+
+cache_full_path = pathlib.Path(__file__).parent / cache_file_name
+
+_engine = None  # inflect engine for this process, made on first use
+
+def singular(word: str) -> str:
+    """
+    Singular form of word, or the word itself when inflect says it isn't a
+    plural noun (or falls over on it).
+    """
+    global _engine
+    if _engine is None:
+        import inflect  # heavy, only pay for it when there is work to do
+        _engine = inflect.engine()
+    try:
+        return _engine.singular_noun(word) or word
+    except IndexError:
+        return word
+
+def batches(items: list, size=batch_size):
+    it = iter(items)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+def open_cache(path=cache_full_path) -> sqlite3.Connection:
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE IF NOT EXISTS singular (word TEXT PRIMARY KEY, singular TEXT NOT NULL)")
+    return con
+
+def singularize(words: list, cache_path=cache_full_path, workers=None, pool=None) -> list:
+    """
+    Returns the singular form of every word, in the same order.  Words found
+    in the cache are not recomputed, the rest are computed (in parallel when
+    there are more than parallel_threshold of them) and added to the cache.
+    Pass a pool to reuse one across calls instead of starting a new one.
+    """
+    unique = list(dict.fromkeys(words))
+    known = {}
+    with open_cache(cache_path) as con:
+        for chunk in batches(unique):
+            marks = ','.join('?' * len(chunk))
+            known.update(con.execute(f"SELECT word, singular FROM singular WHERE word IN ({marks})", chunk))
+        missing = [w for w in unique if w not in known]
+        workers = workers or os.cpu_count() or 1
+        if len(missing) > parallel_threshold and pool:
+            results = list(pool.map(singular, missing, chunksize=max(1, len(missing) // (workers * 4))))
+        elif len(missing) > parallel_threshold and workers > 1:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(singular, missing, chunksize=max(1, len(missing) // (workers * 4))))
+        else:
+            results = [singular(w) for w in missing]
+        con.executemany("INSERT OR REPLACE INTO singular VALUES (?, ?)", zip(missing, results))
+        known.update(zip(missing, results))
+    con.close()
+    return [known[w] for w in words]
+
+def lowest_ranks(pairs) -> dict:
+    """
+    {word: best rank} from (word, rank) pairs
+    """
+    best = {}
+    for word, rank in pairs:
+        if rank < best.get(word, rank + 1): best[word] = rank
+    return best
+
+def read_words(sources):
+    """
+    Yields every whitespace separated word of every source file, a line at a time
+    """
+    for source in sources:
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                yield from line.split()
+
+def chunks_by_size(ranked, budget: int):
+    """
+    Groups (rank, word) pairs into lists whose words add up to roughly budget bytes
+    """
+    chunk, size = [], 0
+    for rank, word in ranked:
+        chunk.append((rank, word))
+        size += sys.getsizeof(word) + sys.getsizeof(rank)
+        if size >= budget:
+            yield chunk
+            chunk, size = [], 0
+    if chunk: yield chunk
+
+def write_run(ranked, directory) -> str:
+    """
+    Writes (word, rank) pairs, already in order, as dictionary lines
+    """
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with open(fd, "w", encoding="utf-8") as f:
+        for word, rank in ranked:
+            f.write(f"{word}\t{rank}\n")
+    return path
+
+def read_run(f):
+    for line in f:
+        word, rank = line.rstrip("\n").split("\t")
+        yield word, int(rank)
+
+def clean_chunk(chunk: list, cache_path, workers, pool) -> list:
+    """
+    (word, rank) pairs of a chunk of (rank, word) source pairs, singularized, unique and sorted
+    """
+    singular = singularize([word for _, word in chunk], cache_path, workers, pool)
+    return sorted(lowest_ranks(zip(singular, (rank for rank, _ in chunk))).items())
+
+def merge_runs(paths: list, directory):
+    """
+    Yields the unique (word, rank) pairs of the sorted run files in order,
+    the best rank for each word, merging at most merge_fanin at a time so
+    we never hold too many files open
+    """
+    while len(paths) > merge_fanin:
+        group, paths = paths[:merge_fanin], paths[merge_fanin:]
+        paths.append(write_run(merge_runs(group, directory), directory))
+    files = [open(p, "r", encoding="utf-8") for p in paths]
+    try:
+        last = None
+        for word, rank in heapq.merge(*map(read_run, files)):
+            if word != last:    # pairs sort by word then rank, so the first is the best
+                yield word, rank
+                last = word
+    finally:
+        for f, p in zip(files, paths):
+            f.close()
+            os.unlink(p)
+
+def clean_stream(sources, screen, dest, memory_mb=def_memory_mb, cache_path=cache_full_path, workers=None) -> int:
+    """
+    Builds the dictionary at dest from the source files with roughly
+    memory_mb of working memory, however large the sources are.  Output is
+    the same as clean_word_list: words screen (a profanity.Automaton, or
+    None) finds an expletive in and short words dropped, words
+    singularized, unique and sorted, one per line with its rank.  Returns
+    the word count.
+    """
+    dest = pathlib.Path(dest)
+    budget = memory_mb * 1024 * 1024 // word_overhead
+    workers = workers or os.cpu_count() or 1
+    found = screen.found if screen is not None else lambda word: False
+    ranked = ((r, w) for r, w in enumerate(read_words(sources)) if len(w) >= min_word_length and not found(w))
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    count = 0
+    try:
+        with tempfile.TemporaryDirectory(dir=dest.parent) as tmp:
+            runs = [write_run(clean_chunk(chunk, cache_path, workers, pool), tmp) for chunk in chunks_by_size(ranked, budget)]
+            if pool: pool.shutdown()
+            part = dest.with_name(dest.name + ".part")
+            with open(part, "w", encoding="utf-8") as f:
+                for count, (word, rank) in enumerate(merge_runs(runs, tmp), start=1):
+                    f.write(f"{word}\t{rank}\n")
+            os.replace(part, dest)
+    finally:
+        if pool: pool.shutdown()
+    return count
+
+def main():
+    import password_lemur
+    parser = argparse.ArgumentParser(description="Build lemur's dictionary from one or more word lists with bounded memory")
+    parser.add_argument('sources', nargs='+', help='Word list files, whitespace separated words')
+    parser.add_argument('-o', '--output', default=password_lemur.word_list_full_path, help='Dictionary to write, defaults to lemur\'s dictionary.txt')
+    parser.add_argument('-m', '--memory', type=int, default=def_memory_mb, help='Working memory in MB')
+    parser.add_argument('-w', '--workers', type=int, help='Processes used to singularize new words')
+    args = parser.parse_args()
+    import profanity
+    screen = profanity.words(password_lemur.expletive_full_path)
+    count = clean_stream(args.sources, screen, args.output, args.memory, workers=args.workers)
+    print(f"\n\tWritten {count:,} words to {args.output}\n\n")
+
+if __name__ == "__main__":
+    main()
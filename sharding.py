@@ -0,0 +1,54 @@
+import collections
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+#####
+#
+chunk_size = 10000      # records per job handed to a worker
+jobs_per_worker = 2     # jobs in flight per worker, keeps memory bounded
+#
+#####
+
+"""
+Splits a bulk run across a pool of processes.  Each worker builds its own
+engine once, after the fork, so every worker has its own randpool.Pool
+reading os.urandom and nothing is shared between them.  Jobs are collected
+in the order they were submitted, so the merged stream comes out in order.
+
+    for p in sharded(Rabbit, (25, False), qty=1_000_000, workers=4): ...
+"""
+
+_engine = None  # the engine for this worker process, set by _start_worker
+
+def _start_worker(engine_class, engine_args: tuple) -> None:
+    global _engine
+    _engine = engine_class(*engine_args)
+
+def _take(n: int) -> list:
+    return _engine.take(n)
+
+def chunk_sizes(qty: int, size=chunk_size):
+    """
+    Yields job sizes that add up to qty
+    """
+    full, rest = divmod(qty, size)
+    yield from itertools.repeat(size, full)
+    if rest: yield rest
+
+def sharded(engine_class, engine_args: tuple, qty: int, workers=None, size=chunk_size):
+    """
+    Generates qty records from engine_class(*engine_args) across `workers`
+    processes (default: every core) and yields them in order.  Only
+    workers * jobs_per_worker jobs are outstanding at once, so a slow
+    consumer doesn't pile results up in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    sizes = chunk_sizes(qty, size)
+    with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(engine_class, engine_args)) as pool:
+        pending = collections.deque(pool.submit(_take, n) for n in itertools.islice(sizes, workers * jobs_per_worker))
+        while pending:
+            batch = pending.popleft().result()
+            for n in itertools.islice(sizes, 1):
+                pending.append(pool.submit(_take, n))
+            yield from batch
@@ -0,0 +1,45 @@
+import os
+import sys
+
+#####
+#
+clear_sequence = "\033[H\033[2J\033[3J"     # cursor home, clear screen, clear scrollback
+#
+#####
+
+"""
+Clearing the screen without forking a shell.  The scripts used to call
+os.system("clear"), which costs a process per call; writing the ANSI clear
+sequence does the same in any modern terminal, Windows 10 and later
+included once virtual terminal processing is switched on for the console.
+"""
+
+_vt_enabled = False
+
+def enable_vt() -> None:
+    """
+    Turns on ANSI escape handling in the Windows console, once
+    """
+    global _vt_enabled
+    if _vt_enabled or os.name != "nt":
+        return
+    _vt_enabled = True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)     # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)   # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except (ImportError, AttributeError, OSError):
+        pass
+
+def clear() -> None:
+    """
+    Clears the terminal screen.  Skipped when stdout isn't a terminal so
+    piped output stays clean.
+    """
+    if sys.stdout.isatty():
+        enable_vt()
+        sys.stdout.write(clear_sequence)
+        sys.stdout.flush()
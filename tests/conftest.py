@@ -0,0 +1,29 @@
+import http.server
+import pathlib
+import sys
+import threading
+
+import pytest
+
+# the scripts are flat modules next to this directory, not a package
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+@pytest.fixture
+def serve():
+    """
+    Starts a local http.server in a thread with the given handler class and
+    returns its base URL, so nothing here needs the network
+    """
+    servers = []
+
+    def start(handler) -> str:
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
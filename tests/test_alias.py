@@ -0,0 +1,38 @@
+import collections
+import math
+
+import pytest
+
+import alias
+import randpool
+
+def test_picks_follow_the_weights():
+    table = alias.Alias([1, 2, 3, 4])
+    counts = collections.Counter(table.picks(randpool.Pool(), 100000))
+    for i, p in enumerate(table.probabilities):
+        assert abs(counts[i] / 100000 - p) < 0.01
+
+def test_zero_weight_is_never_picked():
+    assert 1 not in alias.Alias([1, 0, 1]).picks(randpool.Pool(), 10000)
+
+def test_entropy():
+    assert alias.Alias([1] * 8).entropy() == pytest.approx(3)
+    table = alias.Alias.for_words(["a", "b", "c", "d"], 1.0)
+    assert table.min_entropy() == pytest.approx(-math.log2(1 / sum(1 / r for r in range(1, 5))))
+    assert table.min_entropy() < table.entropy() < 2
+
+def test_bad_weights():
+    with pytest.raises(ValueError):
+        alias.Alias([])
+    with pytest.raises(ValueError):
+        alias.Alias([0, 0])
+
+def test_tables_are_shared_and_the_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(alias, "_tables", collections.OrderedDict())
+    words = ["a", "b", "c"]
+    assert alias.Alias.for_words(words, 1.0) is alias.Alias.for_words(words, 1.0)
+    lists = [list(words) for _ in range(alias.max_cached + 5)]
+    for w in lists:
+        alias.Alias.for_words(w, 1.0)
+    assert len(alias._tables) == alias.max_cached
+    assert all(entry[0] is w for entry, w in zip(alias._tables.values(), lists[-alias.max_cached:]))
@@ -0,0 +1,35 @@
+import multiprocessing
+
+import pytest
+
+import dedupe
+
+def fill(path, start: int, count: int) -> None:
+    with dedupe.Index(path, flush_entries=100) as index:
+        for h in range(start, start + count):
+            index.add(h)
+
+def test_indexes_sharing_a_directory_keep_every_hash(tmp_path):
+    first, second = dedupe.Index(tmp_path), dedupe.Index(tmp_path)     # both list no runs
+    for h in range(1, 101): first.add(h)
+    for h in range(101, 201): second.add(h)
+    first.close()
+    second.close()      # used to write the same 00000000.run over the first
+    with dedupe.Index(tmp_path) as index:
+        assert len(index) == 200
+        assert all(h in index for h in range(1, 201))
+
+def test_processes_sharing_a_directory_keep_every_hash(tmp_path):
+    workers = [multiprocessing.Process(target=fill, args=(tmp_path, 1 + i * 1000, 1000)) for i in range(4)]
+    for w in workers: w.start()
+    for w in workers: w.join()
+    assert all(w.exitcode == 0 for w in workers)
+    with dedupe.Index(tmp_path) as index:
+        assert len(index) == 4000
+        assert all(h in index for h in range(1, 4001))
+
+@pytest.mark.parametrize("content", [b"", b"short"])
+def test_truncated_key_is_rejected(tmp_path, content):
+    (tmp_path / dedupe.key_file_name).write_bytes(content)
+    with pytest.raises(ValueError):
+        dedupe.Index(tmp_path)
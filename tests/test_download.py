@@ -0,0 +1,79 @@
+import http.server
+import json
+
+import download
+
+body = bytes(range(256)) * 64
+
+def handler(etag: str, log: list):
+    """
+    Serves body at any path with ETag validators, Range and If-Range, the
+    way a static file server does, and logs each request's headers
+    """
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            log.append(dict(self.headers))
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start = 0
+            rng = self.headers.get("Range")
+            if rng and self.headers.get("If-Range", etag) == etag:
+                start = int(rng.removeprefix("bytes=").rstrip("-"))
+            self.send_response(206 if start else 200)
+            if start:
+                self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body) - start))
+            self.end_headers()
+            self.wfile.write(body[start:])
+
+    return Handler
+
+def interrupted(dest, etag: str, size: int) -> None:
+    """
+    What a run that died after size bytes leaves behind
+    """
+    download.part_path(dest).write_bytes(body[:size])
+    download.write_meta(dest, {"part": {"etag": etag}})
+
+def test_fetch_then_revalidate_is_a_304(tmp_path, serve):
+    log = []
+    url = serve(handler('"v1"', log)) + "/popular.txt"
+    dest = tmp_path / "popular.txt"
+    assert download.fetch(url, dest)
+    assert dest.read_bytes() == body
+    assert not download.part_path(dest).exists()
+    assert json.loads(download.meta_path(dest).read_text()) == {"etag": '"v1"'}
+
+    assert not download.fetch(url, dest)
+    assert log[1]["If-None-Match"] == '"v1"'
+    assert dest.read_bytes() == body
+
+def test_interrupted_download_resumes_with_range(tmp_path, serve):
+    log = []
+    url = serve(handler('"v1"', log)) + "/popular.txt"
+    dest = tmp_path / "popular.txt"
+    interrupted(dest, '"v1"', 5000)
+    assert download.fetch(url, dest)
+    assert log[0]["Range"] == "bytes=5000-" and log[0]["If-Range"] == '"v1"'
+    assert dest.read_bytes() == body
+
+def test_changed_file_starts_over_on_if_range_mismatch(tmp_path, serve):
+    log = []
+    url = serve(handler('"v2"', log)) + "/popular.txt"
+    dest = tmp_path / "popular.txt"
+    interrupted(dest, '"v1"', 5000)
+    download.part_path(dest).write_bytes(b"x" * 5000)   # bytes of the old version
+    assert download.fetch(url, dest)
+    assert log[0]["If-Range"] == '"v1"'
+    assert dest.read_bytes() == body
+    assert json.loads(download.meta_path(dest).read_text()) == {"etag": '"v2"'}
@@ -0,0 +1,40 @@
+import collections
+import itertools
+
+import lengths
+import randpool
+
+words = ["ox", "cat", "dog", "mouse", "badger", "giraffe"]
+
+def fitting(number_of_words, min_length, max_length):
+    return [p for p in itertools.product(words, repeat=number_of_words)
+            if min_length <= len(" ".join(p)) <= max_length]
+
+def test_total_counts_every_passphrase_that_fits():
+    for k, lo, hi in [(2, 0, 100), (2, 7, 9), (3, 12, 14), (3, 0, 8)]:
+        assert lengths.LengthIndex(words, k, lo, hi).total == len(fitting(k, lo, hi))
+
+def test_unrank_is_one_to_one_onto_what_fits():
+    index = lengths.LengthIndex(words, 3, 12, 14)
+    assert sorted(tuple(index.unrank(r)) for r in range(index.total)) == sorted(fitting(3, 12, 14))
+
+def test_picks_fit_and_are_uniform():
+    index = lengths.LengthIndex(words, 2, 7, 9)
+    rng = randpool.Pool()
+    counts = collections.Counter(" ".join(index.pick(rng)) for _ in range(30000))
+    assert len(counts) == index.total
+    assert all(7 <= len(p) <= 9 for p in counts)
+    expected = 30000 / index.total
+    assert all(abs(n - expected) < expected * 0.25 for n in counts.values())
+
+def test_nothing_fits():
+    index = lengths.LengthIndex(words, 2, 50, 60)
+    assert index.total == 0 and index.entropy() == 0.0
+
+def test_indexes_are_shared_and_the_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(lengths, "_indexes", collections.OrderedDict())
+    assert lengths.LengthIndex.for_words(words, 2, 7, 9) is lengths.LengthIndex.for_words(words, 2, 7, 9)
+    for hi in range(10, 10 + lengths.max_cached + 5):
+        lengths.LengthIndex.for_words(words, 2, 0, hi)
+    assert len(lengths._indexes) == lengths.max_cached
+    assert (id(words), 2, 7, 9) not in lengths._indexes
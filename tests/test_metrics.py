@@ -0,0 +1,34 @@
+import sys
+import threading
+
+import metrics
+
+def hammer(update, threads=8, n=20000):
+    def run():
+        for _ in range(n): update()
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)     # switch threads as often as possible
+    try:
+        workers = [threading.Thread(target=run) for _ in range(threads)]
+        for w in workers: w.start()
+        for w in workers: w.join()
+    finally:
+        sys.setswitchinterval(interval)
+    return threads * n
+
+def test_shared_counter_loses_nothing():
+    c = metrics.counter("test_shared_total", "test", ("engine",)).labels("x")
+    assert c.value == 0
+    assert hammer(c.inc) == c.value
+
+def test_shared_histogram_loses_nothing():
+    h = metrics.histogram("test_shared_seconds", "test").labels()
+    total = hammer(lambda: h.observe(1e-3))
+    assert h.count == total and h.cumulative()[-1] == total
+    assert abs(h.sum - total * 1e-3) < 1e-6
+
+def test_prometheus_text():
+    metrics.counter("test_text_total", "Some help", ("engine",)).labels('a"b').inc(3)
+    text = metrics.prometheus()
+    assert "# TYPE test_text_total counter" in text
+    assert 'test_text_total{engine="a\\"b"} 3' in text
@@ -0,0 +1,17 @@
+import itertools
+
+import pytest
+
+from output_stream import stream_records
+
+@pytest.mark.parametrize("qty", [0, 1, 5])
+def test_qty_caps_an_endless_generator(tmp_path, qty):
+    path = tmp_path / "out.txt"
+    count, _ = stream_records((f"p{i}" for i in itertools.count()), path, qty=qty)
+    assert count == qty
+    assert path.read_text().splitlines() == [f"p{i}" for i in range(qty)]
+
+def test_csv_header_is_written_for_no_records(tmp_path):
+    path = tmp_path / "out.csv"
+    stream_records(iter(["x"]), path, "csv", qty=0)
+    assert path.read_text() == "id,password\n"
@@ -0,0 +1,32 @@
+import pytest
+
+import password_lemur
+
+words = ["abacus", "banana", "cobbler", "dolphins"]    # only the six letter ones make 13 characters
+
+def test_batch_holds_every_passphrase_that_fits(monkeypatch):
+    monkeypatch.setattr(password_lemur, "passphrases", {})
+    password_lemur.gen_passphrase(words, False, 2, qty=4, limits=(13, 13))
+    assert sorted(password_lemur.passphrases.values()) == ["abacus abacus", "abacus banana", "banana abacus", "banana banana"]
+
+def test_more_than_fit_is_an_error_not_a_hang(monkeypatch):
+    monkeypatch.setattr(password_lemur, "passphrases", {})
+    with pytest.raises(ValueError, match="only 4 distinct"):
+        password_lemur.gen_passphrase(words, False, 2, qty=5, limits=(13, 13))
+
+def test_unique_file_run_checks_what_fits_too(tmp_path):
+    lemur = password_lemur.Lemur(words, 2, limits=(13, 13))
+    with pytest.raises(ValueError, match="only 4 distinct"):
+        password_lemur.write_file(iter(lemur), 5, tmp_path / "out.txt", unique=True, distinct=lemur.distinct)
+    password_lemur.write_file(iter(lemur), 4, tmp_path / "out.txt", unique=True, distinct=lemur.distinct)
+    assert sorted((tmp_path / "out.txt").read_text().split("\n")[:-1]) == ["abacus abacus", "abacus banana", "banana abacus", "banana banana"]
+
+def test_plain_dictionary_from_before_ranks_still_loads(tmp_path):
+    import wordlist
+    source = tmp_path / "dictionary.txt"
+    source.write_text("".join(f"{w}\n" for w in words))
+    word_list = wordlist.load(source)
+    assert list(word_list) == words and word_list.ranks is None
+    assert all(len(p.split()) == 3 for p in password_lemur.Lemur(word_list, 3).take(20))
+    source.write_text("".join(f"{w}\t{rank}\n" for rank, w in enumerate(words)))
+    assert list(wordlist.load(source).ranks) == [0, 1, 2, 3]
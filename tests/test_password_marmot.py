@@ -0,0 +1,29 @@
+import pytest
+
+import password_marmot
+import password_rabbit
+import policy
+
+nearly_no_upper = "ABCDEFGHIJKLMNOPQRSTUVWXY"
+
+def test_pool_keeps_a_class_cut_to_one_character():
+    for _ in range(200):
+        assert "Z" in password_marmot.Marmot(20, exclude=nearly_no_upper).pool
+
+def test_generates_with_a_class_cut_to_one_character():
+    assert all("Z" in p for p in password_marmot.Marmot(20, exclude=nearly_no_upper).take(50))
+
+def test_gives_up_instead_of_hanging(monkeypatch):
+    monkeypatch.setattr(password_marmot, "max_rejects", 1000)
+    monkeypatch.setattr(policy.Policy, "check", lambda self, pwd: False)
+    with pytest.raises(ValueError, match="no candidate met the policy"):
+        password_marmot.Marmot(20).take(1)
+
+@pytest.mark.parametrize("engine", [password_marmot.Marmot, password_rabbit.Rabbit])
+def test_excluding_a_whole_class_is_refused(engine):
+    with pytest.raises(ValueError, match="excludes every lower character"):
+        engine(20, exclude="abcdefghijklmnopqrstuvwxyz")
+
+def test_rabbit_refuses_more_characters_than_it_has():
+    with pytest.raises(ValueError, match="at most 23"):
+        password_rabbit.Rabbit(30, exclude="abcdefghijklmnopqrstuvwxyABCDEFGHIJKLMNOPQRSTUVWXY")
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+import pathlib
+
+import phonetic
+
+genut = pathlib.Path(__file__).resolve().parent.parent / "password_genut.py"
+
+def test_render_spells_each_character():
+    assert phonetic.render_batch(b"aZ9@", 4) == ["alpha ZULU nine at"]
+    assert phonetic.render_batch(b"abcd", 2) == ["alpha bravo", "charlie delta"]
+
+def test_lines_match_the_batch():
+    raw = phonetic.Phonetic(6).password_chars(6 * 50).encode("ascii")
+    assert phonetic.render_lines(raw, 6).decode("ascii").splitlines() == phonetic.render_batch(raw, 6)
+
+def test_blocks_give_exactly_qty_lines():
+    text = b"".join(phonetic.Phonetic(5).blocks(2500, batch=1000)).decode("ascii")
+    lines = text.splitlines()
+    assert len(lines) == 2500 and text.endswith("\n")
+    assert all(len(line.split()) == 5 for line in lines)
+
+def test_results_are_shaped_like_the_api():
+    results = phonetic.generate(20, 8, special="off", exclude="aA")
+    assert len(results) == 20
+    for r in results:
+        assert len(r["password"]) == 8 and "a" not in r["password"].lower()
+        assert r["phonetic"] == phonetic.render_batch(r["password"].encode("ascii"), 8)[0]
+
+def test_genut_has_no_api_word_limit_and_keeps_notices_off_stdout():
+    run = subprocess.run([sys.executable, str(genut), "-q", "3", "-n", "30", "-P", "-f", "-O", "-"],
+                         capture_output=True, text=True, stdin=subprocess.DEVNULL, timeout=60)
+    assert run.returncode == 0
+    assert [len(line.split()) for line in run.stdout.splitlines()] == [30, 30, 30]
+    run = subprocess.run([sys.executable, str(genut), "-q", "3", "-n", "1", "-P", "-f", "-O", "-"],
+                         capture_output=True, text=True, stdin=subprocess.DEVNULL, timeout=60)
+    assert "Minimum number of words" in run.stderr
+    assert [len(line.split()) for line in run.stdout.splitlines()] == [6, 6, 6]
@@ -0,0 +1,45 @@
+import collections
+
+import pytest
+
+import policy
+import profanity
+
+def test_every_password_has_every_class():
+    classes = (policy.lower, policy.upper, policy.numbers, policy.special)
+    for pwd in policy.ClassSampler(classes, 8).take(2000):
+        assert len(pwd) == 8 and all(set(pwd) & set(c) for c in classes)
+
+def test_distinct_never_repeats():
+    for pwd in policy.ClassSampler(("abcdef", "123"), 6, distinct=True).take(2000):
+        assert len(set(pwd)) == 6
+
+@pytest.mark.parametrize("distinct, expected", [
+    (False, {"a1", "1a", "b1", "1b", "a2", "2a", "b2", "2b"}),
+    (True, {"a1", "1a", "b1", "1b", "a2", "2a", "b2", "2b"}),
+])
+def test_uniform_over_every_valid_password(distinct, expected):
+    sampler = policy.ClassSampler(("ab", "12"), 2, distinct=distinct)
+    counts = collections.Counter(sampler.take(40000))
+    assert set(counts) == expected
+    assert all(abs(n - 5000) < 500 for n in counts.values())
+
+def test_acceptance_rate_matches_the_count():
+    sampler = policy.ClassSampler(("ab", "12"), 2)
+    assert sampler.acceptance_rate == 8 / 16
+
+def test_screen_is_redrawn():
+    screen = profanity.Automaton.build(["aa"])
+    drawn = set(policy.ClassSampler(("a", "1"), 3, screen=screen).take(500))
+    assert drawn == {"a1a", "a11", "1a1", "11a"}
+
+def test_too_short_for_every_class():
+    with pytest.raises(ValueError, match="can hold every character class"):
+        policy.ClassSampler(("ab", "12", "XY"), 2)
+
+def test_check_and_fits():
+    rules = policy.Policy(minimums={"numbers": 2})
+    assert rules.check("Ab3$9xYz")
+    assert not rules.check("Ab3$xxYz")
+    with pytest.raises(ValueError, match="at least 5"):
+        rules.fits(4)
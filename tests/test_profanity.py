@@ -0,0 +1,42 @@
+import random
+import string
+
+import profanity
+
+def patterns(n: int) -> list:
+    rng = random.Random(5)
+    return [''.join(rng.choices(string.ascii_lowercase, k=8)) for _ in range(n)]
+
+def test_large_lists_get_32_bit_entries():
+    words = patterns(1000)     # about 7000 states, past what 16 bits can address
+    screen = profanity.Automaton.build(words)
+    assert screen.delta.typecode == "I"
+    assert all(screen.found(f"x{w.upper()}1") for w in words)
+    assert not screen.found("passwordpassword")
+
+def test_small_lists_stay_16_bit():
+    assert profanity.Automaton.build(patterns(10)).delta.typecode == "H"
+
+def test_compiled_copy_round_trips(tmp_path):
+    source = tmp_path / "list.txt"
+    words = patterns(1000)
+    source.write_text("\n".join(words))
+    built = profanity.load(source)
+    path = profanity.compiled_path(source, False, None)
+    assert path.exists()
+    read = profanity.read_compiled(path, source, False, None)
+    assert read.delta == built.delta and read.absorbing == built.absorbing
+    assert read.found(words[-1])
+
+def test_dictionary_keeps_words_with_an_expletive_inside():
+    screen = profanity.words()
+    for word in ("skyscraper", "scrape", "peacock", "cockpit", "cockroach", "dickens", "shuttlecock", "debugger", "goddess", "classic"):
+        assert not screen.found(word), word
+
+def test_dictionary_still_drops_expletives():
+    screen = profanity.words()
+    for word in ("crap", "dickhead", "bastards", "fuckwit", "bullshitter", "motherfucking"):
+        assert screen.found(word), word
+
+def test_passwords_still_match_anywhere():
+    assert profanity.credentials().found("x7peacock")
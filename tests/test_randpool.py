@@ -0,0 +1,36 @@
+import collections
+
+import pytest
+
+import randpool
+
+@pytest.mark.parametrize("n", [3, 200, 1000, 70000])
+def test_indices_are_in_range_and_even(n):
+    rng = randpool.Pool()
+    drawn = rng.indices(n, 60000)
+    assert len(drawn) == 60000 and min(drawn) >= 0 and max(drawn) < n
+    low = sum(1 for d in drawn if d < n // 2)
+    assert abs(low / 60000 - (n // 2) / n) < 0.02
+
+def test_small_alphabet_is_unbiased():
+    # 256 isn't a multiple of 3, without dropping the top byte values 0 would come up more
+    counts = collections.Counter(randpool.Pool().chars("abc", 90000))
+    assert all(abs(n - 30000) < 900 for n in counts.values())
+
+def test_chars_come_from_the_alphabet():
+    assert set(randpool.Pool().chars("xyz!", 1000)) == set("xyz!")
+
+def test_sample_is_distinct():
+    rng = randpool.Pool()
+    for k in (0, 1, 10, 36):
+        picked = rng.sample("abcdefghijklmnopqrstuvwxyz0123456789", k)
+        assert len(picked) == k == len(set(picked))
+
+def test_shuffle_keeps_the_items():
+    items = list(range(50))
+    randpool.Pool().shuffle(items)
+    assert sorted(items) == list(range(50))
+
+def test_randrange_via_randbelow():
+    rng = randpool.Pool()
+    assert {rng.randrange(5) for _ in range(500)} == set(range(5))
@@ -0,0 +1,39 @@
+import sqlite3
+
+import reservoir
+import wolf_client
+
+stub_url = "http://127.0.0.1:8801/api/"
+real_url = "https://passwordwolf.com/api/"
+settings = {"length": 16, "upper": "on", "lower": "on", "numbers": "on", "special": "on", "exclude": ""}
+
+def results(tag: str, n: int) -> list:
+    return [{"password": f"{tag}{i}", "phonetic": f"{tag} {i}"} for i in range(n)]
+
+def test_stock_is_only_claimed_for_the_url_it_came_from(tmp_path, monkeypatch):
+    path = tmp_path / "reservoir.sqlite"
+    fetched, refills = [], []
+    monkeypatch.setattr(wolf_client, "fetch", lambda qty, url, **params: fetched.append(url) or results("live", qty))
+    monkeypatch.setattr(reservoir, "start_refill", lambda url, params, path: refills.append(url))
+    con = reservoir.connect(path)
+    reservoir.store(con, reservoir.query_key(stub_url, settings), results("stub", 3))
+    con.close()
+
+    claimed = reservoir.claim(2, real_url, path, **settings)
+    assert [r["password"] for r in claimed] == ["live0", "live1"]
+    assert fetched == [real_url] and refills == [real_url]
+
+    claimed = reservoir.claim(2, stub_url, path, **settings)
+    assert [r["password"] for r in claimed] == ["stub0", "stub1"]
+
+def test_stock_from_before_url_keys_is_dropped(tmp_path):
+    path = tmp_path / "reservoir.sqlite"
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE pool (id INTEGER PRIMARY KEY, query TEXT NOT NULL, password TEXT NOT NULL, phonetic TEXT NOT NULL)")
+    con.execute("INSERT INTO pool (query, password, phonetic) VALUES ('length=16', 'old', 'old')")
+    con.commit()
+    con.close()
+    con = reservoir.connect(path)
+    assert con.execute("SELECT count(*) FROM pool").fetchone()[0] == 0
+    assert reservoir.available(con, reservoir.query_key(real_url, {"length": 16})) == 0
+    con.close()
@@ -0,0 +1,50 @@
+import functools
+import random
+import string
+import subprocess
+import sys
+
+import password_lemur
+import sanitize
+
+peak_rss = """
+import resource, sys
+sys.path.insert(0, sys.argv[4])
+import password_lemur, profanity, sanitize
+screen = profanity.words(password_lemur.expletive_full_path)
+sanitize.clean_stream([sys.argv[1]], screen, sys.argv[2], memory_mb=1, cache_path=sys.argv[3], workers=1)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def corpus(path, words: int, vocab: list, rng) -> None:
+    """
+    A popular.txt like list, words drawn from vocab so inflect only has a
+    vocabulary's worth of work however long the list is
+    """
+    with open(path, "w") as f:
+        for _ in range(words // 10):
+            f.write(' '.join(rng.choices(vocab, k=10)) + "\n")
+
+def stream(tmp_path, source, dest) -> int:
+    """
+    Runs clean_stream in a fresh interpreter and returns its peak RSS in KB
+    """
+    root = str(password_lemur.local_path)
+    out = subprocess.run([sys.executable, "-c", peak_rss, str(source), str(dest), str(tmp_path / "cache.sqlite"), root],
+                         capture_output=True, text=True, check=True)
+    return int(out.stdout)
+
+def test_out_of_core_build_matches_clean_word_list(tmp_path, monkeypatch):
+    rng = random.Random(9)
+    small, big = tmp_path / "small.txt", tmp_path / "big.txt"
+    vocab = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(1500)]
+    corpus(small, 2000, vocab, rng)
+    corpus(big, 200000, vocab, rng)
+    monkeypatch.setattr(password_lemur, "word_list_full_path", tmp_path / "dictionary.txt")
+    monkeypatch.setattr(sanitize, "singularize", functools.partial(sanitize.singularize, cache_path=tmp_path / "cache.sqlite"))
+    password_lemur.clean_word_list(big.read_text().split())
+
+    small_rss = stream(tmp_path, small, tmp_path / "small.dictionary.txt")
+    big_rss = stream(tmp_path, big, tmp_path / "big.dictionary.txt")
+    assert (tmp_path / "big.dictionary.txt").read_bytes() == (tmp_path / "dictionary.txt").read_bytes()
+    assert big_rss - small_rss < 8 * 1024, "clean_stream's memory grew with the corpus"
@@ -0,0 +1,23 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import vectorized
+
+def test_rabbit_passwords_meet_the_policy():
+    engine = vectorized.rabbit(20, batch=512)
+    for pwd in engine.take(2000):
+        assert len(pwd) == 20 and len(set(pwd)) == 20
+        assert engine.policy.check(pwd)
+
+def test_excluded_characters_never_appear():
+    assert not set("aeiouAEIOU") & set("".join(vectorized.rabbit(12, exclude="aeiouAEIOU").take(1000)))
+
+def test_blocks_give_exactly_qty_lines():
+    text = b"".join(vectorized.rabbit(16, batch=300).blocks(1000)).decode("latin-1")
+    lines = text.splitlines()
+    assert len(lines) == 1000 and all(len(line) == 16 for line in lines)
+
+def test_longer_than_the_alphabet_is_refused():
+    with pytest.raises(ValueError, match="distinct"):
+        vectorized.rabbit(200)
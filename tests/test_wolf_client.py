@@ -0,0 +1,72 @@
+import http.server
+import json
+import threading
+import urllib.parse
+
+import pytest
+
+import wolf_client
+
+def handler(log: list, failures=0):
+    """
+    Answers /api/?repeat=n with n results like the Password Wolf API, after
+    failing the first `failures` requests with a 503
+    """
+    lock = threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+            with lock:
+                log.append(params)
+                fail = len(log) <= failures
+            n = int(params["repeat"])
+            body = b"" if fail else json.dumps([{"password": "p" * int(params["length"]), "phonetic": "papa"}] * n).encode()
+            self.send_response(503 if fail else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(wolf_client, "backoff", 0)
+
+def test_large_quantities_are_split_into_chunks(serve):
+    log = []
+    url = serve(handler(log)) + "/api/"
+    results = wolf_client.fetch(1234, url, length=12)
+    assert len(results) == 1234
+    assert all(r["password"] == "p" * 12 for r in results)
+    sizes = [int(params["repeat"]) for params in log]
+    assert len(sizes) > 1 and sum(sizes) == 1234
+    assert sizes[0] == wolf_client.def_chunk
+    assert all(wolf_client.min_chunk <= n <= wolf_client.max_chunk for n in sorted(sizes)[1:])   # all but the remainder
+
+def test_failed_requests_are_retried(serve):
+    log = []
+    url = serve(handler(log, failures=wolf_client.retries)) + "/api/"
+    results = wolf_client.fetch(10, url, length=12)
+    assert len(results) == 10
+    assert len(log) == wolf_client.retries + 1
+
+def test_gives_up_after_the_last_retry(serve):
+    log = []
+    url = serve(handler(log, failures=wolf_client.retries + 1)) + "/api/"
+    with pytest.raises(wolf_client.ApiError, match="giving up"):
+        wolf_client.fetch(10, url, length=12)
+    assert len(log) == wolf_client.retries + 1
+
+def test_failures_shrink_the_chunk_size():
+    sizer = wolf_client.ChunkSizer()
+    sizer.record(0.01, ok=False)
+    assert sizer.size == wolf_client.def_chunk // 2
+    sizer.record(0.01)
+    assert sizer.size == wolf_client.def_chunk
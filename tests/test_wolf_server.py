@@ -0,0 +1,92 @@
+import asyncio
+import concurrent.futures
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import wolf_server
+
+@pytest.fixture
+def server():
+    """
+    Runs wolf_server.serve on a free port in a thread with its own event
+    loop and returns the base URL
+    """
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    address = []
+
+    def started(where):
+        address.append(where)
+        ready.set()
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    task = loop.create_task(wolf_server.serve(port=0, concurrency=4, ready=started))
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    yield f"http://127.0.0.1:{address[0][1]}"
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(10)
+    loop.close()
+
+def get(url: str) -> tuple:
+    """
+    (status, decoded JSON body), 4xx and 5xx included
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=30) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+@pytest.mark.parametrize("engine", ["rabbit", "marmot", "phonetic"])
+def test_passwords(server, engine):
+    status, body = get(f"{server}/api/?engine={engine}&length=12&repeat=25&special=off")
+    assert status == 200 and len(body) == 25
+    for result in body:
+        assert len(result["password"]) == 12 and result["password"].isalnum()
+        assert len(result["phonetic"].split()) == 12
+
+def test_defaults_match_the_api(server):
+    status, body = get(f"{server}/api/")
+    assert status == 200 and len(body) == 1 and len(body[0]["password"]) == wolf_server.def_length
+
+@pytest.mark.parametrize("query, error", [
+    ("engine=nope", "engine must be"),
+    ("length=abc", "length must be a number"),
+    ("length=0", "length must be between"),
+    ("repeat=100000", "repeat must be between"),
+    ("upper=maybe", "upper must be on or off"),
+    ("numbers=off", "always uses upper, lower and numbers"),
+    ("exclude=abcdefghijklmnopqrstuvwxyz", "excludes every lower character"),
+    ("engine=marmot&length=3", "at least"),
+    ("engine=rabbit&length=200", "at most"),
+])
+def test_bad_requests(server, query, error):
+    status, body = get(f"{server}/api/?{query}")
+    assert status == 400 and error in body["error"]
+
+def test_not_found(server):
+    assert get(f"{server}/nope")[0] == 404
+
+def test_concurrent_requests(server):
+    urls = [f"{server}/api/?engine={e}&length=16&repeat=200" for e in ("rabbit", "marmot", "phonetic") * 8]
+    with concurrent.futures.ThreadPoolExecutor(12) as pool:
+        answers = list(pool.map(get, urls))
+    assert all(status == 200 and len(body) == 200 for status, body in answers)
+    passwords = [r["password"] for _, body in answers for r in body]
+    assert len(set(passwords)) == len(passwords)
+
+def test_metrics(server):
+    get(f"{server}/api/?repeat=3")
+    status, body = get(f"{server}/metrics")
+    assert status == 200 and body["server_requests_total"]["type"] == "counter"
@@ -0,0 +1,184 @@
+import numpy as np
+
+import policy
+import randpool
+
+#####
+#
+def_batch = 1 << 16     # passwords drawn per matrix, bounds memory at about batch * length * 3 bytes
+iter_batch = 1024       # passwords drawn at a time when iterating one by one
+#
+#####
+
+"""
+NumPy engine for bulk runs, needs numpy installed (it's optional, nothing
+else imports this module).  Instead of one password per trip round a
+Python loop, a whole batch is one matrix:
+
+- an N x L matrix of alphabet indices is cut from randpool bytes, keeping
+  only bytes below the largest multiple of the alphabet size so every
+  index is unbiased
+- with distinct=True (Rabbit's random.sample semantics, no repeated
+  character) each row is a partial Fisher-Yates shuffle of the alphabet,
+  done one column at a time for every row at once
+- each index is mapped to its class code and the rows are checked with
+  one count per required class, the same rules as policy.Policy.check
+- the policy's expletive screen (profanity.Automaton) is run over every
+  password at once, one table lookup per column of the matrix
+- rows that fail are redrawn, and only those, until every row passes
+- indices go through a byte lookup table and a newline column is added,
+  so the batch is ready to write with a single tobytes()
+
+    engine = Vectorized(20, policy.build(special))
+    engine.take(5)                      # list of str like the other engines
+    for block in engine.blocks(10**7):  # bytes, one password per line
+        f.write(block)
+"""
+
+class Vectorized:
+    """
+    Engine over a compiled policy.Policy.  Like the other engines it keeps
+    everything on the instance (including its own randpool.Pool), iterates
+    lazily and endlessly and take(n) returns a list; blocks() and lines()
+    hand out encoded bytes for output.
+    """
+    __slots__ = ("length", "policy", "distinct", "batch", "lut", "codes", "required", "symbols", "delta", "rng", "candidates", "accepted")
+
+    def __init__(self, length: int, rules: policy.Policy, distinct=False, batch=def_batch):
+        alphabet = rules.alphabet
+        if max(alphabet, default="\0") > "\xff" or len(alphabet) > 256:
+            raise ValueError("the NumPy engine needs an alphabet of at most 256 latin-1 characters")
+        if distinct and length > len(alphabet):
+            raise ValueError(f"can't draw {length} distinct characters from {len(alphabet)}")
+        self.length = length
+        self.policy = rules
+        self.distinct = distinct
+        self.batch = batch
+        self.lut = np.frombuffer(alphabet.encode("latin-1"), dtype=np.uint8)
+        code_of = {code: i for i, code in enumerate(dict.fromkeys(rules.table.values()))}
+        self.codes = np.array([code_of[rules.table[ord(c)]] for c in alphabet], dtype=np.uint8)
+        self.required = [(code_of[rules.codes[name]], m) for name, m in rules.minimums.items() if m]
+        self.symbols = self.delta = None
+        if rules.screen is not None:    # alphabet index to screen symbol, and the screen's table
+            self.symbols = np.frombuffer(rules.screen.canon, dtype=np.uint8)[self.lut]
+            self.delta = np.frombuffer(rules.screen.delta, dtype=rules.screen.delta.typecode).astype(np.intp)
+        self.rng = randpool.Pool()
+        self.candidates = 0
+        self.accepted = 0
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.candidates if self.candidates else None
+
+    def bounded(self, n: int, size: int) -> np.ndarray:
+        """
+        size unbiased uint8 values in range(n), n at most 256
+        """
+        limit = 256 - 256 % n
+        out = np.empty(size, dtype=np.uint8)
+        filled = 0
+        while filled < size:
+            want = size - filled
+            raw = np.frombuffer(self.rng.read(int(want * 256 / limit) + 64), dtype=np.uint8)
+            raw = raw[raw < limit][:want] if limit < 256 else raw[:want]
+            out[filled:filled + len(raw)] = raw % n if n < 256 else raw
+            filled += len(raw)
+        return out
+
+    def draw(self, rows: int) -> np.ndarray:
+        """
+        length x rows matrix of alphabet indices, one password per column
+        so every step below works on contiguous rows, no checking
+        """
+        n, length = len(self.lut), self.length
+        if not self.distinct:
+            return self.bounded(n, length * rows).reshape(length, rows)
+        perm = np.repeat(np.arange(n, dtype=np.uint8)[:, None], rows, axis=1)
+        flat = perm.reshape(-1)
+        every = np.arange(rows)
+        for i in range(length):     # partial Fisher-Yates, row i swapped with one of i..n-1 in every column
+            j = (self.bounded(n - i, rows).astype(np.intp) + i) * rows + every
+            picked = flat[j]
+            flat[j] = perm[i]
+            perm[i] = picked
+        return perm[:length]
+
+    def valid(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Boolean per column of draw(), True where it meets every required
+        class minimum and the screen finds nothing in it
+        """
+        codes = self.codes[indices]
+        if all(m == 1 for _, m in self.required):     # the usual case, one OR across the password
+            mask = np.uint8(sum(1 << code for code, _ in self.required))
+            ok = (np.bitwise_or.reduce(np.left_shift(1, codes, dtype=np.uint8), axis=0) & mask) == mask
+        else:
+            ok = np.ones(indices.shape[1], dtype=bool)
+            for code, minimum in self.required:
+                ok &= np.count_nonzero(codes == code, axis=0) >= minimum
+        if self.delta is not None:
+            ok &= ~self.screened(indices)
+        return ok
+
+    def screened(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Boolean per column, True where the policy's screen finds an expletive,
+        every password stepped through profanity's table together
+        """
+        screen, delta = self.policy.screen, self.delta
+        state = np.zeros(indices.shape[1], dtype=np.intp)
+        if screen.anchored: state = delta[state]
+        for row in self.symbols[indices]:
+            state = delta[state + row]
+        if screen.anchored: state = delta[state]
+        return state == screen.absorbing
+
+    def matrix(self, n: int) -> np.ndarray:
+        """
+        n x length uint8 matrix of characters, every row passing the policy
+        """
+        indices = self.draw(n)
+        ok = self.valid(indices)
+        self.candidates += n
+        while not ok.all():
+            bad = np.flatnonzero(~ok)
+            indices[:, bad] = self.draw(len(bad))
+            ok[bad] = self.valid(indices[:, bad])
+            self.candidates += len(bad)
+        self.accepted += n
+        return self.lut[indices].T
+
+    def lines(self, n: int) -> bytes:
+        """
+        n passwords as one bytes object, each followed by a newline
+        """
+        out = np.empty((n, self.length + 1), dtype=np.uint8)
+        out[:, :self.length] = self.matrix(n)
+        out[:, self.length] = ord("\n")
+        return out.tobytes()
+
+    def blocks(self, qty: int):
+        """
+        Yields qty passwords as lines() blocks of at most batch passwords
+        """
+        while qty > 0:
+            n = min(qty, self.batch)
+            yield self.lines(n)
+            qty -= n
+
+    def take(self, n: int) -> list:
+        out = []
+        for block in self.blocks(n):
+            out += block.decode("latin-1").split("\n")[:-1]
+        return out
+
+    def __iter__(self):
+        while True:
+            yield from self.take(iter_batch)
+
+def rabbit(length: int, spec_char=False, exclude="", no_ambiguous=False, leet=False, batch=def_batch) -> Vectorized:
+    """
+    Vectorized engine with Rabbit's policy and its no repeated characters rule
+    """
+    import password_rabbit
+    return Vectorized(length, policy.build(password_rabbit.special, spec_char, exclude, no_ambiguous, leet), distinct=True, batch=batch)
@@ -0,0 +1,341 @@
+import asyncio
+import codecs
+import json
+import random
+import re
+import time
+import urllib.parse
+
+import metrics
+
+#####
+#
+base_url = "https://passwordwolf.com/api/"
+concurrency = 4         # requests in flight, also the size of the connection pool
+timeout = 10            # seconds per request
+retries = 4             # attempts after the first before giving up on a chunk
+backoff = 0.25          # seconds, doubled every retry with jitter
+backoff_cap = 5
+def_chunk = 50          # repeat= per request to start with
+min_chunk = 5
+max_chunk = 1000
+target_latency = 0.5    # seconds, chunks grow while requests come back faster than this
+read_size = 1 << 16     # bytes per read when streaming a response
+#
+#####
+
+"""
+asyncio client for the Password Wolf API.
+
+Large quantities are split into chunks of repeat= and fetched concurrently
+over a small pool of keep-alive connections.  Each request has a timeout,
+failed requests are retried with jittered exponential backoff, and the chunk
+size adapts: it doubles while requests come back well under target_latency
+and halves when they are slow or fail.  Results come back in order.
+
+Only the standard library is used, a plain HTTP/1.1 client over asyncio
+streams is all the API needs.  base_url can point at any server with the
+same /api/?length=..&repeat=.. JSON shape, like a local stub.
+
+    passwords = fetch(500, length=16, upper="on", lower="on", numbers="on", special="on")
+
+stream() is the incremental path for one large request: the body is read
+as it arrives and each {"password", "phonetic"} object is parsed and handed
+over as soon as it is complete, so the first result doesn't wait for the
+last byte and the whole response is never held in memory.
+
+    for result in stream(100000, length=16): ...
+"""
+
+class ApiError(Exception):
+    pass
+
+class Connection:
+    """
+    One keep-alive HTTP/1.1 connection
+    """
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, url: urllib.parse.SplitResult):
+        tls = url.scheme == "https"
+        port = url.port or (443 if tls else 80)
+        if tls:
+            import ssl
+            tls = ssl.create_default_context()
+        reader, writer = await asyncio.open_connection(url.hostname, port, ssl=tls or None)
+        return cls(reader, writer)
+
+    async def request(self, url: urllib.parse.SplitResult, target: str) -> tuple:
+        """
+        Sends a GET for target and returns (status, headers, body, keep_alive)
+        """
+        self.writer.write((f"GET {target} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+                           "Accept: application/json\r\nAccept-Encoding: identity\r\n"
+                           "Connection: keep-alive\r\n\r\n").encode("latin-1"))
+        await self.writer.drain()
+        status, headers = await read_head(self.reader)
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await read_chunked(self.reader)
+        elif "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self.reader.read()
+            headers["connection"] = "close"
+        return status, headers, body, headers.get("connection", "").lower() != "close"
+
+    async def stream(self, url: urllib.parse.SplitResult, target: str):
+        """
+        Sends a GET for target and yields the body of a 200 as it arrives
+        """
+        self.writer.write((f"GET {target} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+                           "Accept: application/json\r\nAccept-Encoding: identity\r\n"
+                           "Connection: close\r\n\r\n").encode("latin-1"))
+        await self.writer.drain()
+        status, headers = await read_head(self.reader)
+        if status != 200:
+            raise ApiError(f"HTTP {status}")
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while size := int((await self.reader.readline()).split(b";")[0], 16):
+                yield await self.reader.readexactly(size)
+                await self.reader.readline()
+        elif "content-length" in headers:
+            left = int(headers["content-length"])
+            while left:
+                data = await self.reader.read(min(left, read_size))
+                if not data: raise asyncio.IncompleteReadError(b"", left)
+                left -= len(data)
+                yield data
+        else:
+            while data := await self.reader.read(read_size):
+                yield data
+
+    def close(self) -> None:
+        self.writer.close()
+
+async def read_head(reader) -> tuple:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionResetError("server closed the connection")
+    status = int(line.split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+async def read_chunked(reader) -> bytes:
+    body = bytearray()
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        if not size:
+            await reader.readline()    # blank line after the last chunk (no trailers)
+            return bytes(body)
+        body += await reader.readexactly(size)
+        await reader.readline()
+
+class Pool:
+    """
+    Keeps idle connections to one host so requests reuse them
+    """
+    __slots__ = ("url", "idle")
+
+    def __init__(self, url: urllib.parse.SplitResult):
+        self.url = url
+        self.idle = []
+
+    async def get(self, target: str, limit=timeout) -> bytes:
+        """
+        GET target on a pooled connection, returns the body of a 200
+        """
+        conn = self.idle.pop() if self.idle else await asyncio.wait_for(Connection.open(self.url), limit)
+        try:
+            status, headers, body, keep_alive = await asyncio.wait_for(conn.request(self.url, target), limit)
+        except BaseException:
+            conn.close()    # state of the stream is unknown, don't reuse it
+            raise
+        if keep_alive:
+            self.idle.append(conn)
+        else:
+            conn.close()
+        if status != 200:
+            raise ApiError(f"HTTP {status}")
+        return body
+
+    def close(self) -> None:
+        while self.idle: self.idle.pop().close()
+
+class ChunkSizer:
+    """
+    Adapts how many results we ask for per request
+    """
+    __slots__ = ("size",)
+
+    def __init__(self, size=def_chunk):
+        self.size = size
+
+    def record(self, seconds: float, ok=True) -> None:
+        if not ok or seconds > target_latency:
+            self.size = max(min_chunk, self.size // 2)
+        elif seconds < target_latency / 2:
+            self.size = min(max_chunk, self.size * 2)
+
+def observe(mode: str, seconds: float, ok: bool) -> None:
+    if metrics.enabled:
+        metrics.histogram("api_request_seconds", "Password Wolf API latency, whole request for chunks and to the first body bytes for streams",
+                          ("mode", "outcome")).labels(mode, "ok" if ok else "error").observe(seconds)
+
+def query(params: dict, repeat: int) -> str:
+    return urllib.parse.urlencode({**params, "repeat": repeat})
+
+async def fetch_chunk(pool: Pool, path: str, params: dict, n: int, sizer: ChunkSizer) -> list:
+    """
+    Fetches n results, retrying with jittered backoff
+    """
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            body = await pool.get(f"{path}?{query(params, n)}")
+            sizer.record(time.perf_counter() - start)
+            observe("chunk", time.perf_counter() - start, True)
+            return json.loads(body)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ApiError, ValueError) as e:
+            sizer.record(time.perf_counter() - start, ok=False)
+            observe("chunk", time.perf_counter() - start, False)
+            if attempt == retries:
+                raise ApiError(f"giving up after {retries + 1} attempts: {e!r}") from e
+            await asyncio.sleep(min(backoff_cap, backoff * 2 ** attempt) * random.uniform(0.5, 1))
+
+async def fetch_async(qty: int, url=base_url, workers=concurrency, **params) -> list:
+    """
+    Fetches qty results in chunks with at most `workers` requests in flight.
+    Returns the list of {"password", "phonetic"} dicts in request order.
+    """
+    split = urllib.parse.urlsplit(url)
+    path = split.path or "/"
+    pool = Pool(split)
+    sizer = ChunkSizer()
+    slots = asyncio.Semaphore(workers)
+    tasks = []
+
+    async def run(n):
+        try:
+            return await fetch_chunk(pool, path, params, n, sizer)
+        finally:
+            slots.release()
+
+    try:
+        remaining = qty
+        while remaining > 0:
+            await slots.acquire()
+            n = min(sizer.size, remaining)
+            remaining -= n
+            tasks.append(asyncio.create_task(run(n)))
+        results = []
+        for chunk in await asyncio.gather(*tasks):
+            results.extend(chunk)
+        return results
+    finally:
+        for task in tasks: task.cancel()
+        pool.close()
+
+def fetch(qty: int, url=base_url, workers=concurrency, **params) -> list:
+    """
+    Blocking wrapper around fetch_async for the scripts
+    """
+    return asyncio.run(fetch_async(qty, url, workers, **params))
+
+async def iter_objects(chunks):
+    """
+    Incrementally parses a JSON array of objects from an async iterator of
+    byte chunks, yielding a list of the objects completed by each chunk.
+    Only the unparsed tail of the body is kept between chunks.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()   # a chunk can end part way through a character
+    skip = re.compile(r"[\s,]*").match
+    buf, pos, started = "", 0, False
+    async for chunk in chunks:
+        buf = buf[pos:] + text.decode(chunk)
+        pos, done = 0, []
+        while True:
+            pos = skip(buf, pos).end()
+            if pos == len(buf): break
+            if not started:
+                if buf[pos] != "[": raise ValueError("expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                if done: yield done
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break   # incomplete, wait for more
+            done.append(obj)
+            pos = end
+        if done: yield done
+    raise ValueError("response ended before the JSON array did")
+
+async def stream_async(qty: int, url=base_url, **params):
+    """
+    Asks for qty results in one request and yields them in batches as they
+    are parsed.  Connecting is retried like fetch_chunk, but once results
+    have been handed out a failure is raised rather than retried, so
+    nothing is ever yielded twice.
+    """
+    split = urllib.parse.urlsplit(url)
+    target = f"{split.path or '/'}?{query(params, qty)}"
+    for attempt in range(retries + 1):
+        conn = None
+        start = time.perf_counter()
+        try:
+            conn = await asyncio.wait_for(Connection.open(split), timeout)
+            body = conn.stream(split, target)
+            first = await asyncio.wait_for(body.__anext__(), timeout)
+            observe("stream", time.perf_counter() - start, True)
+            break
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ApiError, StopAsyncIteration) as e:
+            observe("stream", time.perf_counter() - start, False)
+            if conn: conn.close()
+            if attempt == retries:
+                raise ApiError(f"giving up after {retries + 1} attempts: {e!r}") from e
+            await asyncio.sleep(min(backoff_cap, backoff * 2 ** attempt) * random.uniform(0.5, 1))
+
+    async def chunks():
+        yield first
+        while True:
+            try:
+                yield await asyncio.wait_for(body.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+
+    try:
+        async for batch in iter_objects(chunks()):
+            yield batch
+    finally:
+        await body.aclose()
+        conn.close()
+
+def stream(qty: int, url=base_url, **params):
+    """
+    Blocking generator over stream_async, one result at a time
+    """
+    loop = asyncio.new_event_loop()
+    batches = stream_async(qty, url, **params)
+    try:
+        while True:
+            try:
+                batch = loop.run_until_complete(batches.__anext__())
+            except StopAsyncIteration:
+                return
+            yield from batch
+    finally:
+        loop.run_until_complete(batches.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import threading
+import time
+import urllib.parse
+
+import metrics
+import phonetic
+
+#####
+#
+def_host = "127.0.0.1"
+def_port = 8642
+def_engine = "rabbit"   # rabbit, marmot, lemur or phonetic when the request doesn't say
+def_length = 16
+workers = 8             # requests generating at once, the rest queue
+max_repeat = 10000      # most results per request
+max_engines = 64        # warm engines kept, one per distinct set of settings
+idle_timeout = 30       # seconds a keep-alive connection may sit idle
+#
+#####
+
+"""
+usage: wolf_server.py [-h] [-H HOST] [-p PORT] [-w WORKERS] [-m]
+
+A long running local stand-in for the Password Wolf API, so the scripts
+don't pay for a new Python process (or a trip over the internet) per
+credential.  It answers the same contract:
+
+    GET /api/?length=16&upper=on&lower=on&numbers=on&special=on&exclude=&repeat=9
+    [{"password": "...", "phonetic": "..."}, ...]
+
+engine= picks what generates the passwords: rabbit (the default), marmot,
+lemur or phonetic.  Rabbit and marmot always use lower, upper and numbers,
+so switching one of those off is a 400; special=off drops special
+characters.  A length the engine can't serve is a 400: rabbit and marmot
+need room for every required class, and rabbit never repeats a character
+so it can't go past its alphabet.  For lemur, length is the number of
+words and both fields hold the passphrase.  The phonetic field is rendered
+with phonetic.render_batch.
+
+Engines are kept warm between requests, keyed by their settings, so the
+word list stays mapped and the random buffers stay full.  Connections are
+HTTP/1.1 keep-alive.  Generation runs in a pool of `workers` threads, off
+the event loop, so a long request doesn't hold up the other connections
+(or /metrics); each engine has a lock since an engine is only safe in one
+thread at a time.  An engine failing is a 500, never a dropped connection.
+GET /metrics returns request counts and latency histograms (see metrics)
+as JSON, or as Prometheus text with ?format=prometheus or when the client
+accepts text/plain.  -m also times every stage inside the engines.
+
+Point a client at it by base URL, eg api_url = "http://127.0.0.1:8642/api/"
+in password_genut.py, or `passwords.py serve` to run it.
+"""
+
+class BadRequest(ValueError):
+    pass
+
+requests = metrics.counter("server_requests_total", "Requests answered, by status", ("status",))
+results = metrics.counter("server_results_total", "Passwords handed out, by engine", ("engine",))
+latency = metrics.histogram("server_request_seconds", "Time to answer a request, by engine (none for anything but /api/)", ("engine",))
+in_flight = metrics.gauge("server_in_flight", "Requests generating right now").labels()
+connections = metrics.counter("server_connections_total", "Connections accepted").labels()
+open_connections = metrics.gauge("server_open_connections", "Connections open right now").labels()
+started = metrics.gauge("server_start_time_seconds", "When the server started, unix time").labels()
+
+class Engines:
+    """
+    Warm engines keyed by their settings, oldest dropped past max_engines,
+    each with the lock to hold while it generates
+    """
+    __slots__ = ("cache", "words", "lock")
+
+    def __init__(self):
+        self.cache = {}
+        self.words = None
+        self.lock = threading.Lock()    # guards cache and words, the worker threads share them
+
+    def word_list(self):
+        if self.words is None:
+            import password_lemur, wordlist
+            self.words = wordlist.load(password_lemur.word_list_full_path)
+        return self.words
+
+    def get(self, key: tuple) -> tuple:
+        """
+        Returns (engine, lock) for the settings in key
+        """
+        with self.lock:
+            entry = self.cache.pop(key, None)
+            if entry is None:
+                entry = (self.make(*key), threading.Lock())
+                if len(self.cache) >= max_engines:
+                    del self.cache[next(iter(self.cache))]
+            self.cache[key] = entry     # back to the newest end
+        return entry
+
+    def make(self, name, length, upper, lower, numbers, special, exclude):
+        if name == "phonetic":
+            return phonetic.Phonetic(length, upper, lower, numbers, special, exclude)
+        if name == "lemur":
+            import password_lemur
+            return password_lemur.Lemur(self.word_list(), length)
+        if "off" in (upper, lower, numbers):
+            raise BadRequest(f"{name} always uses upper, lower and numbers")
+        if name == "rabbit":
+            import password_rabbit
+            engine = password_rabbit.Rabbit(length, special == "off", exclude=exclude)
+        else:
+            import password_marmot
+            engine = password_marmot.Marmot(length, special == "off", exclude=exclude)
+        return engine
+
+def switch(query: dict, name: str) -> str:
+    value = query.get(name, "on")
+    if value not in ("on", "off"):
+        raise BadRequest(f"{name} must be on or off")
+    return value
+
+def number(query: dict, name: str, default: int, low: int, high: int) -> int:
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise BadRequest(f"{name} must be a number") from None
+    if not low <= value <= high:
+        raise BadRequest(f"{name} must be between {low} and {high}")
+    return value
+
+def generate(engines: Engines, query: dict) -> tuple:
+    """
+    Returns (engine name, results) for the query string of an /api/ request
+    """
+    name = query.get("engine", def_engine)
+    if name not in ("rabbit", "marmot", "lemur", "phonetic"):
+        raise BadRequest("engine must be rabbit, marmot, lemur or phonetic")
+    length = number(query, "length", def_length, 1, 1000)
+    repeat = number(query, "repeat", 1, 1, max_repeat)
+    key = (name, length, switch(query, "upper"), switch(query, "lower"), switch(query, "numbers"), switch(query, "special"), query.get("exclude", ""))
+    try:
+        engine, lock = engines.get(key)
+    except BadRequest:
+        raise
+    except ValueError as e:     # eg a policy that excludes a whole required class, or a length it can't meet
+        raise BadRequest(str(e)) from None
+    with lock:
+        if name == "phonetic":
+            return name, engine.results(repeat)
+        passwords = engine.take(repeat)
+    if name == "lemur":
+        return name, [{"password": p, "phonetic": p} for p in passwords]
+    rendered = phonetic.render_batch(''.join(passwords).encode("ascii"), length)
+    return name, [{"password": p, "phonetic": f} for p, f in zip(passwords, rendered)]
+
+def response(status: int, body: bytes, keep_alive: bool, content_type="application/json") -> bytes:
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}.get(status, "Error")
+    head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"Cache-Control: no-store\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+class Server:
+    """
+    The HTTP side: parses requests off each connection until it closes
+    """
+    __slots__ = ("engines", "slots", "pool")
+
+    def __init__(self, concurrency=workers):
+        self.engines = Engines()
+        self.slots = asyncio.Semaphore(concurrency)     # the rest wait here rather than in the pool's queue
+        self.pool = concurrent.futures.ThreadPoolExecutor(concurrency, thread_name_prefix="generate")
+        started.set(time.time())
+
+    async def handle(self, reader, writer) -> None:
+        connections.inc()
+        open_connections.inc()
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), idle_timeout)
+                    if not line: break
+                    method, target, version = line.decode("latin-1").split()
+                    headers = {}
+                    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                except (asyncio.TimeoutError, ValueError, ConnectionError, asyncio.LimitOverrunError):
+                    break
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                writer.write(await self.respond(method, target, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive: break
+        except ConnectionError:
+            pass
+        finally:
+            open_connections.dec()
+            writer.close()
+
+    async def respond(self, method: str, target: str, headers: dict, keep_alive: bool) -> bytes:
+        start = time.perf_counter()
+        url = urllib.parse.urlsplit(target)
+        query = dict(urllib.parse.parse_qsl(url.query, keep_blank_values=True))
+        engine, passwords = "none", []
+        if method != "GET":
+            status, body = 405, {"error": "only GET is supported"}
+        elif url.path == "/metrics":
+            if query.get("format") == "prometheus" or "text/plain" in headers.get("accept", ""):
+                out = response(200, metrics.prometheus().encode(), keep_alive, "text/plain; version=0.0.4")
+            else:
+                out = response(200, metrics.render().encode(), keep_alive)
+            requests.labels("200").inc()
+            return out
+        elif url.path.rstrip("/") == "/api":
+            async with self.slots:
+                in_flight.inc()
+                try:
+                    engine, passwords = await asyncio.get_running_loop().run_in_executor(self.pool, generate, self.engines, query)
+                    status, body = 200, passwords
+                except BadRequest as e:
+                    status, body = 400, {"error": str(e)}
+                except Exception as e:  # a failing engine answers for itself, the connection stays up
+                    status, body = 500, {"error": f"generation failed: {e}"}
+                finally:
+                    in_flight.dec()
+        else:
+            status, body = 404, {"error": "not found"}
+        out = response(status, json.dumps(body).encode(), keep_alive)
+        requests.labels(str(status)).inc()
+        if passwords: results.labels(engine).inc(len(passwords))
+        latency.labels(engine).observe(time.perf_counter() - start)
+        return out
+
+async def serve(host=def_host, port=def_port, concurrency=workers, ready=None) -> None:
+    server = Server(concurrency)
+    listener = await asyncio.start_server(server.handle, host, port)
+    address = listener.sockets[0].getsockname()
+    if ready: ready(address)
+    async with listener:
+        await listener.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Password Wolf compatible API')
+    parser.add_argument('-H', '--host', default=def_host, help='Address to listen on')
+    parser.add_argument('-p', '--port', type=int, default=def_port, help='Port to listen on, 0 for any free port')
+    parser.add_argument('-w', '--workers', type=int, default=workers, help='Requests generating at once')
+    parser.add_argument('-m', '--stage-metrics', action='store_true', help='Time every stage inside the engines too, see /metrics')
+    args = parser.parse_args()
+    if args.stage_metrics: metrics.enable()
+    ready = lambda address: print(f"\n\tServing on http://{address[0]}:{address[1]}/api/\n", flush=True)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, ready))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import array
+import mmap
+import os
+import pathlib
+import struct
+import time
+
+import metrics
+
+#####
+#
+compiled_suffix = ".bin"
+magic = b"PWL2"
+no_rank = 0xFFFFFFFF     # placeholder while compiling for a word the source gave no rank
+#
+#####
+
+"""
+Compiled word list.  dictionary.txt is turned into one file holding a small
+header, an offsets array, a rank per word and every word back to back as a
+single bytes blob:
+
+    magic | count | ranked | source size | source mtime | offsets[count + 1] | ranks[count] | blob
+
+The file is opened with mmap, so loading costs one open no matter how many
+words there are, pages are only read when they're touched, and word i is
+blob[offsets[i]:offsets[i + 1]].  The header remembers the size and mtime of
+the dictionary.txt it came from, and load() rebuilds it when those change.
+Offsets are stored in native byte order, it's a local cache, not an
+interchange format.
+
+A line of dictionary.txt is a word, optionally followed by a tab and its
+popularity rank (0 for the most common word, see clean_word_list), which
+alias.Alias uses for weighted picks.  ranks is None when no line had one,
+and a word without one ranks after every word that has.
+
+    words = load("dictionary.txt")
+    len(words), words[42]
+    random.choices(words, k=3)      # behaves like a read only list
+"""
+
+header = struct.Struct("=4sIIQQ")  # magic, count, ranked, source size, source mtime_ns
+
+def compiled_path(source) -> pathlib.Path:
+    source = pathlib.Path(source)
+    return source.with_suffix(compiled_suffix)
+
+def parse(line: str) -> tuple:
+    """
+    (word, rank) from a dictionary.txt line, rank None if it has none
+    """
+    word, _, rank = line.rstrip("\n").partition("\t")
+    return word, int(rank) if rank else None
+
+def compile_words(words, source, target=None) -> pathlib.Path:
+    """
+    Writes the compiled form of words, stamped with the size and mtime of
+    source.  Each item is a word or a (word, rank) pair.  Written to a temp
+    file and swapped in so readers never see a half written file.
+    """
+    source = pathlib.Path(source)
+    target = pathlib.Path(target or compiled_path(source))
+    stat = source.stat()
+    offsets = array.array("I", [0])
+    ranks = array.array("I")
+    blob = bytearray()
+    for word in words:
+        word, rank = (word, None) if isinstance(word, str) else word
+        blob += word.encode("utf-8")
+        offsets.append(len(blob))
+        ranks.append(rank if rank is not None else no_rank)
+    ranked = any(r != no_rank for r in ranks)
+    if ranked:
+        last = max(r for r in ranks if r != no_rank) + 1
+        ranks = array.array("I", [last if r == no_rank else r for r in ranks])
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(header.pack(magic, len(offsets) - 1, ranked, stat.st_size, stat.st_mtime_ns))
+        f.write(offsets.tobytes())
+        f.write(ranks.tobytes())
+        f.write(blob)
+    os.replace(tmp, target)
+    return target
+
+def is_stale(source, target=None) -> bool:
+    """
+    True if the compiled file is missing, unreadable or was built from a
+    different version of source
+    """
+    source = pathlib.Path(source)
+    target = pathlib.Path(target or compiled_path(source))
+    try:
+        with open(target, "rb") as f:
+            tag, _, _, size, mtime = header.unpack(f.read(header.size))
+    except (OSError, struct.error):
+        return True
+    stat = source.stat()
+    return tag != magic or size != stat.st_size or mtime != stat.st_mtime_ns
+
+class WordList:
+    """
+    Read only sequence over a compiled word list, backed by mmap.
+    Safe to share between threads, nothing in it ever changes.
+    """
+    __slots__ = ("path", "mm", "count", "offsets", "ranks", "blob")
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        with open(self.path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        tag, self.count, ranked, _, _ = header.unpack_from(self.mm)
+        if tag != magic:
+            raise ValueError(f"{self.path} is not a compiled word list")
+        start = header.size
+        end = start + 4 * (self.count + 1)
+        view = memoryview(self.mm)
+        self.offsets = view[start:end].cast("I")
+        self.ranks = view[end:end + 4 * self.count].cast("I") if ranked else None
+        self.blob = view[end + 4 * self.count:]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0: i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("word list index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def close(self) -> None:
+        self.offsets.release()
+        if self.ranks is not None: self.ranks.release()
+        self.blob.release()
+        self.mm.close()
+
+def load(source) -> WordList:
+    """
+    Opens the compiled form of the source word list, compiling it first
+    if it's missing or dictionary.txt has changed since it was built.
+    """
+    start = time.perf_counter()
+    target = compiled_path(source)
+    stale = is_stale(source, target)
+    if stale:
+        with open(source, "r", encoding="utf-8") as f:
+            compile_words((parse(line) for line in f if line.strip()), source, target)
+    words = WordList(target)
+    if metrics.enabled:
+        metrics.histogram("wordlist_load_seconds", "Time to open the word list, by whether it was recompiled first", ("compiled",)).labels(str(stale).lower()).observe(time.perf_counter() - start)
+    return words